@@ -0,0 +1,142 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+from torchvision import transforms
+
+# --- 整批的 tensor 資料增強 ---
+# 原本每張圖片都要在 __getitem__ 中建立 PIL.Image，再逐張做 RandomRotation / ColorJitter，
+# extra + train 約 60 萬張，一個 epoch 的時間主要花在資料載入而不是模型。
+# 這裡讓 SVHNDataset(raw=True) 只返回 uint8 陣列，由 BatchAugment 作為 DataLoader 的 collate_fn
+# 對整批 tensor 一次完成：
+# * 旋轉：以 affine_grid + grid_sample 對每張圖片套用不同角度 (±rotation 度，超出範圍補 0，與 RandomRotation 相同)
+# * 亮度 / 對比：以 tensor 運算實作 ColorJitter 的 brightness / contrast
+# 輸出與 transforms.ToTensor() 相同：float32、[B, C, H, W]、數值範圍 [0, 1]。
+
+class BatchAugment:
+    """DataLoader 的 collate_fn：將 [(uint8 HWC 陣列, 標籤), ...] 轉成增強後的 (影像 tensor, 標籤 tensor)。"""
+
+    def __init__(self, rotation=15.0, brightness=0.3, contrast=0.3, train=True, generator=None):
+        """
+        Args:
+            rotation (float): 最大旋轉角度 (度)。
+            brightness (float): 亮度倍率在 [1 - brightness, 1 + brightness] 之間均勻取樣。
+            contrast (float): 對比倍率在 [1 - contrast, 1 + contrast] 之間均勻取樣。
+            train (bool): False 時只做型別轉換 (驗證 / 測試用)。
+            generator (torch.Generator, optional): 亂數產生器，方便重現。
+        """
+        self.rotation = rotation
+        self.brightness = brightness
+        self.contrast = contrast
+        self.train = train
+        self.generator = generator
+
+    def _uniform(self, n, low, high):
+        return torch.rand(n, generator=self.generator) * (high - low) + low
+
+    def _rotate(self, images):
+        angles = self._uniform(images.size(0), -self.rotation, self.rotation) * (math.pi / 180)
+        cos, sin = torch.cos(angles), torch.sin(angles)
+        zeros = torch.zeros_like(angles)
+        theta = torch.stack([
+            torch.stack([cos, -sin, zeros], dim=1),
+            torch.stack([sin, cos, zeros], dim=1),
+        ], dim=1)  # [B, 2, 3]
+        grid = F.affine_grid(theta, list(images.shape), align_corners=False)
+        return F.grid_sample(images, grid, mode="bilinear", padding_mode="zeros", align_corners=False)
+
+    def _jitter(self, images):
+        n = images.size(0)
+        if self.brightness > 0:
+            factor = self._uniform(n, max(0.0, 1 - self.brightness), 1 + self.brightness)
+            images = (images * factor.view(n, 1, 1, 1)).clamp_(0, 1)
+        if self.contrast > 0:
+            factor = self._uniform(n, max(0.0, 1 - self.contrast), 1 + self.contrast).view(n, 1, 1, 1)
+            # 與 torchvision 的 adjust_contrast 相同：與灰階平均值混合
+            gray = (0.299 * images[:, 0] + 0.587 * images[:, 1] + 0.114 * images[:, 2]).mean(dim=(1, 2)).view(n, 1, 1, 1)
+            images = (images * factor + gray * (1 - factor)).clamp_(0, 1)
+        return images
+
+    def __call__(self, samples):
+        images = torch.from_numpy(np.stack([image for image, _ in samples]))  # [B, H, W, C] uint8
+        labels = torch.from_numpy(np.array([label for _, label in samples]))
+        images = images.permute(0, 3, 1, 2).float().div_(255)  # 與 ToTensor 相同的 [B, C, H, W]、[0, 1]
+        if self.train:
+            if self.rotation > 0:
+                images = self._rotate(images)
+            images = self._jitter(images)
+        return images.contiguous(), labels
+
+
+class _SyntheticSVHN(Dataset):
+    """找不到 .mat 時基準測試使用的隨機資料 (與 SVHNDataset 相同的 __getitem__)。"""
+
+    def __init__(self, n, transform=None, raw=False):
+        rng = np.random.default_rng(0)
+        self.images = rng.integers(0, 256, (n, 32, 32, 3), dtype=np.uint8)
+        self.labels = rng.integers(0, 10, n).astype(np.uint8)
+        self.transform = transform
+        self.raw = raw
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        img = self.images[idx]
+        if self.raw:
+            return img, self.labels[idx]
+        img = Image.fromarray(img)
+        if self.transform:
+            img = self.transform(img)
+        return img, self.labels[idx]
+
+def _throughput(loader, limit):
+    seen = 0
+    start = time.perf_counter()
+    for imgs, _ in loader:
+        seen += imgs.size(0)
+        if seen >= limit:
+            break
+    return seen / (time.perf_counter() - start)
+
+def benchmark(mat_path=None, samples=20000, batch_size=128, workers=0):
+    """比較逐張 PIL 增強與整批 tensor 增強的每秒處理張數。"""
+    from model import SVHNDataset # 只有基準測試需要；scoreboard_images 也有自己的 model.py
+    legacy_transform = transforms.Compose([
+        transforms.RandomRotation(15),
+        transforms.ColorJitter(brightness=0.3, contrast=0.3),
+        transforms.ToTensor()
+    ])
+    if mat_path and os.path.exists(mat_path):
+        legacy_dataset = SVHNDataset(mat_path, transform=legacy_transform)
+        raw_dataset = SVHNDataset(mat_path, raw=True)
+    else:
+        print(f"找不到 {mat_path}，使用 {samples} 張隨機影像。")
+        legacy_dataset = _SyntheticSVHN(samples, transform=legacy_transform)
+        raw_dataset = _SyntheticSVHN(samples, raw=True)
+
+    legacy_loader = DataLoader(legacy_dataset, batch_size=batch_size, shuffle=True, num_workers=workers)
+    batch_loader = DataLoader(raw_dataset, batch_size=batch_size, shuffle=True, num_workers=workers,
+                              collate_fn=BatchAugment())
+    legacy = _throughput(legacy_loader, samples)
+    batched = _throughput(batch_loader, samples)
+    print(f"逐張 PIL 增強: {legacy:,.0f} 張/秒")
+    print(f"整批 tensor 增強: {batched:,.0f} 張/秒 ({batched / legacy:.1f}x)")
+    return legacy, batched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比較逐張 PIL 增強與整批 tensor 增強的吞吐量")
+    parser.add_argument("--mat", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "train_32x32.mat"),
+                        help="SVHN .mat 檔案 (找不到時使用隨機影像)")
+    parser.add_argument("--samples", type=int, default=20000, help="每種方式處理的張數 (預設 20000)")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--workers", type=int, default=0, help="DataLoader 的 num_workers (預設 0)")
+    args = parser.parse_args()
+    benchmark(args.mat, args.samples, args.batch_size, args.workers)
@@ -0,0 +1,123 @@
+import argparse
+import csv
+import os
+
+import torch
+from torch.utils.data import DataLoader
+
+# --- 串流式的混淆矩陣與各類別評估 ---
+# 原本訓練結束後還要再跑一次 test_loader，把每一批的結果 extend 進 Python 列表再交給 sklearn。
+# 這裡的 ConfusionMatrix 在原本的驗證迴圈中以 torch.bincount 逐批累加 (留在 tensor 上，不需同步)，
+# 並提供各類別的 precision / recall；結果寫成 PNG 與 CSV，不呼叫 plt.show()，可在 CI 與遠端主機上執行。
+
+NUM_CLASSES = 10
+
+class ConfusionMatrix:
+    """以 bincount 逐批累加的混淆矩陣：matrix[真實類別, 預測類別]。"""
+
+    def __init__(self, num_classes=NUM_CLASSES, device="cpu"):
+        self.num_classes = num_classes
+        self.matrix = torch.zeros((num_classes, num_classes), dtype=torch.long, device=device)
+
+    def update(self, preds, labels):
+        index = labels.long() * self.num_classes + preds.long()
+        self.matrix += torch.bincount(index, minlength=self.num_classes ** 2).view(self.num_classes, self.num_classes)
+
+    def reset(self):
+        self.matrix.zero_()
+
+    def total(self):
+        return int(self.matrix.sum())
+
+    def accuracy(self):
+        total = self.total()
+        return int(self.matrix.diag().sum()) / total if total else 0.0
+
+    def precision(self):
+        """各類別的 precision (沒有任何預測為該類別時為 0)。"""
+        matrix = self.matrix.double()
+        return (matrix.diag() / matrix.sum(dim=0).clamp(min=1)).tolist()
+
+    def recall(self):
+        """各類別的 recall (沒有該類別的樣本時為 0)。"""
+        matrix = self.matrix.double()
+        return (matrix.diag() / matrix.sum(dim=1).clamp(min=1)).tolist()
+
+    def report(self):
+        lines = [f"{'類別':<6}{'precision':>11}{'recall':>9}{'樣本數':>8}"]
+        support = self.matrix.sum(dim=1).tolist()
+        for label, (p, r, n) in enumerate(zip(self.precision(), self.recall(), support)):
+            lines.append(f"{label:<8}{p:>11.4f}{r:>9.4f}{n:>10}")
+        lines.append(f"Accuracy: {self.accuracy():.4f} ({self.total()} 張)")
+        return "\n".join(lines)
+
+    def save_csv(self, path):
+        """每列為一個真實類別：各預測類別的數量，接著是 precision、recall 與樣本數。"""
+        matrix = self.matrix.cpu().tolist()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["true\\pred"] + list(range(self.num_classes)) + ["precision", "recall", "support"])
+            for label, (row, p, r) in enumerate(zip(matrix, self.precision(), self.recall())):
+                writer.writerow([label] + row + [f"{p:.4f}", f"{r:.4f}", sum(row)])
+
+    def save_png(self, path, title="Confusion Matrix"):
+        import matplotlib
+        matplotlib.use("Agg") # 不需要顯示器，不會阻塞
+        import matplotlib.pyplot as plt
+
+        matrix = self.matrix.cpu().numpy()
+        fig, ax = plt.subplots(figsize=(10, 8))
+        image = ax.imshow(matrix, cmap="Blues")
+        fig.colorbar(image, ax=ax)
+        threshold = matrix.max() / 2 if matrix.size else 0
+        for i in range(self.num_classes):
+            for j in range(self.num_classes):
+                ax.text(j, i, str(matrix[i, j]), ha="center", va="center",
+                        color="white" if matrix[i, j] > threshold else "black", fontsize=8)
+        ax.set_xticks(range(self.num_classes))
+        ax.set_yticks(range(self.num_classes))
+        ax.set_xlabel("Predicted")
+        ax.set_ylabel("True")
+        ax.set_title(f"{title} (accuracy {self.accuracy():.4f})")
+        fig.tight_layout()
+        fig.savefig(path, dpi=120)
+        plt.close(fig)
+
+    def save(self, prefix="confusion_matrix"):
+        """寫出 <prefix>.csv 與 <prefix>.png，返回兩個路徑。"""
+        csv_path, png_path = prefix + ".csv", prefix + ".png"
+        self.save_csv(csv_path)
+        self.save_png(png_path)
+        return csv_path, png_path
+
+
+def evaluate(model, loader, device):
+    """單次走過 loader，返回 ConfusionMatrix。"""
+    model.eval()
+    cm = ConfusionMatrix(device=device)
+    with torch.no_grad():
+        for imgs, labels in loader:
+            imgs = imgs.to(device, non_blocking=True)
+            labels = labels.to(device, non_blocking=True)
+            cm.update(model(imgs).argmax(dim=1), labels)
+    return cm
+
+
+if __name__ == "__main__":
+    from augment import BatchAugment
+    from model import SVHNCNN, SVHNDataset
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="在 SVHN 測試集上評估模型，輸出混淆矩陣 (PNG/CSV) 與各類別 precision / recall")
+    parser.add_argument("--weights", default=os.path.join(base_dir, "svhn_cnn_weights.pth"))
+    parser.add_argument("--mat", default=os.path.join(base_dir, "test_32x32.mat"))
+    parser.add_argument("--output", default="confusion_matrix", help="輸出檔名前綴 (預設 confusion_matrix)")
+    args = parser.parse_args()
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model = SVHNCNN().to(device)
+    model.load_state_dict(torch.load(args.weights, map_location=device))
+    loader = DataLoader(SVHNDataset(args.mat, raw=True), batch_size=256, shuffle=False, collate_fn=BatchAugment(train=False))
+    cm = evaluate(model, loader, device)
+    print(cm.report())
+    print("已輸出 " + "、".join(cm.save(args.output)))
@@ -0,0 +1,131 @@
+import argparse
+import hashlib
+import os
+import time
+
+import cv2
+import numpy as np
+import torch
+from torchvision import transforms
+
+from model import SVHNCNN
+
+# --- 將 SVHNCNN 匯出為凍結、針對 CPU 最佳化的推論模型 ---
+# 1. torch.jit.trace 取得靜態計算圖。
+# 2. torch.jit.freeze 把權重內嵌為常數。
+# 3. torch.jit.optimize_for_inference 做 conv + ReLU 融合等 CPU 推論最佳化。
+#    最佳化後的圖含有 MKLDNN 常數，存檔後無法再載入；因此存檔的是凍結後的模型，
+#    recognize_score.py 載入 svhn_cnn_scripted.pt 後再做一次 optimize_for_inference (見 optimize_loaded)。
+# recognize_score.py 偵測到 svhn_cnn_scripted.pt 時會優先載入它，否則退回 .pth 權重。
+# 另可選擇輸出 ONNX (--onnx)，供 ONNX Runtime 等其他推論引擎使用。
+# 模型檔中另外記錄來源權重的 SHA-1 (extra file "weights_sha1")，.pth 權重之後被更新時
+# recognize_score.py 會略過這個過期的模型檔。
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WEIGHTS_PATH = os.path.join(BASE_DIR, "svhn_cnn_weights.pth")
+SCRIPTED_PATH = os.path.join(BASE_DIR, "svhn_cnn_scripted.pt")
+ONNX_PATH = os.path.join(BASE_DIR, "svhn_cnn.onnx")
+SCOREBOARD_DIR = os.path.join(BASE_DIR, "..", "scoreboard_images")
+WEIGHTS_DIGEST_KEY = "weights_sha1" # 與 recognize_score.py 相同
+
+# 與 recognize_score.py 的前處理相同
+preprocess = transforms.Compose([
+    transforms.ToPILImage(),
+    transforms.Resize((32, 32)),
+    transforms.ToTensor(),
+])
+
+def load_eager_model(weights_path=WEIGHTS_PATH):
+    model = SVHNCNN()
+    model.load_state_dict(torch.load(weights_path, map_location="cpu"))
+    model.eval()
+    return model
+
+def weights_sha1(weights_path=WEIGHTS_PATH):
+    h = hashlib.sha1()
+    with open(weights_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def export_torchscript(model, output_path=SCRIPTED_PATH, weights_path=WEIGHTS_PATH):
+    example = torch.rand(1, 3, 32, 32)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+        frozen = torch.jit.freeze(traced)
+    frozen.save(output_path, _extra_files={WEIGHTS_DIGEST_KEY: weights_sha1(weights_path)})
+    print(f"TorchScript 模型已儲存為 {output_path}")
+    return optimize_loaded(frozen)
+
+def optimize_loaded(frozen):
+    """與 recognize_score.py 載入後相同的 CPU 推論最佳化 (只在記憶體中，不能存檔)。"""
+    with torch.no_grad():
+        return torch.jit.optimize_for_inference(frozen)
+
+def export_onnx(model, output_path=ONNX_PATH):
+    example = torch.rand(1, 3, 32, 32)
+    torch.onnx.export(
+        model, example, output_path,
+        input_names=["input"], output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+    )
+    print(f"ONNX 模型已儲存為 {output_path}")
+
+def load_scoreboard_batch(image_dir=SCOREBOARD_DIR):
+    """讀取 scoreboard_images 中的圖片，並以 crop_score_regions 相同的方式切成左右兩半。"""
+    tensors = []
+    names = sorted(f for f in os.listdir(image_dir) if f.endswith(".jpg") or f.endswith(".png"))
+    for name in names:
+        image = cv2.imread(os.path.join(image_dir, name))
+        if image is None:
+            continue
+        center_x = image.shape[1] // 2
+        for region in (image[:, :center_x], image[:, center_x:]):
+            tensors.append(preprocess(np.ascontiguousarray(region)))
+    return torch.stack(tensors)
+
+def check_parity(eager_model, exported_model, batch):
+    """比較原始模型與匯出模型在同一批圖片上的預測是否一致。"""
+    with torch.no_grad():
+        eager_out = eager_model(batch)
+        exported_out = exported_model(batch)
+    eager_pred = eager_out.argmax(dim=1)
+    exported_pred = exported_out.argmax(dim=1)
+    mismatches = int((eager_pred != exported_pred).sum())
+    max_diff = float((eager_out - exported_out).abs().max())
+    print(f"Parity: {batch.size(0)} 個區域，預測不一致 {mismatches} 個，logits 最大誤差 {max_diff:.6f}")
+    return mismatches == 0
+
+def benchmark(model, batch, repeats=50):
+    with torch.no_grad():
+        model(batch) # 暖機
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(batch)
+    return (time.perf_counter() - start) / repeats / batch.size(0) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="匯出 SVHNCNN 為 TorchScript / ONNX")
+    parser.add_argument("--onnx", action="store_true", help="額外匯出 ONNX 檔案")
+    parser.add_argument("--skip-check", action="store_true", help="略過 scoreboard_images 上的一致性檢查")
+    args = parser.parse_args()
+
+    eager_model = load_eager_model()
+    scripted_model = export_torchscript(eager_model)
+    if args.onnx:
+        export_onnx(eager_model)
+
+    if args.skip_check:
+        return
+    # 重新載入存檔，確認實際部署的檔案與原始模型一致
+    deployed = optimize_loaded(torch.jit.load(SCRIPTED_PATH, map_location="cpu"))
+    batch = load_scoreboard_batch()
+    ok = check_parity(eager_model, deployed, batch)
+    print(f"Eager: {benchmark(eager_model, batch):.3f} ms/張 | TorchScript: {benchmark(scripted_model, batch):.3f} ms/張")
+    if not ok:
+        raise SystemExit("匯出的模型與原始模型預測不一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 import torch
 import torch.nn as nn
 from torch.utils.data import Dataset
@@ -5,20 +6,99 @@ import scipy.io
 import numpy as np
 from PIL import Image
 
+# --- 預先轉換、以 memmap 開啟的 SVHN 快取 ---
+# scipy.io.loadmat 每次訓練都要解析超過 1 GB 的 .mat 並在記憶體中保留完整副本，
+# transpose + astype 又再複製一次。第一次使用時將 .mat 轉成 uint8 的 .npy
+# (影像為 [N, H, W, C]，Image.fromarray 可直接使用；標籤已把 10 換成 0)，
+# 之後以 np.load(mmap_mode="r") 開啟：啟動只需要幾秒，每個 DataLoader worker 共用同一份檔案頁面，
+# 記憶體不會隨 worker 數增加。SVHNDataset 只保存快取路徑並在第一次使用時才開啟 memmap；
+# memmap 被 pickle 時會變成完整的陣列副本，因此 spawn 啟動的 worker (Windows / macOS 的預設)
+# 收到的資料集不含陣列，由各 worker 自行重新開啟 (見 __getstate__)。
+
+def npy_cache_paths(mat_path):
+    stem = os.path.splitext(mat_path)[0]
+    return stem + "_images.npy", stem + "_labels.npy"
+
+def convert_mat_to_npy(mat_path, chunk_size=65536):
+    """將 SVHN 的 .mat 轉成 uint8 的 .npy 快取，返回 (影像路徑, 標籤路徑)。"""
+    images_path, labels_path = npy_cache_paths(mat_path)
+    data = scipy.io.loadmat(mat_path)
+    X = data['X']  # [H, W, C, N]
+    labels = data['y'].flatten().astype(np.uint8)
+    labels[labels == 10] = 0
+
+    # 先寫入暫存檔再改名，轉換中斷時不會留下不完整的快取
+    tmp_images = images_path + ".tmp.npy"
+    images = np.lib.format.open_memmap(tmp_images, mode="w+", dtype=np.uint8, shape=(X.shape[3],) + X.shape[:3])
+    for start in range(0, X.shape[3], chunk_size): # 分段轉置，避免再配置一份完整的陣列
+        images[start:start + chunk_size] = np.transpose(X[..., start:start + chunk_size], (3, 0, 1, 2))
+    images.flush()
+    del images
+    tmp_labels = labels_path + ".tmp.npy"
+    np.save(tmp_labels, labels)
+    os.replace(tmp_images, images_path)
+    os.replace(tmp_labels, labels_path)
+    return images_path, labels_path
+
+def _cache_is_fresh(mat_path, cache_paths):
+    if not all(os.path.exists(p) for p in cache_paths):
+        return False
+    if not os.path.exists(mat_path): # 只有快取 (例如已刪除原始 .mat) 時直接使用
+        return True
+    return min(os.path.getmtime(p) for p in cache_paths) >= os.path.getmtime(mat_path)
+
 class SVHNDataset(Dataset):
-    def __init__(self, mat_path, transform=None):
-        data = scipy.io.loadmat(mat_path)
-        self.images = np.transpose(data['X'], (3, 2, 0, 1)).astype(np.uint8)  # [N, C, H, W]
-        self.labels = data['y'].flatten()
-        self.labels[self.labels == 10] = 0
+    def __init__(self, mat_path, transform=None, use_cache=True, raw=False):
+        """
+        Args:
+            mat_path (str): SVHN 的 .mat 檔案 (train_32x32.mat 等)。
+            transform (callable, optional): 套用在 PIL.Image 上的轉換。
+            use_cache (bool): 使用 (必要時先建立) 旁邊的 .npy 快取並以 memmap 開啟；
+                              False 時與過去相同，直接以 loadmat 讀入記憶體。
+            raw (bool): 直接返回 uint8 的 [H, W, C] 陣列，不建立 PIL.Image 也不套用 transform；
+                        搭配 augment.BatchAugment 作為 collate_fn 以整批處理。
+        """
+        self._cache_paths = None
+        self._images = self._labels = None
+        if use_cache:
+            cache_paths = npy_cache_paths(mat_path)
+            if not _cache_is_fresh(mat_path, cache_paths):
+                print(f"正在將 {mat_path} 轉換為 .npy 快取 (只需要一次)...")
+                convert_mat_to_npy(mat_path)
+            self._cache_paths = cache_paths # memmap 延後到第一次使用時開啟
+        else:
+            data = scipy.io.loadmat(mat_path)
+            self._images = np.transpose(data['X'], (3, 0, 1, 2)).astype(np.uint8)  # [N, H, W, C]
+            self._labels = data['y'].flatten()
+            self._labels[self._labels == 10] = 0
         self.transform = transform
+        self.raw = raw
+
+    @property
+    def images(self):
+        if self._images is None:
+            self._images = np.load(self._cache_paths[0], mmap_mode="r")  # [N, H, W, C]
+        return self._images
+
+    @property
+    def labels(self):
+        if self._labels is None:
+            self._labels = np.load(self._cache_paths[1], mmap_mode="r")
+        return self._labels
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self._cache_paths is not None: # 只傳送路徑，worker 中重新開啟 memmap
+            state["_images"] = state["_labels"] = None
+        return state
 
     def __len__(self):
         return len(self.labels)
 
     def __getitem__(self, idx):
-        img = self.images[idx]  # shape: [C, H, W]
-        img = np.transpose(img, (1, 2, 0))  # 轉成 [H, W, C]
+        img = np.asarray(self.images[idx])  # shape: [H, W, C]
+        if self.raw:
+            return img, self.labels[idx]
         img = Image.fromarray(img)  # ✅ 轉成 PIL.Image，才能用 ToPILImage 和 ColorJitter 等 transform
         if self.transform:
             img = self.transform(img)
@@ -0,0 +1,31 @@
+import argparse
+import os
+import time
+
+from model import convert_mat_to_npy
+
+# --- 預先將 SVHN 的 .mat 轉成 .npy 快取 ---
+# SVHNDataset 第一次開啟某個 .mat 時也會自動轉換；這個指令可以在訓練前先完成轉換
+# (例如在資料準備機器上執行一次)，或在 .mat 更新後強制重新轉換。
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FILES = ["train_32x32.mat", "extra_32x32.mat", "test_32x32.mat"]
+
+def main():
+    parser = argparse.ArgumentParser(description="將 SVHN 的 .mat 轉成 uint8 的 .npy 快取 (以 memmap 開啟)")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES, help="要轉換的 .mat 檔案 (預設為 train / extra / test)")
+    args = parser.parse_args()
+
+    for name in args.files:
+        mat_path = name if os.path.isabs(name) or os.path.exists(name) else os.path.join(BASE_DIR, name)
+        if not os.path.exists(mat_path):
+            print(f"找不到 {mat_path}，略過。")
+            continue
+        start = time.perf_counter()
+        images_path, labels_path = convert_mat_to_npy(mat_path)
+        size_mb = (os.path.getsize(images_path) + os.path.getsize(labels_path)) / 1024 / 1024
+        print(f"{mat_path} -> {images_path} ({size_mb:.1f} MB, {time.perf_counter() - start:.1f} 秒)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import io
+import os
+import time
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Subset
+from torchvision import transforms
+
+from export_model import BASE_DIR, SCOREBOARD_DIR, WEIGHTS_DIGEST_KEY, load_eager_model, preprocess, weights_sha1
+
+# --- SVHNCNN 的動態 int8 量化 ---
+# fc 區塊 (Linear(64*8*8, 256)) 佔了大部分的權重與運算量，動態量化將 Linear 權重轉為 int8，
+# 激活值的量化範圍在推論時動態計算。量化後的模型以 TorchScript 存成 svhn_cnn_int8.pt，
+# recognize_score.py 設定 RECOGNIZE_MODEL_FORMAT=int8 時載入。
+# 評估資料：SVHN test_32x32.mat (若存在) + scoreboard_images 中個位數比分的左右半邊，
+# 輸出 float 與 int8 模型的準確率差異、模型大小與單張延遲，方便在切換前評估取捨。
+
+INT8_PATH = os.path.join(BASE_DIR, "svhn_cnn_int8.pt")
+SVHN_TEST_PATH = os.path.join(BASE_DIR, "test_32x32.mat")
+LABEL_FILE = os.path.join(SCOREBOARD_DIR, "label.txt")
+
+def quantize(model):
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def model_size_bytes(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+def load_scoreboard_labeled(image_dir=SCOREBOARD_DIR, label_file=LABEL_FILE):
+    """讀取 label.txt 中的個位數比分，返回 (影像 tensor, 標籤 tensor)。多位數的比分無法以單一類別評估，略過。"""
+    tensors, labels = [], []
+    with open(label_file, "r") as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) != 3:
+                continue
+            image = cv2.imread(os.path.join(image_dir, parts[0]))
+            if image is None:
+                continue
+            center_x = image.shape[1] // 2 # 與 crop_score_regions 相同的左右切分
+            for region, score in zip((image[:, :center_x], image[:, center_x:]), (int(parts[1]), int(parts[2]))):
+                if score < 10:
+                    tensors.append(preprocess(np.ascontiguousarray(region)))
+                    labels.append(score)
+    if not tensors:
+        return None
+    return torch.stack(tensors), torch.tensor(labels)
+
+def load_svhn_test(limit):
+    if not os.path.exists(SVHN_TEST_PATH):
+        print(f"找不到 {SVHN_TEST_PATH}，只使用 scoreboard_images 評估。")
+        return None
+    from model import SVHNDataset
+    dataset = SVHNDataset(SVHN_TEST_PATH, transform=transforms.ToTensor())
+    if limit:
+        dataset = Subset(dataset, range(min(limit, len(dataset))))
+    return DataLoader(dataset, batch_size=256, shuffle=False)
+
+def accuracy(model, batches):
+    correct = total = 0
+    with torch.no_grad():
+        for imgs, labels in batches:
+            preds = model(imgs).argmax(dim=1)
+            correct += int((preds == labels.long()).sum())
+            total += labels.size(0)
+    return correct / total if total else float("nan")
+
+def latency_ms(model, repeats=200):
+    x = torch.rand(1, 3, 32, 32)
+    with torch.no_grad():
+        for _ in range(10): # 暖機
+            model(x)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(x)
+    return (time.perf_counter() - start) / repeats * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="產生並評估 SVHNCNN 的動態 int8 量化模型")
+    parser.add_argument("--svhn-limit", type=int, default=0, help="只使用前 N 張 SVHN 測試圖片 (0 表示全部)")
+    args = parser.parse_args()
+
+    float_model = load_eager_model()
+    int8_model = quantize(float_model)
+
+    scripted = torch.jit.trace(int8_model, torch.rand(1, 3, 32, 32))
+    scripted.save(INT8_PATH, _extra_files={WEIGHTS_DIGEST_KEY: weights_sha1()})
+    print(f"int8 模型已儲存為 {INT8_PATH}")
+
+    eval_sets = {}
+    svhn_loader = load_svhn_test(args.svhn_limit)
+    if svhn_loader is not None:
+        eval_sets["SVHN test"] = svhn_loader
+    scoreboard = load_scoreboard_labeled()
+    if scoreboard is not None:
+        eval_sets["scoreboard_images"] = [scoreboard]
+
+    print(f"{'資料集':<20}{'float':>10}{'int8':>10}{'差異':>10}")
+    for name, batches in eval_sets.items():
+        float_acc = accuracy(float_model, batches)
+        int8_acc = accuracy(int8_model, batches)
+        print(f"{name:<20}{float_acc:>10.4f}{int8_acc:>10.4f}{int8_acc - float_acc:>+10.4f}")
+
+    float_size = model_size_bytes(float_model)
+    int8_size = model_size_bytes(int8_model)
+    print(f"模型大小: float {float_size / 1024:.1f} KB | int8 {int8_size / 1024:.1f} KB ({int8_size / float_size:.1%})")
+    print(f"單張延遲: float {latency_ms(float_model):.3f} ms | int8 {latency_ms(int8_model):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
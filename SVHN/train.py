@@ -1,113 +1,204 @@
+import argparse
+import os
+import random
+import time
+import numpy as np
 import torch
 import torch.optim as optim
 from torch.utils.data import DataLoader
-from torchvision import transforms
 from model import SVHNCNN, SVHNDataset
+from augment import BatchAugment
+from evaluate import ConfusionMatrix, evaluate
 from tqdm import tqdm
-from sklearn.metrics import confusion_matrix
-import seaborn as sns
-import matplotlib.pyplot as plt
 from torch.utils.data import ConcatDataset
 
-
-
-def train():
+# --- 訓練吞吐量設定 ---
+# DataLoader 預設 num_workers=0，資料增強與模型在同一個程序中輪流執行；這裡自動使用多個 worker、
+# persistent_workers 與 prefetch_factor，讓下一批資料在模型計算時就準備好 (GPU 時另外 pin_memory)。
+# loss / 正確數在 tensor 上累加，不再每一步呼叫 .item() 強制同步，只在更新進度列時讀取。
+# 每個 epoch 印出等待資料與計算的時間，以及每秒處理的張數。
+
+PREFETCH_FACTOR = 4
+LOG_EVERY = 50 # 每幾步更新一次進度列
+
+# --- 檢查點與提早停止 ---
+# 每個 epoch 結束時把模型、optimizer、StepLR 與亂數狀態存成 svhn_checkpoint.pt，中斷後以 --resume 從下一個 epoch 接續。
+# 驗證準確率創新高時才寫入 svhn_cnn_weights.pth (因此它永遠是最佳的權重)；
+# 連續 patience 個 epoch 沒有提升超過 min_delta 就提早停止。
+WEIGHTS_PATH = 'svhn_cnn_weights.pth'
+CHECKPOINT_PATH = 'svhn_checkpoint.pt'
+CONFUSION_MATRIX_PREFIX = 'confusion_matrix' # 輸出 confusion_matrix.png / confusion_matrix.csv
+
+def default_workers():
+    return max(0, min(8, (os.cpu_count() or 1) - 1))
+
+def loader_options(device, workers=None):
+    """DataLoader 的平行與預取設定。"""
+    if workers is None:
+        workers = default_workers()
+    options = {"num_workers": workers, "pin_memory": device.type == 'cuda'}
+    if workers > 0:
+        options.update(persistent_workers=True, prefetch_factor=PREFETCH_FACTOR)
+    return options
+
+
+def _atomic_save(obj, path):
+    tmp_path = path + ".tmp"
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path) # 中斷時不會留下寫到一半的檔案
+
+def rng_state():
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+def set_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+def save_checkpoint(path, epoch, model, optimizer, scheduler, best_acc, stale_epochs):
+    _atomic_save({
+        "epoch": epoch,
+        "model": model.state_dict(),
+        "optimizer": optimizer.state_dict(),
+        "scheduler": scheduler.state_dict(),
+        "best_acc": best_acc,
+        "stale_epochs": stale_epochs,
+        "rng": rng_state(),
+    }, path)
+
+def load_checkpoint(path, model, optimizer, scheduler, device):
+    """載入檢查點，返回 (下一個 epoch, 最佳驗證準確率, 未提升的 epoch 數)。"""
+    checkpoint = torch.load(path, map_location=device, weights_only=False)
+    model.load_state_dict(checkpoint["model"])
+    optimizer.load_state_dict(checkpoint["optimizer"])
+    scheduler.load_state_dict(checkpoint["scheduler"])
+    set_rng_state(checkpoint["rng"])
+    return checkpoint["epoch"] + 1, checkpoint["best_acc"], checkpoint["stale_epochs"]
+
+
+def train(workers=None, epochs=10, resume=False, patience=3, min_delta=0.001):
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
-    train_transform = transforms.Compose([
-        transforms.RandomRotation(15),
-        transforms.ColorJitter(brightness=0.3, contrast=0.3),
-        transforms.ToTensor()
-    ])
+    # RandomRotation(15) + ColorJitter(brightness=0.3, contrast=0.3) + ToTensor 改為整批的 tensor 運算 (見 augment.py)
+    train_collate = BatchAugment(rotation=15, brightness=0.3, contrast=0.3)
+    test_collate = BatchAugment(train=False) # 只做 ToTensor
 
-    test_transform = transforms.Compose([
-        transforms.ToTensor()
-    ])
-
-    #train_dataset = SVHNDataset('extra_32x32.mat', transform=train_transform)
-    dataset1 = SVHNDataset('extra_32x32.mat', transform=train_transform)
-    dataset2 = SVHNDataset('train_32x32.mat', transform=train_transform)
+    #train_dataset = SVHNDataset('extra_32x32.mat', raw=True)
+    dataset1 = SVHNDataset('extra_32x32.mat', raw=True)
+    dataset2 = SVHNDataset('train_32x32.mat', raw=True)
     
     train_dataset = ConcatDataset([dataset1, dataset2])
 
-    test_dataset = SVHNDataset('test_32x32.mat', transform=test_transform)
+    test_dataset = SVHNDataset('test_32x32.mat', raw=True)
 
-    train_loader = DataLoader(train_dataset, batch_size=128, shuffle=True)
-    test_loader = DataLoader(test_dataset, batch_size=128, shuffle=False)
+    options = loader_options(device, workers)
+    print(f"DataLoader: num_workers={options['num_workers']}, pin_memory={options['pin_memory']}")
+    train_loader = DataLoader(train_dataset, batch_size=128, shuffle=True, collate_fn=train_collate, **options)
+    test_loader = DataLoader(test_dataset, batch_size=128, shuffle=False, collate_fn=test_collate, **options)
 
     model = SVHNCNN().to(device)
     criterion = torch.nn.CrossEntropyLoss()
     optimizer = optim.Adam(model.parameters(), lr=0.001)
     scheduler = torch.optim.lr_scheduler.StepLR(optimizer, step_size=3, gamma=0.5)
 
-    epochs = 10
-    for epoch in range(epochs):
+    start_epoch, best_acc, stale_epochs = 0, 0.0, 0
+    if resume and os.path.exists(CHECKPOINT_PATH):
+        start_epoch, best_acc, stale_epochs = load_checkpoint(CHECKPOINT_PATH, model, optimizer, scheduler, device)
+        print(f"從 {CHECKPOINT_PATH} 接續：第 {start_epoch + 1} 個 epoch 開始，目前最佳 Val Acc {best_acc:.4f}")
+    elif resume:
+        print(f"找不到 {CHECKPOINT_PATH}，從頭開始訓練")
+
+    best_cm = None # 最佳 epoch 在驗證時累加的混淆矩陣
+    for epoch in range(start_epoch, epochs):
+        if stale_epochs >= patience:
+            break # 接續的檢查點已經達到提早停止的條件
         model.train()
-        running_loss = 0.0
-        correct = 0
+        running_loss = torch.zeros((), device=device)
+        correct = torch.zeros((), dtype=torch.long, device=device)
         total = 0
+        steps = 0
+        data_wait = 0.0
 
+        epoch_start = time.perf_counter()
+        wait_start = epoch_start
         loop = tqdm(train_loader, desc=f"Epoch {epoch+1}/{epochs}", leave=False)
         for imgs, labels in loop:
-            imgs, labels = imgs.to(device), labels.to(device).long()
+            data_wait += time.perf_counter() - wait_start
+            imgs = imgs.to(device, non_blocking=True)
+            labels = labels.to(device, non_blocking=True).long()
 
-            optimizer.zero_grad()
+            optimizer.zero_grad(set_to_none=True)
             outputs = model(imgs)
             loss = criterion(outputs, labels)
             loss.backward()
             optimizer.step()
 
-            running_loss += loss.item()
-            preds = outputs.argmax(dim=1)
-            correct += (preds == labels).sum().item()
+            running_loss += loss.detach()
+            correct += (outputs.argmax(dim=1) == labels).sum()
             total += labels.size(0)
+            steps += 1
 
-            loop.set_postfix(loss=running_loss / (total / imgs.size(0)), accuracy=correct / total)
+            if steps % LOG_EVERY == 0:
+                loop.set_postfix(loss=running_loss.item() / steps, accuracy=correct.item() / total)
+            wait_start = time.perf_counter()
 
         scheduler.step()
 
-        train_loss = running_loss / len(train_loader)
-        train_acc = correct / total
+        train_loss = running_loss.item() / max(1, steps)
+        train_acc = correct.item() / max(1, total)
+        epoch_time = time.perf_counter() - epoch_start
+        compute_time = epoch_time - data_wait
 
+        # 驗證的同時累加混淆矩陣，訓練結束後不必再跑一次 test_loader
         model.eval()
-        val_correct = 0
-        val_total = 0
+        cm = ConfusionMatrix(device=device)
         with torch.no_grad():
             for imgs, labels in test_loader:
-                imgs, labels = imgs.to(device), labels.to(device).long()
-                outputs = model(imgs)
-                preds = outputs.argmax(dim=1)
-                val_correct += (preds == labels).sum().item()
-                val_total += labels.size(0)
+                imgs = imgs.to(device, non_blocking=True)
+                labels = labels.to(device, non_blocking=True)
+                cm.update(model(imgs).argmax(dim=1), labels)
 
-        val_acc = val_correct / val_total
+        val_acc = cm.accuracy()
 
         print(f"Epoch {epoch+1}/{epochs} | Train Loss: {train_loss:.4f} | Train Acc: {train_acc:.4f} | Val Acc: {val_acc:.4f}")
-
-    torch.save(model.state_dict(), 'svhn_cnn_weights.pth')
-    print("模型已儲存為 svhn_cnn_weights.pth")
-
-    # 計算並繪製混淆矩陣
-    plot_confusion_matrix(model, test_loader, device)
-
-def plot_confusion_matrix(model, test_loader, device):
-    model.eval()
-    y_true, y_pred = [], []
-    with torch.no_grad():
-        for imgs, labels in test_loader:
-            imgs = imgs.to(device)
-            outputs = model(imgs)
-            preds = outputs.argmax(dim=1).cpu()
-            y_true.extend(labels.numpy())
-            y_pred.extend(preds.numpy())
-
-    cm = confusion_matrix(y_true, y_pred)
-    plt.figure(figsize=(10,8))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.xlabel('Predicted')
-    plt.ylabel('True')
-    plt.title('Confusion Matrix')
-    plt.show()
+        print(f"    {epoch_time:.1f}s (等待資料 {data_wait:.1f}s {data_wait / epoch_time:.0%} | 計算 {compute_time:.1f}s) | {total / epoch_time:,.0f} 張/秒")
+
+        if val_acc > best_acc + min_delta:
+            best_acc, stale_epochs, best_cm = val_acc, 0, cm
+            _atomic_save(model.state_dict(), WEIGHTS_PATH)
+            print(f"    Val Acc 創新高，模型已儲存為 {WEIGHTS_PATH}")
+        else:
+            stale_epochs += 1
+        save_checkpoint(CHECKPOINT_PATH, epoch, model, optimizer, scheduler, best_acc, stale_epochs)
+
+        if stale_epochs >= patience:
+            print(f"Val Acc 連續 {patience} 個 epoch 沒有提升，提早停止 (最佳 {best_acc:.4f})")
+            break
+
+    # 輸出最佳權重的混淆矩陣與各類別 precision / recall；
+    # 只有在接續訓練且這次沒有任何提升時，才需要以最佳權重重新評估一次
+    if best_cm is None and os.path.exists(WEIGHTS_PATH):
+        model.load_state_dict(torch.load(WEIGHTS_PATH, map_location=device))
+        best_cm = evaluate(model, test_loader, device)
+    if best_cm is not None:
+        print(best_cm.report())
+        print("混淆矩陣已輸出為 " + "、".join(best_cm.save(CONFUSION_MATRIX_PREFIX)))
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="訓練 SVHNCNN")
+    parser.add_argument("--workers", type=int, default=None, help=f"DataLoader 的 num_workers (預設為 CPU 核心數 - 1，最多 8；目前 {default_workers()})")
+    parser.add_argument("--epochs", type=int, default=10, help="最多訓練幾個 epoch (預設 10)")
+    parser.add_argument("--resume", action="store_true", help=f"從 {CHECKPOINT_PATH} 接續中斷的訓練")
+    parser.add_argument("--patience", type=int, default=3, help="Val Acc 連續幾個 epoch 沒有提升就停止 (預設 3)")
+    parser.add_argument("--min-delta", type=float, default=0.001, help="視為提升的最小 Val Acc 差距 (預設 0.001)")
+    args = parser.parse_args()
+    train(workers=args.workers, epochs=args.epochs, resume=args.resume, patience=args.patience, min_delta=args.min_delta)
@@ -0,0 +1,85 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# 基準測試不應修改實際的 ROI 設定與比分歷史：在載入 recognize_score 之前關閉這兩項
+os.environ.setdefault("RECOGNIZE_USE_ROI", "0")
+os.environ.setdefault("RECOGNIZE_SMOOTHING", "0")
+
+import state_store
+import recognize_score
+from recognition_cache import RecognitionCache
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# --- 全部球場辨識的基準測試 ---
+# 以 scoreboard_images / score_ocr 中的圖片在暫存資料夾建立 N 個球場 (12、24、48)，
+# 比較逐一解碼與執行緒池解碼 (與推論重疊) 的整體耗時。每輪都清空辨識快取，確保每個球場都會解碼與推論；
+# courts.json 寫入暫存資料夾，不會影響實際的比賽狀態。
+# 每個設定後的括號是相對於 workers=0 (逐一解碼、整批只推論一次) 的加速倍數，小於 1 表示比較慢。
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_DIRS = [os.path.join(BASE_DIR, "scoreboard_images"), os.path.join(BASE_DIR, "score_ocr")]
+
+def collect_images():
+    images = []
+    for image_dir in IMAGE_DIRS:
+        for folder, _, files in os.walk(image_dir):
+            images.extend(os.path.join(folder, f) for f in sorted(files) if f.endswith(".jpg") or f.endswith(".png"))
+    return images
+
+def build_courts(root, court_count, images):
+    """在 root 建立 court_1 ~ court_N，每個球場放一張圖片，並建立對應的 courts.json。"""
+    score_dir = os.path.join(root, "score_ocr")
+    for court_id in range(1, court_count + 1):
+        folder = os.path.join(score_dir, f"court_{court_id}")
+        os.makedirs(folder, exist_ok=True)
+        source = images[(court_id - 1) % len(images)]
+        shutil.copyfile(source, os.path.join(folder, "1" + os.path.splitext(source)[1]))
+    data_file = os.path.join(root, "courts.json")
+    state_store.write_json(data_file, [{"id": f"Court {i}", "score1": "0", "score2": "0", "status": "進行中"} for i in range(1, court_count + 1)])
+    return score_dir, data_file
+
+def time_run(court_count, workers, repeats):
+    timings = []
+    for _ in range(repeats):
+        recognize_score.recognition_cache = RecognitionCache() # 不持久化，每輪從空白開始
+        start = time.perf_counter()
+        recognize_score.recognize_all_courts(court_ids=range(1, court_count + 1), workers=workers)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="比較逐一解碼與執行緒池解碼在不同球場數下的整體耗時")
+    parser.add_argument("--courts", type=int, nargs="+", default=[12, 24, 48], help="球場數 (預設 12 24 48)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4, 8], help="解碼執行緒數 (0 表示逐一解碼，一律作為基準)")
+    parser.add_argument("--repeats", type=int, default=5, help="每個組合重複次數，取中位數 (預設 5)")
+    args = parser.parse_args()
+
+    images = collect_images()
+    if not images:
+        raise SystemExit("找不到任何圖片")
+
+    original = (recognize_score.SCORE_DIR, recognize_score.DATA_FILE, recognize_score.recognition_cache)
+    workers_list = [0] + [w for w in args.workers if w != 0] # 第一欄固定為逐一解碼的基準
+    print(f"{'球場數':<8}" + "".join(f"{f'workers={w}':>24}" for w in workers_list))
+    try:
+        for court_count in args.courts:
+            with tempfile.TemporaryDirectory() as root:
+                recognize_score.SCORE_DIR, recognize_score.DATA_FILE = build_courts(root, court_count, images)
+                for workers in workers_list:
+                    time_run(court_count, workers, 1) # 暖機 (模型、執行緒池)
+                timings = [time_run(court_count, workers, args.repeats) for workers in workers_list]
+            baseline = timings[0]
+            row = "".join(f"{f'{t * 1000:.1f} ms ({baseline / t:.2f}x)':>24}" for t in timings)
+            print(f"{court_count:<8}{row}")
+    finally:
+        recognize_score.SCORE_DIR, recognize_score.DATA_FILE, recognize_score.recognition_cache = original
+
+
+if __name__ == "__main__":
+    main()
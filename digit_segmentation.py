@@ -0,0 +1,93 @@
+import cv2
+
+# --- 比分區域的數字切割 ---
+# crop_score_regions 把畫面切成左右兩半後，每一半可能有多個數字 (例如 "40"、"10")。
+# 這裡找出每個數字的外框，讓 recognize_score.py 把所有數字一起送進 SVHNCNN 做一次批次推論，
+# 再依左到右的順序組回多位數比分。找不到任何數字外框時退回整個區域 (與過去的單一數字行為相同)。
+
+MIN_HEIGHT_RATIO = 0.35 # 數字外框高度至少佔區域高度的比例，用來過濾雜訊
+MAX_WIDTH_RATIO = 0.9   # 幾乎和區域一樣寬的外框多半是邊框，不是數字
+PAD_RATIO = 0.15        # SVHN 的數字周圍有留白，裁切時向外擴張的比例
+PEER_HEIGHT_RATIO = 0.7 # 同一個比分的數字高度相同，比最高的外框矮太多的多半是雜訊 (避免 "1" 被讀成 "17")
+ROW_TOLERANCE = 0.1     # 同一排數字的上下緣最多相差高度的比例
+
+def _binarize(gray):
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # 數字應該是較少的一方：亮字暗底 (LED) 或暗字亮底都轉成白字黑底
+    if cv2.countNonZero(binary) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)
+    # 七段顯示器的筆畫之間有縫隙，先在垂直方向膨脹，把同一個數字連成一塊
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(3, gray.shape[0] // 15)))
+    return cv2.dilate(binary, kernel)
+
+def same_row(a, b):
+    """兩個外框的高度相近且上下緣對齊 (同一排的數字)。"""
+    h = max(a[3], b[3])
+    return (min(a[3], b[3]) >= PEER_HEIGHT_RATIO * h
+            and abs(a[1] - b[1]) <= ROW_TOLERANCE * h
+            and abs(a[1] + a[3] - b[1] - b[3]) <= ROW_TOLERANCE * h)
+
+def _merge_overlapping(boxes):
+    """合併水平方向重疊的外框 (同一個數字被切成上下兩塊時)。"""
+    merged = []
+    for x, y, w, h in sorted(boxes):
+        if merged and x < merged[-1][0] + merged[-1][2]:
+            mx, my, mw, mh = merged[-1]
+            nx, ny = min(mx, x), min(my, y)
+            merged[-1] = (nx, ny, max(mx + mw, x + w) - nx, max(my + mh, y + h) - ny)
+        else:
+            merged.append((x, y, w, h))
+    return merged
+
+def find_digit_boxes(region, max_digits=2):
+    """
+    找出區域中數字的外框。
+
+    Args:
+        region (np.ndarray): BGR 或灰階影像。
+        max_digits (int): 最多保留幾個數字 (依外框高度取最高的幾個；比最高的外框矮太多的不算數字)。
+
+    Returns:
+        list[tuple]: 由左到右排列的 (x, y, w, h)；找不到時為空列表。
+    """
+    gray = region if region.ndim == 2 else cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    if h == 0 or w == 0:
+        return []
+    binary = _binarize(gray)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary)
+
+    boxes = []
+    for i in range(1, count): # 0 是背景
+        x, y, bw, bh = (int(v) for v in stats[i, :4])
+        if bh >= MIN_HEIGHT_RATIO * h and bw <= MAX_WIDTH_RATIO * w:
+            boxes.append((x, y, bw, bh))
+    boxes = _merge_overlapping(boxes)
+    if not boxes:
+        return []
+    # 碰到左右邊界的區塊可能是被 ROI 切到的數字，也可能是 ROI 為了保留位數而包含的記分板外側背景；
+    # 有完整的數字時，只保留與它上下緣對齊的 (同一個比分的數字)
+    inner = [b for b in boxes if b[0] > 0 and b[0] + b[2] < w]
+    if inner:
+        boxes = [b for b in boxes if b in inner or any(same_row(b, i) for i in inner)]
+    tallest = max(b[3] for b in boxes)
+    boxes = [b for b in boxes if b[3] >= PEER_HEIGHT_RATIO * tallest]
+    boxes = sorted(boxes, key=lambda b: b[3], reverse=True)[:max(1, max_digits)]
+    return sorted(boxes)
+
+def segment_digits(region, max_digits=2):
+    """
+    將比分區域切成單一數字的影像 (由左到右)。找不到數字時返回 [region]。
+    """
+    boxes = find_digit_boxes(region, max_digits)
+    if not boxes:
+        return [region]
+    h, w = region.shape[:2]
+    crops = []
+    for x, y, bw, bh in boxes:
+        pad = int(round(PAD_RATIO * bh))
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(w, x + bw + pad), min(h, y + bh + pad)
+        crops.append(region[y0:y1, x0:x1])
+    return crops
@@ -0,0 +1,98 @@
+import os
+import re
+import shutil
+import sys
+import threading
+
+# --- 各球場最新影格的索引 ---
+# 原本每個球場每一輪都 sorted(os.listdir(folder)) 再取最後一個，成本為 O(n log n)，
+# 而且是字典序：9.jpg 會排在 10.jpg、22.jpg 之後。比賽日當天資料夾會累積上千張影格。
+# 這裡改為：
+# * 以檔名中的最後一段數字排序 (9.jpg < 10.jpg；frame_0009.jpg 之類的命名也適用)，沒有數字的檔名排在最前面。
+# * 快取每個資料夾的 mtime 與最新的檔名：資料夾沒有新增 / 刪除 / 改名時只需要一次 stat；
+#   有變動時才以 os.scandir 掃描一次 (O(n)，不排序)。
+# * 可選的保留策略：只保留最新的 N 張，較舊的影格刪除或移到封存資料夾。
+
+IMAGE_EXTENSIONS = (".jpg", ".png")
+_NUMBER_PATTERN = re.compile(r"(\d+)(?!.*\d)")
+
+def frame_sort_key(name):
+    """影格檔名的排序鍵：依最後一段數字排序，數字相同時再比較檔名。"""
+    match = _NUMBER_PATTERN.search(os.path.splitext(name)[0])
+    return (int(match.group(1)) if match else -1, name)
+
+
+class FrameIndex:
+    """快取各資料夾最新影格的檔名，資料夾的 mtime 改變時才重新掃描。"""
+
+    def __init__(self, retain=0, archive_dir=None):
+        """
+        Args:
+            retain (int): 每個資料夾保留最新的幾張影格；0 表示不清理。
+            archive_dir (str, optional): 較舊的影格移到 archive_dir/<資料夾名稱>/；為 None 時直接刪除。
+        """
+        self.retain = retain
+        self.archive_dir = archive_dir
+        self._entries = {}  # folder -> (mtime_ns, latest_name, frame_count)
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def latest(self, folder):
+        """
+        返回資料夾中最新影格的路徑。
+
+        Returns:
+            str | None: 影格路徑；資料夾不存在或沒有影格時返回 None。
+
+        Raises:
+            FileNotFoundError: 資料夾不存在。
+        """
+        mtime_ns = os.stat(folder).st_mtime_ns
+        entry = self._entries.get(folder)
+        if entry is None or entry[0] != mtime_ns:
+            entry = self._scan(folder)
+        return os.path.join(folder, entry[1]) if entry[1] is not None else None
+
+    def _scan(self, folder):
+        with self._lock:
+            # 先取得 mtime 再掃描：掃描期間有新檔案時 mtime 會不同，下一次呼叫就會重新掃描
+            mtime_ns = os.stat(folder).st_mtime_ns
+            names = []
+            with os.scandir(folder) as entries:
+                for item in entries:
+                    if item.name.endswith(IMAGE_EXTENSIONS) and item.is_file():
+                        names.append(item.name)
+            self.scans += 1
+            if self.retain and len(names) > self.retain:
+                names = self._apply_retention(folder, names)
+                mtime_ns = os.stat(folder).st_mtime_ns
+            latest = max(names, key=frame_sort_key) if names else None
+            entry = (mtime_ns, latest, len(names))
+            self._entries[folder] = entry
+            return entry
+
+    def _apply_retention(self, folder, names):
+        """刪除或封存最新 retain 張以外的影格，返回保留下來的檔名。"""
+        names.sort(key=frame_sort_key)
+        expired, kept = names[:-self.retain], names[-self.retain:]
+        if self.archive_dir:
+            target = os.path.join(self.archive_dir, os.path.basename(os.path.normpath(folder)))
+            os.makedirs(target, exist_ok=True)
+        for name in expired:
+            path = os.path.join(folder, name)
+            try:
+                if self.archive_dir:
+                    shutil.move(path, os.path.join(target, name))
+                else:
+                    os.remove(path)
+            except OSError as e:
+                print(f"[{os.path.basename(__file__)}] ERROR: Failed to prune {path}: {e}", file=sys.stderr)
+        return kept
+
+    def invalidate(self, folder=None):
+        """清除單一資料夾 (或全部) 的快取。"""
+        with self._lock:
+            if folder is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(folder, None)
@@ -1,49 +1,32 @@
-import json
-import os
+import state_store
 
 # --- 配置檔案名稱 ---
-# 這些變數應該與您在 schedule_manager.py 中使用的檔案名稱一致
-DATA_FILE = "courts.json"       # 用於儲存球場狀態和排程資訊
-SCHEDULE_FILE = "mainDraw.json" # 用於儲存賽程表和比賽結果 (勝者)
+# 與 schedule_manager.py、recognize_score.py 共用 state_store 中的檔案路徑
+DATA_FILE = state_store.DATA_FILE         # 用於儲存球場狀態和排程資訊
+SCHEDULE_FILE = state_store.SCHEDULE_FILE # 用於儲存賽程表和比賽結果 (勝者)
 
 # --- 輔助函數：讀取和寫入 courts.json ---
 def load_data():
     """從 courts.json 載入球場數據"""
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            #print(f"錯誤：{DATA_FILE} 檔案內容無效，將初始化為空列表。")
-            return []
-    return [] # 如果檔案不存在，返回空列表
+    return state_store.load(DATA_FILE) # 檔案不存在或內容無效時返回空列表
 
 def save_data(data):
     """將球場數據存回 courts.json"""
     try:
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except IOError as e:
+        state_store.save(DATA_FILE, data) # 原子性寫入，並與其他程序互斥
+    except (IOError, state_store.StateLockTimeout) as e:
         print(f"寫入 {DATA_FILE} 檔案時發生錯誤: {e}")
 
 # --- 輔助函數：讀取和寫入 mainDraw.json ---
 def load_main_draw_data():
     """從 mainDraw.json 載入賽程數據"""
-    if os.path.exists(SCHEDULE_FILE):
-        try:
-            with open(SCHEDULE_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"錯誤：{SCHEDULE_FILE} 檔案內容無效，將初始化為空列表。")
-            return []
-    return [] # 如果檔案不存在，返回空列表
+    return state_store.load(SCHEDULE_FILE) # 檔案不存在或內容無效時返回空列表
 
 def save_main_draw_data(main_draw_data):
     """將賽程數據存回 mainDraw.json"""
     try:
-        with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-            json.dump(main_draw_data, f, ensure_ascii=False, indent=2)
-    except IOError as e:
+        state_store.save(SCHEDULE_FILE, main_draw_data) # 原子性寫入，並與其他程序互斥
+    except (IOError, state_store.StateLockTimeout) as e:
         print(f"寫入 {SCHEDULE_FILE} 檔案時發生錯誤: {e}")
 
 # --- 輔助函數：初始化 courts.json 為指定狀態 ---
@@ -520,8 +503,10 @@ def main():
     print("--- 系統啟動 ---")
     
     # --- 在這裡呼叫初始化函數來設定預設狀態 ---
-    initialize_courts_data_to_specific_state()
-    initialize_main_draw_to_specific_state() # 初始化 mainDraw.json 
+    # 兩個檔案在同一把鎖內重置，排程或辨識程序不會看到只重置了一半的狀態
+    with state_store.locked(DATA_FILE, SCHEDULE_FILE):
+        initialize_courts_data_to_specific_state()
+        initialize_main_draw_to_specific_state() # 初始化 mainDraw.json 
     
     print(f"請檢查 {DATA_FILE} 和 {SCHEDULE_FILE} 的內容是否已更新為預設狀態。")
 
@@ -0,0 +1,167 @@
+# --- 比分狀態判斷 ---
+# 記分板的同一個位置在不同時間會顯示不同的數字：局數、局內得分 (0 / 15 / 30 / 40)
+# 或搶七的得分 (例如 "24 23"、"18 19")。MAX_DIGITS 預設為 2 之後這些讀數都會變成兩位數，
+# 若直接套用局數規則，"40 15" 會被判定為「比賽結束」，排程器就在局中結束比賽。
+#
+# 單看數值無法分辨局數與搶七得分：搶七中的 "6 4" 看起來就是 6:4 的最終局數，
+# 而長盤 (advantage set) 或 pro-set 的局數可以超過 7 (例如 8:6、10:8)。
+# MatchTracker 為每個球場記住目前比賽已經出現過的局數：局數只會遞增，出現 6:6 之後的讀數
+# 都當作搶七得分，直到搶七分出勝負 (先拿到 7 分且領先 2 分) 或記分板顯示 7:6 的最終局數。
+# 不依賴 torch / cv2，可單獨匯入與測試。
+import json
+import os
+import sys
+import traceback
+
+import state_store
+
+FINISHED = "比賽結束"
+IN_PROGRESS = "進行中"
+
+GAMES_TO_WIN = int(os.environ.get("MATCH_GAMES_TO_WIN", "6"))          # 先拿到 6 局且領先 2 局；pro-set 設為 8
+TIEBREAK = os.environ.get("MATCH_TIEBREAK", "1") == "1"                 # 0：長盤，局數平手時繼續打到領先 2 局
+TIEBREAK_POINTS = int(os.environ.get("MATCH_TIEBREAK_POINTS", "7"))     # 搶七先拿到 7 分且領先 2 分
+MAX_GAME_STEP = 3       # 兩次讀數之間最多增加的局數 (容許漏掉幾張影格)；增加更多時不是局數
+POINT_VALUES = (0, 15, 30, 40)
+
+def parse_score(s):
+    try:
+        return int(s)
+    except ValueError:
+        return 0
+
+def is_point_score(s1, s2):
+    """局內得分 (0 / 15 / 30 / 40，至少一方不是 0)；"0 0" 與局數 0:0 無法分辨，但兩者都不會結束比賽。"""
+    return s1 in POINT_VALUES and s2 in POINT_VALUES and max(s1, s2) >= 15
+
+def games_finished(g1, g2, games_to_win=GAMES_TO_WIN, tiebreak=TIEBREAK):
+    """局數是否已分出勝負：達到 games_to_win 且領先 2 局，或搶七後的 7:6。"""
+    if max(g1, g2) >= games_to_win and abs(g1 - g2) >= 2:
+        return True
+    return tiebreak and sorted((g1, g2)) == [games_to_win, games_to_win + 1]
+
+def compute_match_status(s1, s2):
+    """
+    沒有比賽進度時的判斷：局內得分一律視為進行中，其他讀數當作局數。
+    搶七得分只有在分出勝負時 (例如 "9 7") 才會領先 2 分以上，所以同樣會結束比賽；
+    無法分辨的是搶七中低於 7 分的讀數 (例如 "6 4")，需要 MatchTracker 的進度。
+    """
+    if is_point_score(s1, s2):
+        return IN_PROGRESS
+    return FINISHED if games_finished(s1, s2) else IN_PROGRESS
+
+
+class MatchTracker:
+    """
+    依每個球場目前比賽的進度判斷讀數是局數、局內得分還是搶七得分。
+
+    每個球場記錄 {"match": 場次編號, "games": [g1, g2] | None, "tiebreak": [t1, t2] | None}：
+    * 局數只會遞增，且兩次讀數之間最多增加 max_game_step 局；不符合的讀數不是局數，視為進行中。
+    * 局數來到 games_to_win:games_to_win (6:6) 之後進入搶七，讀數都當作搶七得分，
+      先拿到 tiebreak_points 分且領先 2 分時比賽結束。
+    * 搶七中讀到 7:6 時，若已看過搶七得分且 7:6 仍可能是接下來的搶七得分則視為進行中，
+      否則是搶七結束後顯示的最終局數。
+    * 場次編號 (current_match_number) 改變時重新開始。
+    """
+
+    def __init__(self, state_file=None, games_to_win=GAMES_TO_WIN, tiebreak=TIEBREAK,
+                 tiebreak_points=TIEBREAK_POINTS, max_game_step=MAX_GAME_STEP):
+        """
+        Args:
+            state_file (str, optional): 比賽進度持久化的 JSON 檔案路徑；為 None 時只存在記憶體中。
+            games_to_win (int): 贏得比賽所需的局數。
+            tiebreak (bool): 局數平手於 games_to_win 時是否打搶七。
+            tiebreak_points (int): 贏得搶七所需的分數。
+            max_game_step (int): 兩次讀數之間最多增加的局數。
+        """
+        self.state_file = state_file
+        self.games_to_win = games_to_win
+        self.tiebreak = tiebreak
+        self.tiebreak_points = tiebreak_points
+        self.max_game_step = max_game_step
+        self.courts = {}  # court_id (str) -> {"match": ..., "games": [g1, g2] | None, "tiebreak": [t1, t2] | None}
+        self._dirty = False
+        if state_file:
+            self.load()
+
+    def _court(self, court_id, match_number):
+        court = self.courts.get(str(court_id))
+        if court is None or court.get("match") != match_number:
+            court = self.courts[str(court_id)] = {"match": match_number, "games": None, "tiebreak": None}
+            self._dirty = True
+        return court
+
+    def _in_tiebreak(self, games):
+        return self.tiebreak and games is not None and games[0] == games[1] == self.games_to_win
+
+    def _is_next_games(self, games, s1, s2):
+        """讀數是否可能是 games 之後的局數；尚未看過局數 (例如中途才開始追蹤) 時任何讀數都可能是局數。"""
+        if games is None:
+            return True
+        return s1 >= games[0] and s2 >= games[1] and (s1 + s2) - sum(games) <= self.max_game_step
+
+    def observe(self, court_id, match_number, s1, s2):
+        """
+        加入一組讀數並返回球場狀態。
+
+        Args:
+            court_id: 球場編號。
+            match_number: 球場目前的場次編號 (courts.json 的 current_match_number)。
+            s1, s2 (int): 兩位選手的讀數。
+
+        Returns:
+            str: FINISHED 或 IN_PROGRESS。
+        """
+        court = self._court(court_id, match_number)
+        if is_point_score(s1, s2):
+            return IN_PROGRESS
+
+        games = court["games"]
+        if self._in_tiebreak(games):
+            tiebreak = court["tiebreak"]
+            final = sorted((s1, s2)) == [self.games_to_win, self.games_to_win + 1]
+            if final and not (tiebreak is not None and s1 >= tiebreak[0] and s2 >= tiebreak[1]):
+                return FINISHED # 搶七結束後顯示的最終局數
+            if [s1, s2] != games and [s1, s2] != tiebreak:
+                court["tiebreak"] = [s1, s2] # 記分板在搶七中仍可能顯示 6:6 的局數，不當作搶七得分
+                self._dirty = True
+            if max(s1, s2) >= self.tiebreak_points and abs(s1 - s2) >= 2:
+                return FINISHED
+            return IN_PROGRESS
+
+        if not self._is_next_games(games, s1, s2):
+            return IN_PROGRESS # 局數不會減少或一次跳很多局：搶七得分 (漏看了 6:6) 或誤判
+        if games != [s1, s2]:
+            court["games"] = [s1, s2]
+            self._dirty = True
+        return FINISHED if games_finished(s1, s2, self.games_to_win, self.tiebreak) else IN_PROGRESS
+
+    def reset(self, court_id=None):
+        """清除單一球場 (或全部) 的比賽進度。"""
+        if court_id is None:
+            self.courts.clear()
+        else:
+            self.courts.pop(str(court_id), None)
+        self._dirty = True
+
+    def load(self):
+        """從 state_file 載入比賽進度，檔案不存在或損毀時從空白開始。"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                self.courts = json.load(f).get("courts", {})
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            print(f"[{os.path.basename(__file__)}] WARNING: Ignoring unreadable match progress {self.state_file}: {e}", file=sys.stderr)
+            self.courts = {}
+
+    def save(self):
+        """有變動時將比賽進度寫回 state_file。"""
+        if not self.state_file or not self._dirty:
+            return
+        try:
+            state_store.write_json(self.state_file, {"courts": self.courts})
+            self._dirty = False
+        except OSError as e:
+            print(f"[{os.path.basename(__file__)}] ERROR: Failed to write match progress {self.state_file}: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
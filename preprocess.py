@@ -0,0 +1,107 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# --- 不經過 PIL 的比分區域前處理 ---
+# 原本的流程是 numpy -> transforms.ToPILImage() -> PIL Resize -> ToTensor，每個區域都要
+# 建立 PIL 影像並多次配置、複製記憶體。這裡改為直接在 uint8 tensor 上做 antialias 的 bilinear 縮放
+# (torch 的實作與 PIL 的 Resize 使用相同的三角濾波，結果與原本的流程相差不超過 1/255)，
+# 再寫入預先配置好的 float32 NCHW 緩衝區，整批只產生一個 tensor (與緩衝區共用記憶體)。
+# 起初用的 cv2.INTER_AREA 是面積平均，以內附圖片量測個別像素的誤差可達 0.2，會讓部分數字的預測與原本不同。
+#
+# 色彩順序：cv2.imread 讀到的是 BGR，而原本的流程把 BGR 陣列原封不動送進模型，
+# 因此預設 color_order="bgr" 以保持既有的辨識結果；設為 "rgb" 則會先轉成 RGB
+# (與 SVHN 訓練資料相同)。
+
+INPUT_SIZE = 32
+
+class RegionPreprocessor:
+    """將多個影像區域轉成 (N, 3, 32, 32) 的 float32 tensor，緩衝區在多次呼叫間重複使用。"""
+
+    def __init__(self, size=INPUT_SIZE, color_order="bgr", capacity=64):
+        if color_order not in ("bgr", "rgb"):
+            raise ValueError(f"color_order 必須是 'bgr' 或 'rgb'，收到 {color_order!r}")
+        self.size = size
+        self.color_order = color_order
+        self._buffer = np.empty((capacity, 3, size, size), dtype=np.float32)
+
+    def _ensure_capacity(self, n):
+        if n > self._buffer.shape[0]:
+            self._buffer = np.empty((max(n, 2 * self._buffer.shape[0]), 3, self.size, self.size), dtype=np.float32)
+
+    def _resize(self, region):
+        """縮放成 (C, size, size) 的 uint8 陣列；灰階區域為 C = 1。"""
+        image = torch.from_numpy(np.ascontiguousarray(region))
+        image = image[None, None] if region.ndim == 2 else image.permute(2, 0, 1)[None]
+        resized = F.interpolate(image, size=(self.size, self.size), mode="bilinear", antialias=True, align_corners=False)
+        return resized[0].numpy()
+
+    def __call__(self, regions):
+        """
+        Args:
+            regions (list[np.ndarray]): uint8 影像 (H, W, 3) 或灰階 (H, W)，色彩順序為 BGR。
+
+        Returns:
+            torch.Tensor: (N, 3, size, size)，數值範圍 [0, 1]；與內部緩衝區共用記憶體，
+                          下一次呼叫前使用完畢即可。
+        """
+        n = len(regions)
+        self._ensure_capacity(n)
+        out = self._buffer[:n]
+        for i, region in enumerate(regions):
+            resized = self._resize(np.asarray(region))
+            if self.color_order == "rgb":
+                resized = resized[::-1]
+            np.multiply(resized, np.float32(1.0 / 255.0), out=out[i]) # 灰階 (C = 1) 會廣播到三個通道
+        return torch.from_numpy(out)
+
+
+def pil_transform(regions, color_order="bgr"):
+    """原本 ToPILImage -> Resize -> ToTensor 的前處理結果 (N, 3, 32, 32)，作為比對的基準。"""
+    import torchvision.transforms as transforms
+    reference = transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((INPUT_SIZE, INPUT_SIZE)),
+        transforms.ToTensor(),
+    ])
+    ref_inputs = [r if color_order == "bgr" else cv2.cvtColor(r, cv2.COLOR_BGR2RGB) for r in regions]
+    return torch.stack([reference(np.ascontiguousarray(r)) for r in ref_inputs])
+
+def compare_with_pil_transform(regions, color_order="bgr"):
+    """
+    與原本 ToPILImage -> Resize -> ToTensor 的結果比較，返回 (最大絕對誤差, 平均絕對誤差)。
+    兩者使用相同的三角濾波，差異只來自定點數與浮點數的捨入，個別像素最多相差 1/255。
+    """
+    expected = pil_transform(regions, color_order)
+    actual = RegionPreprocessor(color_order=color_order)(regions)
+    diff = (expected - actual).abs()
+    return float(diff.max()), float(diff.mean())
+
+def bundled_regions(base_dir=None):
+    """score_ocr 與 scoreboard_images 中的圖片，以 crop_score_regions 相同的方式切成左右兩半。"""
+    if base_dir is None:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    regions = []
+    for folder, _, files in sorted(os.walk(base_dir)):
+        if not (folder.startswith(os.path.join(base_dir, "score_ocr")) or folder.startswith(os.path.join(base_dir, "scoreboard_images"))):
+            continue
+        for name in sorted(files):
+            if name.endswith(".jpg") or name.endswith(".png"):
+                image = cv2.imread(os.path.join(folder, name))
+                if image is not None:
+                    center_x = image.shape[1] // 2
+                    regions.extend([image[:, :center_x], image[:, center_x:]])
+    return regions
+
+
+if __name__ == "__main__":
+    # 以 score_ocr 與 scoreboard_images 中的圖片檢查與原本流程的數值差異 (完整的檢查見 tests/test_preprocess.py)
+    regions = bundled_regions()
+    max_diff, mean_diff = compare_with_pil_transform(regions)
+    print(f"{len(regions)} 個區域：最大絕對誤差 {max_diff:.4f}，平均絕對誤差 {mean_diff:.5f}")
+    if mean_diff > 0.02:
+        sys.exit(1)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sys
+import traceback
+
+import state_store
+
+
+class RecognitionCache:
+    """
+    比分辨識結果快取。
+
+    以 (球場, 圖片路徑, 檔案大小, mtime, 可選的內容雜湊, 辨識設定) 作為鍵，若球場最新的圖片
+    沒有變動，就直接返回上一次的辨識結果，省去 cv2.imread 解碼與模型推論。
+    辨識設定 (context) 由呼叫端提供，例如模型檔、位數上限與 ROI；換了模型或重新校正後不會沿用舊結果。
+    每個球場只保留最新一筆，並記錄命中 / 未命中次數。
+    """
+
+    def __init__(self, cache_file=None, use_content_hash=False):
+        """
+        Args:
+            cache_file (str, optional): 快取持久化的 JSON 檔案路徑；為 None 時只存在記憶體中。
+                                        recognize_score.py (含常駐的 recognize_daemon.py) 使用
+                                        recognition_cache.json，重新啟動後仍可沿用。
+            use_content_hash (bool): 是否額外比對檔案內容的 SHA-1，可防止同尺寸、同 mtime
+                                     但內容不同的覆寫被誤判為命中。
+        """
+        self.cache_file = cache_file
+        self.use_content_hash = use_content_hash
+        self.entries = {}  # court_id (str) -> {"path", "size", "mtime_ns", "hash", "context", "prediction"}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if cache_file:
+            self.load()
+
+    def _fingerprint(self, path):
+        """取得檔案的指紋 (size, mtime_ns, hash)，檔案不存在時返回 None。"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        content_hash = None
+        if self.use_content_hash:
+            h = hashlib.sha1()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    h.update(chunk)
+            content_hash = h.hexdigest()
+        return st.st_size, st.st_mtime_ns, content_hash
+
+    def get(self, court_id, path, context=None):
+        """
+        查詢快取。命中時返回先前的辨識結果，否則返回 None。
+
+        Args:
+            context (str, optional): 辨識設定，必須與 put 時相同才算命中。
+
+        Returns:
+            list | None: 先前儲存的 prediction (例如 ["3", "1"])。
+        """
+        entry = self.entries.get(str(court_id))
+        fingerprint = self._fingerprint(path)
+        if (
+            entry is not None
+            and fingerprint is not None
+            and entry["path"] == path
+            and (entry["size"], entry["mtime_ns"], entry["hash"]) == fingerprint
+            and entry.get("context") == context
+        ):
+            self.hits += 1
+            return entry["prediction"]
+        self.misses += 1
+        return None
+
+    def put(self, court_id, path, prediction, context=None):
+        """儲存球場最新圖片的辨識結果 (context 見 get)。"""
+        fingerprint = self._fingerprint(path)
+        if fingerprint is None:
+            return
+        size, mtime_ns, content_hash = fingerprint
+        self.entries[str(court_id)] = {
+            "path": path,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "hash": content_hash,
+            "context": context,
+            "prediction": list(prediction),
+        }
+        self._dirty = True
+
+    def invalidate(self, court_id=None):
+        """清除單一球場 (或全部) 的快取。"""
+        if court_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(str(court_id), None)
+        self._dirty = True
+
+    def stats(self):
+        """返回命中統計。"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self.entries),
+        }
+
+    def load(self):
+        """從 cache_file 載入快取，檔案不存在或損毀時從空白開始。"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # 啟用 / 停用內容雜湊後，舊的鍵就不再可比，直接丟棄
+            if data.get("use_content_hash") == self.use_content_hash:
+                self.entries = data.get("entries", {})
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            print(f"[{os.path.basename(__file__)}] WARNING: Ignoring unreadable cache {self.cache_file}: {e}", file=sys.stderr)
+            self.entries = {}
+
+    def save(self):
+        """有變動時將快取寫回 cache_file (暫存檔 + os.replace，寫入中斷不會留下半個檔案)。"""
+        if not self.cache_file or not self._dirty:
+            return
+        try:
+            state_store.write_json(self.cache_file, {"use_content_hash": self.use_content_hash, "entries": self.entries})
+            self._dirty = False
+        except OSError as e:
+            print(f"[{os.path.basename(__file__)}] ERROR: Failed to write cache {self.cache_file}: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
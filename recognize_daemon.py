@@ -0,0 +1,100 @@
+# 常駐的比分辨識程序。
+#
+# 由 server.js 啟動一次後，透過 stdin/stdout 以 JSON lines 溝通，避免每次辨識都重新
+# 啟動 Python、匯入 torch/cv2 並載入模型權重。
+#
+# 請求格式 (每行一個 JSON)：
+#   {"id": 1, "cmd": "all"}                  -> 辨識所有球場 (可選 "max_batch_size")
+#   {"id": 2, "cmd": "court", "court_id": 3} -> 辨識單一球場
+#   {"id": 3, "cmd": "health"}               -> 健康檢查 / 是否就緒
+#   {"id": 4, "cmd": "shutdown"}             -> 結束程序
+#
+# 回應格式：
+#   {"id": 1, "ok": true, "updates": [{"id": "Court 1", "score1": "3", "score2": "1", "status": "進行中"}, ...]}
+#   {"id": 2, "ok": false, "error": "..."}
+
+import json
+import os
+import sys
+import time
+import traceback
+
+# 匯入 recognize_score 時就會載入 SVHNCNN 與權重，常駐程序只需付一次這個成本
+import recognize_score
+
+sys.stdout.reconfigure(encoding='utf-8') # 回應走 stdout (每行一個 JSON)
+sys.stderr.reconfigure(encoding='utf-8') # 日誌走 stderr
+
+STARTED_AT = time.time()
+_request_count = 0
+
+def handle_command(request):
+    """處理單一請求，返回回應 dict。"""
+    global _request_count
+    _request_count += 1
+    cmd = request.get("cmd")
+
+    if cmd == "health":
+        return {
+            "ok": True,
+            "ready": True,
+            "pid": os.getpid(),
+            "uptime": round(time.time() - STARTED_AT, 3),
+            "requests": _request_count,
+            "cache": recognize_score.recognition_cache.stats(),
+            "smoothing": recognize_score.score_smoother.stats(),
+        }
+
+    if cmd == "all":
+        updates = recognize_score.recognize_all_courts(request.get("max_batch_size"))
+        return {"ok": True, "updates": updates}
+
+    if cmd == "court":
+        try:
+            cid = int(request.get("court_id"))
+        except (TypeError, ValueError):
+            return {"ok": False, "error": f"無效的球場編號: {request.get('court_id')}"}
+        if cid < 1 or cid > recognize_score.COURT_COUNT:
+            return {"ok": False, "error": f"無效的球場編號: {cid}"}
+        update = recognize_score.recognize_and_process_court(str(cid))
+        return {"ok": True, "updates": [update] if update is not None else []}
+
+    return {"ok": False, "error": f"未知的指令: {cmd}"}
+
+def write_response(response):
+    sys.stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+def main():
+    print(f"[{os.path.basename(__file__)}] Recognition daemon started (pid {os.getpid()}).", file=sys.stderr)
+    # 啟動完成即主動送出一次就緒訊息，讓呼叫端不必輪詢
+    write_response({"id": None, "ok": True, "ready": True, "pid": os.getpid()})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            write_response({"id": None, "ok": False, "error": f"JSON 格式錯誤: {e}"})
+            continue
+
+        if request.get("cmd") == "shutdown":
+            write_response({"id": request.get("id"), "ok": True})
+            break
+
+        try:
+            response = handle_command(request)
+        except Exception as e:
+            print(f"[{os.path.basename(__file__)}] ERROR: Command {request.get('cmd')} failed: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            response = {"ok": False, "error": str(e)}
+        response["id"] = request.get("id")
+        write_response(response)
+
+    print(f"[{os.path.basename(__file__)}] Recognition daemon stopped.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
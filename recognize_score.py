@@ -1,12 +1,23 @@
 import cv2
-import json
 import sys
 import os
+import hashlib
+import json
 import torch
-import torchvision.transforms as transforms
 from PIL import Image
 import numpy as np
+import threading
+import time
 import traceback # 用於打印完整的錯誤堆棧
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from recognition_cache import RecognitionCache
+from score_smoothing import ScoreSmoother
+import state_store
+from preprocess import RegionPreprocessor
+from digit_segmentation import segment_digits
+import roi_calibration
+from frame_index import FrameIndex
+from match_status import MatchTracker, parse_score # 局內得分 / 搶七的讀數不會結束比賽
 
 sys.stdout.reconfigure(encoding='utf-8') # 針對 print() 輸出的內容
 sys.stderr.reconfigure(encoding='utf-8') # 針對錯誤訊息或你用 print(..., file=sys.stderr) 的內容
@@ -40,16 +51,84 @@ except ImportError as e:
 # 載入 SVHN 模型與權重
 # 確保權重檔案路徑正確
 model_weights_path = os.path.join(svhn_path, "svhn_cnn_weights.pth")
+# SVHN/export_model.py 匯出的凍結 TorchScript 模型 (載入後再做 conv + ReLU 融合)，存在時優先使用
+scripted_model_path = os.path.join(svhn_path, "svhn_cnn_scripted.pt")
+# SVHN/quantize_model.py 產生的動態 int8 量化模型 (適合 CPU 較弱的球場端電腦)
+int8_model_path = os.path.join(svhn_path, "svhn_cnn_int8.pt")
+# 模型格式："auto" (預設，有 TorchScript 就用，否則用 .pth)、"torchscript"、"int8" 或 "eager"
+MODEL_FORMAT = os.environ.get("RECOGNIZE_MODEL_FORMAT", "auto")
 #print(f"[{os.path.basename(__file__)}] DEBUG: Model weights path: {model_weights_path}", file=sys.stderr)
 
-if not os.path.exists(model_weights_path):
-    print(f"[{os.path.basename(__file__)}] ERROR: Model weights file NOT FOUND at {model_weights_path}", file=sys.stderr)
-    sys.exit(1) # 強制退出，讓 Node.js 捕獲到錯誤
+# SVHN/export_model.py / quantize_model.py 把來源權重的 SHA-1 存在模型檔的這個 extra file 中
+WEIGHTS_DIGEST_KEY = "weights_sha1"
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _file_identity(path):
+    st = os.stat(path)
+    return f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+def load_eager_model():
+    if not os.path.exists(model_weights_path):
+        print(f"[{os.path.basename(__file__)}] ERROR: Model weights file NOT FOUND at {model_weights_path}", file=sys.stderr)
+        sys.exit(1) # 強制退出，讓 Node.js 捕獲到錯誤
+    eager_model = SVHNCNN()
+    eager_model.load_state_dict(torch.load(model_weights_path, map_location="cpu"))
+    eager_model.eval()
+    return eager_model
+
+def _artifact_is_stale(artifact_path, weights_digest):
+    """
+    匯出 / 量化之後 .pth 權重又被更新 (重新訓練或微調) 時，舊的 TorchScript / int8 模型不能再用。
+    模型檔中有來源權重的 SHA-1 時直接比對；較早匯出、沒有記錄的模型檔改為比較 mtime。
+    """
+    if not os.path.exists(model_weights_path):
+        return False # 只部署了 TorchScript / int8 模型
+    if weights_digest:
+        return weights_digest != _file_sha1(model_weights_path)
+    return os.stat(artifact_path).st_mtime_ns < os.stat(model_weights_path).st_mtime_ns
+
+def load_model():
+    """
+    依 MODEL_FORMAT 載入推論用模型；TorchScript / int8 模型不存在、載入失敗或比 .pth 權重舊時退回 .pth 權重。
+
+    Returns:
+        tuple: (模型, 模型識別字串)；識別字串會加入辨識結果快取的鍵，換了模型就不會沿用舊結果。
+    """
+    if MODEL_FORMAT == "int8":
+        artifact_path = int8_model_path
+    elif MODEL_FORMAT in ("auto", "torchscript"):
+        artifact_path = scripted_model_path
+    else:
+        return load_eager_model(), f"eager:{_file_identity(model_weights_path)}"
+
+    if os.path.exists(artifact_path):
+        try:
+            extra_files = {WEIGHTS_DIGEST_KEY: ""}
+            scripted = torch.jit.load(artifact_path, map_location="cpu", _extra_files=extra_files)
+            weights_digest = extra_files[WEIGHTS_DIGEST_KEY]
+            if isinstance(weights_digest, bytes):
+                weights_digest = weights_digest.decode("ascii")
+            if not _artifact_is_stale(artifact_path, weights_digest):
+                scripted.eval()
+                if artifact_path == scripted_model_path:
+                    # conv + ReLU 融合等最佳化的結果無法存檔，載入凍結的模型後才做 (見 SVHN/export_model.py)
+                    scripted = torch.jit.optimize_for_inference(scripted)
+                return scripted, f"{MODEL_FORMAT}:{_file_identity(artifact_path)}"
+            print(f"[{os.path.basename(__file__)}] WARNING: {artifact_path} was exported from older weights than {model_weights_path}, falling back to .pth weights (re-run export_model.py / quantize_model.py)", file=sys.stderr)
+        except Exception as e:
+            print(f"[{os.path.basename(__file__)}] WARNING: Failed to load {MODEL_FORMAT} model {artifact_path}, falling back to .pth weights: {e}", file=sys.stderr)
+    elif MODEL_FORMAT != "auto":
+        print(f"[{os.path.basename(__file__)}] WARNING: {MODEL_FORMAT} model NOT FOUND at {artifact_path}, falling back to .pth weights", file=sys.stderr)
+    return load_eager_model(), f"eager:{_file_identity(model_weights_path)}"
 
 try:
-    model = SVHNCNN()
-    model.load_state_dict(torch.load(model_weights_path, map_location="cpu"))
-    model.eval()
+    model, model_identity = load_model()
     #print(f"[{os.path.basename(__file__)}] DEBUG: Model loaded successfully.", file=sys.stderr)
 except Exception as e:
     print(f"[{os.path.basename(__file__)}] ERROR: Failed to load model: {e}", file=sys.stderr)
@@ -57,11 +136,10 @@ except Exception as e:
     sys.exit(1) # 強制退出
 
 # SVHN 是彩色圖片，32x32
-transform = transforms.Compose([
-    transforms.ToPILImage(),
-    transforms.Resize((32, 32)),
-    transforms.ToTensor(),
-])
+# 以 uint8 antialias 縮放直接寫入可重複使用的 NCHW 緩衝區，不再經過 PIL (見 preprocess.py)；
+# RECOGNIZE_COLOR_ORDER 預設為 "bgr"，與過去把 cv2.imread 的 BGR 陣列直接送進模型的行為相同
+INPUT_COLOR_ORDER = os.environ.get("RECOGNIZE_COLOR_ORDER", "bgr")
+preprocessor = RegionPreprocessor(color_order=INPUT_COLOR_ORDER)
 
 def enhance_image(img):
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -78,29 +156,164 @@ def crop_score_regions(image):
     player2_img = image[:, center_x:]
     return player1_img, player2_img
 
-def predict_digit(image_region):
+# 單次 forward 的最大張數，球場數增加時會自動切成多個批次
+MAX_BATCH_SIZE = int(os.environ.get("RECOGNIZE_MAX_BATCH_SIZE", "64"))
+
+def _prepare_region(image_region):
     if isinstance(image_region, Image.Image):
         image_region = np.array(image_region)
     elif len(image_region.shape) == 2: # 如果是灰階，轉成三通道
         image_region = cv2.cvtColor(image_region, cv2.COLOR_GRAY2BGR)
+    return image_region
 
-    img_t = transform(image_region).unsqueeze(0)
-    with torch.no_grad():
-        outputs = model(img_t)
-        predicted = outputs.argmax(dim=1).item()
-    return str(predicted if predicted != 10 else 0)
+# preprocessor 的緩衝區在多次呼叫間共用；解碼執行緒校正 ROI 時也會呼叫模型，推論一次只進行一個
+_inference_lock = threading.Lock()
 
-def parse_score(s):
-    try:
-        return int(s)
-    except ValueError:
-        return 0
+def predict_digits_batch(image_regions, max_batch_size=None, return_confidence=False):
+    """
+    將多個比分區域疊成一個 batch，以最少次數的 forward 完成辨識。
+
+    Args:
+        image_regions (list): 影像區域 (numpy array 或 PIL.Image)。
+        max_batch_size (int, optional): 單次 forward 的最大張數，預設為 MAX_BATCH_SIZE。
+        return_confidence (bool): 是否一併返回 softmax 的最大機率。
+
+    Returns:
+        list[str]: 與 image_regions 順序相同的預測數字字串；
+                   return_confidence=True 時為 (數字字串, 信心值) 的列表。
+    """
+    if max_batch_size is None:
+        max_batch_size = MAX_BATCH_SIZE
+    max_batch_size = max(1, int(max_batch_size))
+    if not image_regions:
+        return []
+
+    predictions = []
+    confidences = []
+    with _inference_lock, torch.no_grad():
+        for start in range(0, len(image_regions), max_batch_size):
+            chunk = image_regions[start:start + max_batch_size]
+            batch = preprocessor([_prepare_region(region) for region in chunk])
+            outputs = model(batch)
+            probabilities, labels = torch.softmax(outputs, dim=1).max(dim=1)
+            predictions.extend(labels.tolist())
+            confidences.extend(probabilities.tolist())
+    digits = [str(p if p != 10 else 0) for p in predictions]
+    if return_confidence:
+        return list(zip(digits, confidences))
+    return digits
+
+def predict_digit(image_region):
+    return predict_digits_batch([image_region])[0]
+
+# 每位選手比分最多幾位數 (例如 "40"、"10")；設為 1 即回到過去的單一數字辨識
+MAX_DIGITS_PER_SIDE = int(os.environ.get("RECOGNIZE_MAX_DIGITS", "2"))
+
+def predict_scores_batch(score_regions, max_digits=None, max_batch_size=None, return_confidence=False):
+    """
+    多位數比分辨識：先切出每個區域中的各個數字，所有數字一起做一次批次推論，
+    再依左到右的順序組回每個區域的比分字串。
+
+    Args:
+        score_regions (list): 選手比分區域 (通常來自 crop_score_regions)。
+        max_digits (int, optional): 每個區域最多幾位數，預設為 MAX_DIGITS_PER_SIDE。
+        max_batch_size (int, optional): 傳給 predict_digits_batch。
+        return_confidence (bool): 是否一併返回信心值 (各位數 softmax 最大機率的乘積)。
+
+    Returns:
+        list[str]: 與 score_regions 順序相同的比分字串 (例如 "40")；
+                   return_confidence=True 時為 (比分字串, 信心值) 的列表。
+    """
+    if max_digits is None:
+        max_digits = MAX_DIGITS_PER_SIDE
+    if max_digits <= 1:
+        return predict_digits_batch(score_regions, max_batch_size, return_confidence)
+
+    digit_crops = []
+    counts = []
+    for region in score_regions:
+        crops = segment_digits(_prepare_region(region), max_digits)
+        digit_crops.extend(crops)
+        counts.append(len(crops))
+
+    digits = predict_digits_batch(digit_crops, max_batch_size, return_confidence=True)
+    scores = []
+    start = 0
+    for count in counts:
+        side = digits[start:start + count]
+        score = "".join(d for d, _ in side).lstrip("0") or "0" # "05" 視為 "5"
+        confidence = 1.0
+        for _, p in side:
+            confidence *= p
+        scores.append((score, confidence) if return_confidence else score)
+        start += count
+    return scores
 
 # --- courts.json 檔案路徑定義 ---
 # 假設 courts.json 與 recognize_score.py 在同一層目錄
 DATA_FILE = os.path.join(os.path.dirname(__file__), 'courts.json')
 #print(f"[{os.path.basename(__file__)}] DEBUG: DATA_FILE path: {DATA_FILE}", file=sys.stderr)
 
+# --- 辨識結果快取 ---
+# 圖片未變動 (路徑、大小、mtime 相同) 時直接沿用上一次的辨識結果；
+# 設定 RECOGNIZE_CACHE_HASH=1 可額外比對檔案內容雜湊
+CACHE_FILE = os.path.join(os.path.dirname(__file__), 'recognition_cache.json')
+recognition_cache = RecognitionCache(
+    CACHE_FILE,
+    use_content_hash=os.environ.get("RECOGNIZE_CACHE_HASH", "0") == "1",
+)
+
+# --- 時間平滑與信心門檻 ---
+# 新比分需連續 RECOGNIZE_STABLE_FRAMES 張影格一致，或單張信心值達到 RECOGNIZE_COMMIT_CONFIDENCE 才寫入；
+# 信心值低於 RECOGNIZE_MIN_CONFIDENCE 的影格直接捨棄 (見 score_smoothing.py)。
+# 球場的信心值 (兩位選手中較低者) 會寫入 courts.json 的 "confidence" 欄位。RECOGNIZE_SMOOTHING=0 停用。
+SMOOTHING_ENABLED = os.environ.get("RECOGNIZE_SMOOTHING", "1") == "1"
+SMOOTHING_FILE = os.path.join(os.path.dirname(__file__), 'score_history.json')
+score_smoother = ScoreSmoother(
+    SMOOTHING_FILE,
+    min_confidence=float(os.environ.get("RECOGNIZE_MIN_CONFIDENCE", "0.6")),
+    commit_confidence=float(os.environ.get("RECOGNIZE_COMMIT_CONFIDENCE", "0.95")),
+    stable_frames=int(os.environ.get("RECOGNIZE_STABLE_FRAMES", "3")),
+)
+
+MATCH_PROGRESS_FILE = os.path.join(os.path.dirname(__file__), 'match_progress.json')
+match_tracker = MatchTracker(MATCH_PROGRESS_FILE) # 每個球場目前比賽已出現的局數，用來分辨局數與搶七得分
+
+def gate_prediction(court_id, prediction):
+    """
+    將新影格的辨識結果 ((score1, conf1), (score2, conf2)) 交給平滑器。
+
+    Returns:
+        tuple | None: 應寫入的 (score1, score2, confidence)；影格被捨棄或比分尚未穩定時返回 None。
+    """
+    (score1, conf1), (score2, conf2) = prediction
+    confidence = min(conf1, conf2)
+    if not SMOOTHING_ENABLED:
+        return score1, score2, confidence
+    gated = score_smoother.observe(court_id, score1, score2, confidence)
+    if gated is None and confidence < score_smoother.min_confidence:
+        print(f"[{os.path.basename(__file__)}] Court {court_id}: rejected {score1}:{score2} (low confidence {confidence:.3f})", file=sys.stderr)
+    elif gated is None:
+        print(f"[{os.path.basename(__file__)}] Court {court_id}: holding {score1}:{score2} (confidence {confidence:.3f}, waiting for stable frames)", file=sys.stderr)
+    return gated
+
+def sync_smoother_matches(court_ids):
+    """球場的 current_match_number 改變時重設平滑器，上一場的比分不會寫進新的比賽。"""
+    if not SMOOTHING_ENABLED:
+        return
+    courts_data = state_store.load(DATA_FILE)
+    for court_id in court_ids:
+        if 0 <= court_id - 1 < len(courts_data):
+            match_number = courts_data[court_id - 1].get("current_match_number")
+            if score_smoother.sync_match(court_id, match_number):
+                print(f"[{os.path.basename(__file__)}] Court {court_id}: smoothing history reset for match {match_number}", file=sys.stderr)
+
+def cached_result(court_id, cached):
+    """圖片沒有變動時應寫入的結果：不是新的影格，不再計入平滑器的歷史。"""
+    if not SMOOTHING_ENABLED:
+        return tuple(cached)
+    return score_smoother.committed(court_id)
+
 def read_courts_data():
     """讀取 courts.json 檔案。如果檔案不存在或格式錯誤，返回一個空列表。"""
     #print(f"[{os.path.basename(__file__)}] DEBUG: Attempting to read from {DATA_FILE}", file=sys.stderr)
@@ -108,14 +321,9 @@ def read_courts_data():
         print(f"[{os.path.basename(__file__)}] ERROR: courts.json NOT FOUND at {DATA_FILE}", file=sys.stderr)
         return []
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            #print(f"[{os.path.basename(__file__)}] DEBUG: courts.json read successful. Found {len(data)} courts.", file=sys.stderr)
-            return data
-    except json.JSONDecodeError as e:
-        print(f"[{os.path.basename(__file__)}] ERROR: {DATA_FILE} JSON decode error: {e}", file=sys.stderr)
-        traceback.print_exc(file=sys.stderr)
-        return []
+        data = state_store.load(DATA_FILE) # 寫入是原子性的，不會讀到寫到一半的檔案
+        #print(f"[{os.path.basename(__file__)}] DEBUG: courts.json read successful. Found {len(data)} courts.", file=sys.stderr)
+        return data
     except Exception as e:
         print(f"[{os.path.basename(__file__)}] ERROR: Failed to read {DATA_FILE}: {e}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
@@ -125,8 +333,7 @@ def save_courts_data(data):
     """將資料寫入 courts.json 檔案。"""
     #print(f"[{os.path.basename(__file__)}] DEBUG: Attempting to save to {DATA_FILE}", file=sys.stderr)
     try:
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False) # ensure_ascii=False 為了中文顯示
+        state_store.save(DATA_FILE, data) # 暫存檔 + rename，並以檔案鎖保護
         #print(f"[{os.path.basename(__file__)}] DEBUG: courts.json saved successfully.", file=sys.stderr)
         return {"success": True}
     except Exception as e:
@@ -134,70 +341,396 @@ def save_courts_data(data):
         traceback.print_exc(file=sys.stderr)
         return {"error": f"寫入 {DATA_FILE} 失敗: {e}"}
 
-def recognize_and_process_court(court_id_str):
-    """處理單一球場的比分識別和數據更新。"""
-    court_id = int(court_id_str)
-    
+# 球場總數 (score_ocr/court_1 ~ court_12)
+COURT_COUNT = 12
+SCORE_DIR = os.path.join(os.path.dirname(__file__), "score_ocr")
+
+# 最新影格依檔名中的數字排序 (9.jpg < 10.jpg)，資料夾沒有變動時只需要一次 stat (見 frame_index.py)；
+# RECOGNIZE_RETAIN_FRAMES=N 時每個球場只保留最新的 N 張，較舊的影格刪除，
+# 或在設定 RECOGNIZE_ARCHIVE_DIR 時移到該資料夾
+frame_index = FrameIndex(
+    retain=int(os.environ.get("RECOGNIZE_RETAIN_FRAMES", "0")),
+    archive_dir=os.environ.get("RECOGNIZE_ARCHIVE_DIR") or None,
+)
+
+def find_latest_image_path(court_id):
+    """返回指定球場資料夾中最新比分圖片的路徑，找不到時返回 None。"""
     # 確保 score_ocr folder 的路徑也是絕對的
     # score_ocr 資料夾應該與 recognize_score.py 在同一層
-    folder = os.path.join(os.path.dirname(__file__), "score_ocr", f"court_{court_id}")
+    folder = os.path.join(SCORE_DIR, f"court_{court_id}")
     #print(f"[{os.path.basename(__file__)}] DEBUG: Processing Court {court_id}. Image folder: {folder}", file=sys.stderr)
 
-    if not os.path.exists(folder):
+    try:
+        latest_img_path = frame_index.latest(folder)
+    except FileNotFoundError:
         print(f"[{os.path.basename(__file__)}] ERROR: Court folder NOT FOUND: {folder}", file=sys.stderr)
-        return # 不再返回詳細結果給 stdout，直接透過 stderr 記錄錯誤
+        return None # 不再返回詳細結果給 stdout，直接透過 stderr 記錄錯誤
 
-    images = sorted([f for f in os.listdir(folder) if f.endswith(".jpg") or f.endswith(".png")])
-    if not images:
+    if latest_img_path is None:
         print(f"[{os.path.basename(__file__)}] ERROR: No images found in folder: {folder}", file=sys.stderr)
-        return # 不再返回詳細結果
+        return None # 不再返回詳細結果
+
+    return latest_img_path
 
-    latest_img_path = os.path.join(folder, images[-1])
+def load_court_image(latest_img_path):
+    """解碼比分圖片，失敗時返回 None。"""
     #print(f"[{os.path.basename(__file__)}] DEBUG: Latest image path: {latest_img_path}", file=sys.stderr)
     image = cv2.imread(latest_img_path)
     if image is None:
         print(f"[{os.path.basename(__file__)}] ERROR: Image read failed for: {latest_img_path}", file=sys.stderr)
-        return # 不再返回詳細結果
+        return None # 不再返回詳細結果
+    return image
+
+# --- 比分區域 (ROI) ---
+# RECOGNIZE_USE_ROI=1 (預設停用) 時，有 court_rois.json 的設定就只裁切兩位選手的比分區域，並依設定以較低解析度
+# 解碼 (見 roi_calibration.py)；沒有設定、畫面尺寸改變或數字碰到 ROI 邊界 (例如校正時只有一位數) 時，用這張畫面
+# 自動校正並寫回。只有模型能以 RECOGNIZE_ROI_MIN_CONFIDENCE 以上的信心值讀出的記分板才會存成 ROI；
+# 校正失敗時這張畫面仍以整張畫面左右切半辨識，RECOGNIZE_ROI_RETRY_SECONDS 秒後才再嘗試校正。
+# RECOGNIZE_REDUCED_DECODE=0 一律以原始解析度解碼。
+USE_ROI = os.environ.get("RECOGNIZE_USE_ROI", "0") == "1"
+REDUCED_DECODE = os.environ.get("RECOGNIZE_REDUCED_DECODE", "1") == "1"
+ROI_MIN_CONFIDENCE = float(os.environ.get("RECOGNIZE_ROI_MIN_CONFIDENCE", str(roi_calibration.ROI_MIN_CONFIDENCE)))
+ROI_RETRY_SECONDS = float(os.environ.get("RECOGNIZE_ROI_RETRY_SECONDS", "60"))
+_rois = {}
+_rois_mtime = None
+# 解碼執行緒會同時校正不同球場；重新讀取、修改與寫回 court_rois.json 都在這個鎖內進行
+_rois_lock = threading.Lock()
+_calibration_failed = {} # court_id -> 上次校正失敗的時間 (time.monotonic())
+
+def _current_rois():
+    """返回 ROI 設定；常駐程式中若 court_rois.json 被手動重新校正或編輯，會自動重新讀取。"""
+    global _rois, _rois_mtime
+    with _rois_lock:
+        try:
+            mtime = os.stat(roi_calibration.ROI_FILE).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != _rois_mtime:
+            _rois = roi_calibration.load_rois() if mtime is not None else {}
+            _rois_mtime = mtime
+        return _rois
+
+def _court_roi(court_id):
+    roi = _current_rois().get(f"court_{court_id}")
+    if roi is not None and roi_calibration.is_whole_halves(roi):
+        return None # 舊版校正找不到數字時存下的整個左右半邊，不是真正的 ROI
+    return roi
+
+def roi_confidence(regions):
+    """候選記分板的信心值：兩位選手比分中較低者 (見 roi_calibration.calibrate_frame)。"""
+    return min(confidence for _, confidence in predict_scores_batch(list(regions), return_confidence=True))
+
+def _calibrate_court(court_id, image):
+    """以原始解析度的畫面重新校正球場的 ROI 並寫回 court_rois.json；找不到可信的記分板時返回 None。"""
+    global _rois_mtime
+    failed_at = _calibration_failed.get(court_id)
+    if failed_at is not None and time.monotonic() - failed_at < ROI_RETRY_SECONDS:
+        return None
+    roi = roi_calibration.calibrate_frame(image, roi_confidence, MAX_DIGITS_PER_SIDE, ROI_MIN_CONFIDENCE)
+    if roi is None:
+        _calibration_failed[court_id] = time.monotonic()
+        print(f"[{os.path.basename(__file__)}] Court {court_id}: no scoreboard recognized with confidence >= {ROI_MIN_CONFIDENCE}, using whole frame halves", file=sys.stderr)
+        return None
+    _calibration_failed.pop(court_id, None)
+    with _rois_lock:
+        _rois[f"court_{court_id}"] = roi
+        try:
+            roi_calibration.save_rois(_rois)
+            _rois_mtime = os.stat(roi_calibration.ROI_FILE).st_mtime_ns
+        except OSError as e:
+            print(f"[{os.path.basename(__file__)}] ERROR: Failed to save ROI calibration for Court {court_id}: {e}", file=sys.stderr)
+    print(f"[{os.path.basename(__file__)}] Court {court_id} ROI calibrated: {roi}", file=sys.stderr)
+    return roi
+
+def _cache_context(court_id):
+    """辨識結果取決於模型、前處理、位數上限與 ROI；任何一項改變時快取的結果都不能沿用。"""
+    roi = _court_roi(court_id) if USE_ROI else None
+    return json.dumps([model_identity, INPUT_COLOR_ORDER, MAX_DIGITS_PER_SIDE, REDUCED_DECODE, roi], sort_keys=True)
+
+def _regions_after_calibration(court_id, image):
+    roi = _calibrate_court(court_id, image)
+    return roi_calibration.crop_roi(image, roi) if roi is not None else crop_score_regions(image)
+
+def load_court_regions(court_id, latest_img_path):
+    """解碼比分圖片並返回 (player1_region, player2_region)，失敗時返回 None。"""
+    if not USE_ROI:
+        image = load_court_image(latest_img_path)
+        return crop_score_regions(image) if image is not None else None
+
+    roi = _court_roi(court_id)
+    if roi is not None:
+        if not REDUCED_DECODE:
+            roi = {**roi, "reduce": 1}
+        regions = roi_calibration.read_roi_regions(latest_img_path, roi)
+        if regions is not None and not roi_calibration.needs_recalibration(roi, regions, MAX_DIGITS_PER_SIDE):
+            return regions
+
+    # 尚未校正、畫面尺寸改變或數字超出 ROI：以原始解析度解碼這張畫面，重新校正後寫回 court_rois.json
+    image = load_court_image(latest_img_path)
+    if image is None:
+        return None
+    return _regions_after_calibration(court_id, image)
+
+def court_regions_from_frame(court_id, frame):
+    """從已解碼的畫面 (例如串流影格) 裁切兩位選手的比分區域。"""
+    if not USE_ROI:
+        return crop_score_regions(frame)
+    roi = _court_roi(court_id)
+    h, w = frame.shape[:2]
+    if roi is not None and list(roi["frame_size"]) == [w, h]:
+        regions = roi_calibration.crop_roi(frame, roi)
+        if not roi_calibration.needs_recalibration(roi, regions, MAX_DIGITS_PER_SIDE):
+            return regions
+    return _regions_after_calibration(court_id, frame)
+
+def apply_court_updates(results):
+    """
+    批次更新模式：courts.json 只讀取一次，在記憶體中套用所有球場的新比分與狀態，
+    最後只寫入一次；若所有數值都沒有變動則完全不寫檔，避免無謂的 mtime 變動。
+
+    Args:
+        results (dict): court_id (int) -> (score1_str, score2_str) 或 (score1_str, score2_str, confidence)
+
+    Returns:
+        list[dict]: 每個成功套用的球場更新內容 ({"id", "score1", "score2", "status"}，有信心值時另含 "confidence")。
+    """
+    if not results:
+        return []
+
+    updates = []
+
+    def _apply(courts_data):
+        updates.clear()
+        for court_id in sorted(results):
+            score1_str, score2_str = results[court_id][:2]
+
+            court_index = court_id - 1
+            if not 0 <= court_index < len(courts_data):
+                print(f"[{os.path.basename(__file__)}] ERROR: Invalid court index {court_index} for Court {court_id} in courts.json. Data length: {len(courts_data)}", file=sys.stderr)
+                continue
+
+            court = courts_data[court_index]
+            status = match_tracker.observe(court_id, court.get("current_match_number"), parse_score(score1_str), parse_score(score2_str))
+            #print(f"[{os.path.basename(__file__)}] DEBUG: Court {court_id} status: {status}", file=sys.stderr)
+            new_values = {"score1": score1_str, "score2": score2_str, "status": status}
+            if len(results[court_id]) > 2:
+                new_values["confidence"] = round(results[court_id][2], 3)
+            for key, value in new_values.items():
+                if court.get(key) != value:
+                    court[key] = value
+            updates.append({"id": court.get("id", f"Court {court_id}"), **new_values})
+
+    # 在檔案鎖內完成讀-改-寫，與 schedule_manager.py 的寫入不會交錯；沒有變動時不寫檔
+    try:
+        state_store.update(DATA_FILE, _apply)
+    except Exception as e:
+        print(f"[{os.path.basename(__file__)}] ERROR: Failed to update courts.json for courts {sorted(results)}: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return []
+    match_tracker.save()
+    return updates
+
+def apply_court_scores(court_id, score1_str, score2_str, confidence=None):
+    """將單一球場辨識出的比分寫入 courts.json，返回更新內容或 None。"""
+    result = (score1_str, score2_str) if confidence is None else (score1_str, score2_str, confidence)
+    updates = apply_court_updates({court_id: result})
+    return updates[0] if updates else None
+
+def recognize_and_process_court(court_id_str):
+    """
+    處理單一球場的比分識別和數據更新。
+
+    Returns:
+        dict | None: 寫入 courts.json 的更新內容 ({"id", "score1", "score2", "status", "confidence"})，
+                     辨識失敗、影格被捨棄或新比分尚未穩定時返回 None。
+    """
+    court_id = int(court_id_str)
+    latest_img_path = find_latest_image_path(court_id)
+    if latest_img_path is None:
+        return None
 
     try:
-        #enhanced_image = enhance_image(image)  處理圖像
-        enhanced_image = image 
-        region1, region2 = crop_score_regions(enhanced_image) # 對處理後的圖像進行裁剪
-
-        score1_str = predict_digit(region1)
-        score2_str = predict_digit(region2)
-        #print(f"[{os.path.basename(__file__)}] DEBUG: Predicted scores for Court {court_id}: {score1_str}:{score2_str}", file=sys.stderr)
-
-        s1 = parse_score(score1_str)
-        s2 = parse_score(score2_str)
-        
-        # 比分狀態判斷邏輯
-        status = "進行中"
-        if ((s1 >= 6 or s2 >= 6) and abs(s1 - s2) >= 2) or s1 >= 7 or s2 >= 7:
-            status = "比賽結束"
-        
-        #print(f"[{os.path.basename(__file__)}] DEBUG: Court {court_id} status: {status}", file=sys.stderr)
-        
-        # --- 在這裡讀取、更新並儲存 courts.json ---
-        courts_data = read_courts_data()
-        
-        court_index = court_id - 1
-        if 0 <= court_index < len(courts_data):
-            #print(f"[{os.path.basename(__file__)}] DEBUG: Updating courts_data[{court_index}] for Court {court_id}", file=sys.stderr)
-            courts_data[court_index]["score1"] = score1_str
-            courts_data[court_index]["score2"] = score2_str
-            courts_data[court_index]["status"] = status
-            
-            save_result = save_courts_data(courts_data)
-            if "error" in save_result:
-                print(f"[{os.path.basename(__file__)}] ERROR: Failed to save courts.json after updating Court {court_id}: {save_result['error']}", file=sys.stderr)
+        sync_smoother_matches([court_id])
+        cached = recognition_cache.get(court_id, latest_img_path, _cache_context(court_id))
+        if cached is not None:
+            result = cached_result(court_id, cached) # 圖片沒有變動，沿用上次的辨識結果
         else:
-            print(f"[{os.path.basename(__file__)}] ERROR: Invalid court index {court_index} for Court {court_id} in courts.json. Data length: {len(courts_data)}", file=sys.stderr)
+            regions = load_court_regions(court_id, latest_img_path)
+            if regions is None:
+                return None
+            #enhanced_image = enhance_image(image)  處理圖像
+            region1, region2 = regions # 只裁切比分區域，不處理整張畫面
 
+            prediction = predict_scores_batch([region1, region2], return_confidence=True)
+            result = gate_prediction(court_id, prediction)
+            recognition_cache.put(court_id, latest_img_path, [score for score, _ in prediction], _cache_context(court_id))
+            recognition_cache.save()
+            score_smoother.save()
+        if result is None:
+            return None
+        #print(f"[{os.path.basename(__file__)}] DEBUG: Predicted scores for Court {court_id}: {result}", file=sys.stderr)
+        return apply_court_scores(court_id, *result)
     except Exception as e:
         print(f"[{os.path.basename(__file__)}] ERROR: AI prediction or processing failed for Court {court_id}: {e}", file=sys.stderr)
         traceback.print_exc(file=sys.stderr) # 打印完整的錯誤堆棧
+    return None
+
+# --- 解碼與推論的管線化 ---
+# os.listdir / cv2.imread / 裁切都會釋放 GIL，可以用執行緒池同時解碼多個球場的圖片，
+# 每湊滿 PIPELINE_CHUNK 個球場就先送進模型，推論的同時其餘球場仍在背景解碼。
+# 實測 (benchmark_recognition.py) 拆成多個小 batch 的推論比省下的解碼時間更多，
+# 12 / 48 個球場都比逐一解碼、整批只推論一次慢，所以預設為 0 (逐一解碼)；
+# 解碼較慢的環境 (例如網路磁碟) 可設定 RECOGNIZE_DECODE_WORKERS 並以基準測試確認。
+DECODE_WORKERS = int(os.environ.get("RECOGNIZE_DECODE_WORKERS", "0"))
+PIPELINE_CHUNK = int(os.environ.get("RECOGNIZE_PIPELINE_CHUNK", "4"))
+_decode_pool = None
+_decode_pool_workers = 0
+
+def _get_decode_pool(workers):
+    global _decode_pool, _decode_pool_workers
+    if _decode_pool is None or _decode_pool_workers != workers:
+        if _decode_pool is not None:
+            _decode_pool.shutdown(wait=False)
+        _decode_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode")
+        _decode_pool_workers = workers
+    return _decode_pool
+
+def _load_court(court_id):
+    """
+    找出球場最新的圖片並查詢快取，未命中時解碼並裁切比分區域 (在解碼執行緒中執行)。
+
+    Returns:
+        tuple: (court_id, latest_img_path, cached, regions)；找不到圖片時 latest_img_path 為 None。
+    """
+    latest_img_path = find_latest_image_path(court_id)
+    if latest_img_path is None:
+        return court_id, None, None, None
+    cached = recognition_cache.get(court_id, latest_img_path, _cache_context(court_id))
+    if cached is not None:
+        return court_id, latest_img_path, cached, None
+    return court_id, latest_img_path, None, load_court_regions(court_id, latest_img_path)
+
+def _load_failed(court_id, e):
+    """單一球場解碼失敗時只略過該球場，其餘球場照常辨識，快取與平滑器也照常寫回。"""
+    print(f"[{os.path.basename(__file__)}] ERROR: Loading image failed for Court {court_id}: {e}", file=sys.stderr)
+    traceback.print_exception(type(e), e, e.__traceback__, file=sys.stderr)
+    return court_id, None, None, None
+
+def _iter_loaded_courts(court_ids, workers):
+    """依完成順序返回 _load_court 的結果；workers <= 1 時在目前的執行緒逐一處理。"""
+    if workers <= 1 or len(court_ids) <= 1:
+        for court_id in court_ids:
+            try:
+                loaded = _load_court(court_id)
+            except Exception as e:
+                loaded = _load_failed(court_id, e)
+            yield loaded
+        return
+    pool = _get_decode_pool(workers)
+    futures = {pool.submit(_load_court, court_id): court_id for court_id in court_ids}
+    for future in as_completed(futures):
+        try:
+            loaded = future.result()
+        except Exception as e:
+            loaded = _load_failed(futures[future], e)
+        yield loaded
+
+def recognize_all_courts(max_batch_size=None, court_ids=None, workers=None):
+    """
+    收集所有球場的比分區域，疊成 batch 送進 SVHNCNN，再將結果分配回各球場，
+    最後以單次讀取 / 寫入 courts.json 套用所有球場的更新。
+    設定解碼執行緒時，圖片解碼在執行緒池中進行，並與模型推論重疊 (見 DECODE_WORKERS / PIPELINE_CHUNK)。
+
+    Args:
+        max_batch_size (int, optional): 單次 forward 的最大張數，預設為 MAX_BATCH_SIZE。
+        court_ids (iterable, optional): 只處理這些球場 (例如 watch_courts.py 偵測到有新圖片的球場)，預設為全部。
+        workers (int, optional): 解碼執行緒數，預設為 DECODE_WORKERS；0 或 1 表示逐一解碼。
+
+    Returns:
+        list[dict]: 成功寫入 courts.json 的更新列表。
+    """
+    if workers is None:
+        workers = DECODE_WORKERS
+    court_ids = sorted(court_ids) if court_ids is not None else list(range(1, COURT_COUNT + 1))
+    # 逐一解碼時沒有可以重疊的工作，維持整批只做一次推論
+    chunk = max(1, PIPELINE_CHUNK) if workers > 1 else len(court_ids)
+    sync_smoother_matches(court_ids)
+    results = {}  # court_id -> (score1_str, score2_str[, confidence])
+    pending = []  # 等待推論的 (court_id, latest_img_path)
+    regions = []
 
+    def _flush():
+        try:
+            predictions = predict_scores_batch(regions, max_batch_size=max_batch_size, return_confidence=True)
+        except Exception as e:
+            print(f"[{os.path.basename(__file__)}] ERROR: Batched AI prediction failed for courts {[c for c, _ in pending]}: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            predictions = []
+            pending.clear()
+        for i, (court_id, latest_img_path) in enumerate(pending):
+            prediction = predictions[2 * i:2 * i + 2]
+            recognition_cache.put(court_id, latest_img_path, [score for score, _ in prediction], _cache_context(court_id))
+            result = gate_prediction(court_id, prediction)
+            if result is not None:
+                results[court_id] = result
+        pending.clear()
+        regions.clear()
+
+    for court_id, latest_img_path, cached, court_regions in _iter_loaded_courts(court_ids, workers):
+        if latest_img_path is None:
+            continue
+        if cached is not None:
+            result = cached_result(court_id, cached) # 圖片沒有變動，不必解碼與推論
+            if result is not None:
+                results[court_id] = result
+            continue
+        if court_regions is None:
+            continue
+        region1, region2 = court_regions
+        pending.append((court_id, latest_img_path))
+        regions.extend([region1, region2])
+        if len(pending) >= chunk:
+            _flush() # 其餘球場仍在背景解碼
+    if pending:
+        _flush()
+    recognition_cache.save()
+    score_smoother.save()
+
+    return apply_court_updates(results)
+
+def recognize_frames(frames, max_batch_size=None):
+    """
+    辨識已解碼的畫面 (stream_ingest.py 的串流影格)，一次批次推論後寫入 courts.json。
+
+    Args:
+        frames (dict): court_id (int) -> BGR 畫面 (np.ndarray)
+
+    Returns:
+        list[dict]: 成功寫入 courts.json 的更新列表。
+    """
+    court_ids = []
+    regions = []
+    for court_id, frame in sorted(frames.items()):
+        region1, region2 = court_regions_from_frame(court_id, frame)
+        court_ids.append(court_id)
+        regions.extend([region1, region2])
+    if not regions:
+        return []
+
+    try:
+        predictions = predict_scores_batch(regions, max_batch_size=max_batch_size, return_confidence=True)
+    except Exception as e:
+        print(f"[{os.path.basename(__file__)}] ERROR: Batched AI prediction failed for courts {court_ids}: {e}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return []
+    sync_smoother_matches(court_ids)
+    results = {}
+    for i, court_id in enumerate(court_ids):
+        result = gate_prediction(court_id, predictions[2 * i:2 * i + 2])
+        if result is not None:
+            results[court_id] = result
+    score_smoother.save()
+    return apply_court_updates(results)
 
 if __name__ == "__main__":
     print(f"[{os.path.basename(__file__)}] Python script execution started via __main__.", file=sys.stderr)
@@ -210,12 +743,11 @@ if __name__ == "__main__":
 
     if input_court_id == "all":
         #print(f"[{os.path.basename(__file__)}] DEBUG: Processing all courts (1-12).", file=sys.stderr)
-        for i in range(1, 13):
-            recognize_and_process_court(str(i)) # 不再收集結果
+        recognize_all_courts() # 不再輸出結果
     else:
         try:
             cid = int(input_court_id)
-            if cid < 1 or cid > 12:
+            if cid < 1 or cid > COURT_COUNT:
                 raise ValueError()
             #print(f"[{os.path.basename(__file__)}] DEBUG: Processing single court: {input_court_id}.", file=sys.stderr)
             recognize_and_process_court(input_court_id) # 不再收集結果
@@ -223,4 +755,6 @@ if __name__ == "__main__":
             print(f"[{os.path.basename(__file__)}] ERROR: Invalid court ID: {input_court_id}", file=sys.stderr)
             sys.exit(1)
     
+    print(f"[{os.path.basename(__file__)}] Recognition cache: {recognition_cache.stats()}", file=sys.stderr)
+    print(f"[{os.path.basename(__file__)}] Score smoothing: {score_smoother.stats()}", file=sys.stderr)
     print(f"[{os.path.basename(__file__)}] Python script finished execution.", file=sys.stderr)
\ No newline at end of file
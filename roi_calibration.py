@@ -0,0 +1,283 @@
+import argparse
+import os
+import sys
+
+import cv2
+
+import state_store
+from digit_segmentation import find_digit_boxes, same_row
+from frame_index import FrameIndex
+
+# --- 每個球場的比分區域 (ROI) 校正 ---
+# 相機畫面大部分是球場而不是記分板，每次都把整張畫面切成左右兩半再縮放很浪費。
+# 這裡用一張參考畫面自動找出兩位選手的比分位置，存在 courts.json 旁邊的 court_rois.json：
+#   {"court_1": {"frame_size": [w, h], "split_x": 960, "player1": [x, y, w, h], "player2": [x, y, w, h],
+#                "digit_height": 54, "reduce": 1}, ...}
+# 之後辨識時只裁切這兩個區域；reduce > 1 時用 cv2.IMREAD_REDUCED_COLOR_N 以較低解析度解碼
+# (JPEG 可直接在 DCT 階段縮小)，減少解碼、複製和縮放的成本。
+# 座標一律以原始解析度記錄。可手動編輯 court_rois.json，或刪除某個球場的設定讓它重新校正。
+#
+# 偵測方式與數字大小無關：以 MSER 在整張畫面中找出形狀像數字的區塊，把高度相近、上下緣對齊、
+# 水平相鄰的區塊串成一排，再在最大的間距處分成左右兩位選手的比分 (每邊最多 max_digits 位數)。
+# 每個候選記分板交給 score_fn (recognize_score.py 傳入 SVHNCNN 的信心值) 辨識，只接受信心值最高
+# 且達到 min_confidence 的候選；找不到時返回 None，呼叫端繼續使用整張畫面左右切半，不會存下錯誤的 ROI。
+# 校正畫面可能只顯示一位數 (例如 "5")，之後的 "15"、"40" 會比較寬：ROI 的寬度至少保留 max_digits 位數；
+# 辨識時若數字外框碰到 ROI 的左右邊界 (見 needs_recalibration)，就以當下的畫面重新校正。
+
+ROI_FILE = os.path.join(state_store.BASE_DIR, "court_rois.json")
+ROI_MARGIN = 0.25       # 自動偵測的數字外框向外擴張的比例
+ROI_MIN_CONFIDENCE = 0.8 # 候選記分板至少要以這個信心值被辨識，才會存成 ROI
+MIN_DIGIT_HEIGHT = 12   # 原始解析度下可偵測的最小數字高度 (像素)
+MIN_DIGIT_PIXELS = 32   # 以降低解析度解碼後，數字高度至少要保留的像素數 (SVHNCNN 的輸入為 32x32)
+DIGIT_HEIGHT_RANGE = (1.0, 8.0) # 數字外框的高寬比 ("1" 很窄，"0" 接近正方形)
+DIGIT_FILL_RANGE = (0.15, 0.85) # 筆畫佔外框的比例；實心的色塊 (球員、看板) 不是數字
+MAX_GAP_RATIO = 3.0     # 同一個記分板中相鄰數字的最大間距 (相對於字高)
+SPLIT_GAP_RATIO = 1.5   # 兩位選手之間的間距至少要是同一個比分內數字間距的幾倍
+DIGIT_ASPECT = 0.6      # 估計字寬時使用的寬高比 ("1" 的外框很窄，不能直接當作字寬)
+DIGIT_GAP_RATIO = 0.3   # 數字之間的間距約為字寬的比例
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def load_rois():
+    return state_store.read_json(ROI_FILE, default={})
+
+def save_rois(rois):
+    state_store.write_json(ROI_FILE, rois)
+
+def _union(boxes):
+    x0 = min(b[0] for b in boxes)
+    y0 = min(b[1] for b in boxes)
+    x1 = max(b[0] + b[2] for b in boxes)
+    y1 = max(b[1] + b[3] for b in boxes)
+    return x0, y0, x1 - x0, y1 - y0
+
+def _iou(a, b):
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    if x1 <= x0 or y1 <= y0:
+        return 0.0
+    inter = (x1 - x0) * (y1 - y0)
+    return inter / (a[2] * a[3] + b[2] * b[3] - inter)
+
+def find_digit_candidates(image):
+    """
+    在整張畫面中找出形狀像數字的區塊 (與數字大小無關)。
+
+    Returns:
+        list[tuple]: (x, y, w, h)，依 x 排序；MSER 對同一個數字產生的多個相近外框只保留最大的一個。
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    mser = cv2.MSER_create(delta=5, min_area=MIN_DIGIT_HEIGHT * MIN_DIGIT_HEIGHT // 4, max_area=gray.size // 20)
+    regions, bboxes = mser.detectRegions(gray)
+    boxes = []
+    for points, (x, y, w, h) in zip(regions, bboxes):
+        if h < MIN_DIGIT_HEIGHT or not DIGIT_HEIGHT_RANGE[0] <= h / w <= DIGIT_HEIGHT_RANGE[1]:
+            continue
+        if DIGIT_FILL_RANGE[0] <= len(points) / (w * h) <= DIGIT_FILL_RANGE[1]:
+            boxes.append((int(x), int(y), int(w), int(h)))
+    kept = []
+    for box in sorted(boxes, key=lambda b: b[2] * b[3], reverse=True):
+        if all(_iou(box, k) < 0.6 for k in kept):
+            kept.append(box)
+    return sorted(kept)
+
+def _split_scores(row, max_digits):
+    """在最大的間距處把一排數字分成兩位選手的比分；不像記分板時返回 None。"""
+    gaps = [b[0] - (a[0] + a[2]) for a, b in zip(row, row[1:])]
+    i = max(range(len(gaps)), key=gaps.__getitem__)
+    left, right = row[:i + 1], row[i + 1:]
+    if len(left) > max_digits or len(right) > max_digits:
+        return None
+    others = gaps[:i] + gaps[i + 1:]
+    if others and gaps[i] < SPLIT_GAP_RATIO * max(others):
+        return None
+    return left, right
+
+def find_scoreboards(image, max_digits=2):
+    """
+    找出可能的記分板：一排 2 ~ 2 * max_digits 個高度相近、上下緣對齊的數字，分成左右兩位選手的比分。
+    字高是相對於同一排的其他數字比較，而不是整張畫面，所以畫面中很小的記分板也找得到。
+
+    Returns:
+        list[tuple]: (player1 的數字外框, player2 的數字外框)，依字高由大到小排列。
+    """
+    boxes = find_digit_candidates(image)
+    boards = []
+    for i, first in enumerate(boxes):
+        row = [first]
+        for box in boxes[i + 1:]:
+            last = row[-1]
+            if box[0] - (last[0] + last[2]) > MAX_GAP_RATIO * max(first[3], box[3]):
+                break # boxes 依 x 排序，之後的只會更遠
+            if box[0] < last[0] + last[2] or not (same_row(first, box) and same_row(last, box)):
+                continue
+            row.append(box)
+            board = _split_scores(row, max_digits)
+            if board is not None:
+                boards.append(board)
+            if len(row) == 2 * max_digits:
+                break
+    boards.sort(key=lambda board: -max(b[3] for side in board for b in side))
+    return boards
+
+def _reserve_width(box, boxes, max_digits, x_min, x_max):
+    """加寬外框到至少能容納 max_digits 位數 (左右平均擴張，不超出 [x_min, x_max])。"""
+    x, y, w, h = box
+    digit_w = max(max(b[2] for b in boxes), DIGIT_ASPECT * max(b[3] for b in boxes))
+    needed = int(round(digit_w * (max_digits + DIGIT_GAP_RATIO * (max_digits - 1))))
+    if w >= needed:
+        return box
+    x0 = x - (needed - w) // 2
+    x0 = max(x_min, min(x0, x_max - needed))
+    x1 = min(x_max, x0 + needed)
+    return x0, y, x1 - x0, h
+
+def _expand(box, x_min, x_max, frame_h, margin=ROI_MARGIN):
+    x, y, w, h = box
+    dx, dy = int(w * margin), int(h * margin)
+    x0, y0 = max(x_min, x - dx), max(0, y - dy)
+    x1, y1 = min(x_max, x + w + dx), min(frame_h, y + h + dy)
+    return [x0, y0, x1 - x0, y1 - y0]
+
+def _choose_reduce(digit_height):
+    """以偵測到的字高 (而不是 ROI 的高度) 選擇最大的解碼縮小倍率。"""
+    reduce = 1
+    for factor in sorted(REDUCED_FLAGS):
+        if digit_height / factor >= MIN_DIGIT_PIXELS:
+            reduce = factor
+    return reduce
+
+def _player_bounds(roi):
+    """兩位選手的比分區域在 x 方向的範圍 (以記分板中間的間距分開；舊的設定沒有 split_x 時以畫面中線分開)。"""
+    frame_w = roi["frame_size"][0]
+    split_x = roi.get("split_x", frame_w // 2)
+    return {"player1": (0, split_x), "player2": (split_x, frame_w)}
+
+def _board_roi(board, frame_size, max_digits):
+    w, h = frame_size
+    left, right = board
+    split_x = (left[-1][0] + left[-1][2] + right[0][0]) // 2
+    roi = {"frame_size": [w, h], "split_x": split_x}
+    for player, boxes in zip(("player1", "player2"), board):
+        x_min, x_max = _player_bounds(roi)[player]
+        box = _reserve_width(_union(boxes), boxes, max_digits, x_min, x_max)
+        roi[player] = _expand(box, x_min, x_max, h)
+    roi["digit_height"] = min(b[3] for side in board for b in side)
+    roi["reduce"] = _choose_reduce(roi["digit_height"])
+    return roi
+
+def calibrate_frame(image, score_fn, max_digits=2, min_confidence=ROI_MIN_CONFIDENCE):
+    """
+    從參考畫面自動偵測兩位選手的比分區域。
+
+    Args:
+        score_fn (callable): score_fn((player1_region, player2_region)) -> 辨識信心值 (0 ~ 1)。
+        min_confidence (float): 信心值低於這個門檻的候選不採用；全部都不採用時視為校正失敗。
+
+    Returns:
+        dict | None: {"frame_size", "split_x", "player1", "player2", "digit_height", "reduce"}；
+                     找不到能以足夠信心辨識的記分板時返回 None。
+    """
+    h, w = image.shape[:2]
+    confident = []
+    for board in find_scoreboards(image, max_digits):
+        roi = _board_roi(board, (w, h), max_digits)
+        if score_fn(crop_roi(image, roi)) >= min_confidence:
+            confident.append((set(board[0]) | set(board[1]), roi))
+    # "15 30" 中的 "5 3" 也會被當成一組候選；只保留不被其他可信候選包含的，再取字高最大的 (依 find_scoreboards 的順序)
+    for digits, roi in confident:
+        if not any(digits < other for other, _ in confident):
+            return roi
+    return None
+
+def is_whole_halves(roi):
+    """舊版 calibrate_frame 找不到數字時存下的是整個左右半邊；這種設定不是 ROI，應重新校正。"""
+    if "split_x" in roi:
+        return False
+    w, h = roi["frame_size"]
+    return roi.get("player1") == [0, 0, w // 2, h] or roi.get("player2") == [w // 2, 0, w - w // 2, h]
+
+def needs_recalibration(roi, regions, max_digits=2):
+    """
+    ROI 裁切出的區域中，數字外框碰到左右邊界、而 ROI 還能往該方向擴大時返回 True
+    (多半是校正後比分變成更多位數，有一部分落在 ROI 之外)。
+
+    Args:
+        regions (tuple): read_roi_regions / crop_roi 返回的 (player1_region, player2_region)。
+    """
+    for player, region in zip(("player1", "player2"), regions):
+        x, _, w, _ = roi[player]
+        x_min, x_max = _player_bounds(roi)[player]
+        region_w = region.shape[1]
+        for bx, _, bw, _ in find_digit_boxes(region, max_digits):
+            if (bx <= 0 and x > x_min) or (bx + bw >= region_w and x + w < x_max):
+                return True
+    return False
+
+def read_roi_regions(image_path, roi):
+    """
+    依 ROI 設定以 (可能降低的) 解析度解碼圖片，只返回兩位選手的比分區域。
+
+    Returns:
+        tuple | None: (player1_region, player2_region)，解碼失敗或畫面尺寸與校正時不同時返回 None。
+    """
+    reduce = roi.get("reduce", 1)
+    image = cv2.imread(image_path, REDUCED_FLAGS.get(reduce, cv2.IMREAD_COLOR))
+    if image is None:
+        return None
+    frame_w, frame_h = roi["frame_size"]
+    # 降低解析度解碼後的尺寸為 ceil(原尺寸 / reduce)
+    if image.shape[1] != -(-frame_w // reduce) or image.shape[0] != -(-frame_h // reduce):
+        return None
+    return crop_roi(image, roi, reduce)
+
+def crop_roi(image, roi, reduce=1):
+    """依 ROI 裁切兩位選手的比分區域；image 為以 1/reduce 解析度解碼的畫面。"""
+    regions = []
+    for player in ("player1", "player2"):
+        x, y, w, h = (v // reduce for v in roi[player])
+        regions.append(image[y:y + max(1, h), x:x + max(1, w)])
+    return tuple(regions)
+
+def calibrate_court(court_id, image_path, score_fn, rois=None, max_digits=2):
+    """用指定的參考畫面校正單一球場，成功時寫入 court_rois.json。"""
+    image = cv2.imread(image_path)
+    if image is None:
+        print(f"[{os.path.basename(__file__)}] ERROR: Image read failed for: {image_path}", file=sys.stderr)
+        return None
+    roi = calibrate_frame(image, score_fn, max_digits)
+    if roi is None:
+        print(f"[{os.path.basename(__file__)}] ERROR: No scoreboard recognized with confidence in {image_path}", file=sys.stderr)
+        return None
+    if rois is None:
+        rois = load_rois()
+    rois[f"court_{court_id}"] = roi
+    save_rois(rois)
+    print(f"[{os.path.basename(__file__)}] Court {court_id} ROI: {roi}", file=sys.stderr)
+    return roi
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="校正各球場記分板的比分區域 (ROI)")
+    parser.add_argument("court", help="球場編號或 all")
+    parser.add_argument("--reference", help="參考畫面路徑 (預設使用該球場資料夾中最新的圖片)")
+    args = parser.parse_args()
+
+    import recognize_score # 需要模型判斷候選記分板的信心值；載入較慢，只在直接執行時匯入
+
+    score_dir = os.path.join(state_store.BASE_DIR, "score_ocr")
+    court_ids = range(1, 13) if args.court == "all" else [int(args.court)]
+    rois = load_rois()
+    for court_id in court_ids:
+        reference = args.reference
+        if reference is None:
+            folder = os.path.join(score_dir, f"court_{court_id}")
+            reference = FrameIndex().latest(folder) if os.path.isdir(folder) else None
+            if reference is None:
+                print(f"[{os.path.basename(__file__)}] ERROR: No images found in folder: {folder}", file=sys.stderr)
+                continue
+        calibrate_court(court_id, reference, recognize_score.roi_confidence, rois, recognize_score.MAX_DIGITS_PER_SIDE)
@@ -2,11 +2,12 @@ import json
 import os
 import re
 import sys
+import state_store
 sys.stdout.reconfigure(encoding='utf-8') # 針對 print() 輸出的內容
 sys.stderr.reconfigure(encoding='utf-8') # 針對錯誤訊息或你用 print(..., file=sys.stderr) 的內容
 # --- 配置檔案名稱 ---
-DATA_FILE = "courts.json"      # 用於儲存球場狀態和排程資訊
-SCHEDULE_FILE = "mainDraw.json" # 用於儲存賽程表和比賽結果 (勝者)
+DATA_FILE = state_store.DATA_FILE         # 用於儲存球場狀態和排程資訊
+SCHEDULE_FILE = state_store.SCHEDULE_FILE # 用於儲存賽程表和比賽結果 (勝者)
 
 # --- 球場數據的載入和儲存 ---
 def load_data():
@@ -17,16 +18,13 @@ def load_data():
           { "id": f"Court {i+1}", "player1": "", "player2": "", "nextPlayers": "", "status": "空閒", "score1": None, "score2": None, "current_match_number": None, "next_match_number": None }
           for i in range(2) # 假設預設有 2 個球場
         ]
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(initial_courts, f, ensure_ascii=False, indent=2)
+        state_store.save(DATA_FILE, initial_courts)
         return initial_courts
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return state_store.load(DATA_FILE)
 
 def save_data(data):
-    """將球場數據存回 courts.json"""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """將球場數據存回 courts.json (原子性寫入)"""
+    state_store.save(DATA_FILE, data)
 
 
 # --- 輔助函數：讀取和寫入 mainDraw.json ---
@@ -34,18 +32,73 @@ def load_main_draw_data():
     """從 mainDraw.json 載入賽程數據"""
     if not os.path.exists(SCHEDULE_FILE):
         # 如果檔案不存在，初始化一個空列表並寫入，以避免後續錯誤
-        with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-            json.dump([], f, ensure_ascii=False, indent=2)
+        state_store.save(SCHEDULE_FILE, [])
         return []
-    with open(SCHEDULE_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return state_store.load(SCHEDULE_FILE)
 
 def save_main_draw_data(main_draw_data):
-    """將賽程數據存回 mainDraw.json"""
-    with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-        json.dump(main_draw_data, f, ensure_ascii=False, indent=2)
+    """將賽程數據存回 mainDraw.json (原子性寫入)"""
+    state_store.save(SCHEDULE_FILE, main_draw_data)
 
 ### 將mainDraw.json 中 'Winner of Match X' 換成實際勝者
+WINNER_PLACEHOLDER_PATTERN = re.compile(r"Winner of Match (\d+)")
+
+def build_match_index(main_draw_data):
+    """建立 比賽編號 -> 比賽資料 的索引，取代逐場線性搜尋。"""
+    return {m.get("match"): m for m in main_draw_data}
+
+def build_dependency_map(main_draw_data):
+    """
+    建立 前一場比賽編號 -> [(使用其勝者的比賽, 'player1' 或 'player2'), ...] 的對應表。
+    只收錄仍是 'Winner of Match X' 佔位符的欄位。
+    """
+    dependents = {}
+    for match_info in main_draw_data:
+        for slot in ("player1", "player2"):
+            placeholder = match_info.get(slot, '')
+            match_result = WINNER_PLACEHOLDER_PATTERN.match(placeholder)
+            if match_result:
+                feeder = int(match_result.group(1))
+                dependents.setdefault(feeder, []).append((match_info, slot))
+    return dependents
+
+def resolve_winner_placeholders(main_draw_data, finished_match_numbers=None, match_index=None, dependents=None):
+    """
+    在記憶體中將 'Winner of Match X' 佔位符替換為已確定的勝者 (就地修改 main_draw_data)。
+
+    透過比賽編號索引與依賴表，整體為 O(比賽數)；若指定 finished_match_numbers，
+    則只處理這些比賽的下游比賽 (增量更新)。
+
+    Args:
+        main_draw_data (list): mainDraw.json 的內容。
+        finished_match_numbers (iterable, optional): 新完成的比賽編號；None 表示檢查全部佔位符。
+        match_index (dict, optional): 預先建立的 build_match_index 結果。
+        dependents (dict, optional): 預先建立的 build_dependency_map 結果。
+
+    Returns:
+        list[int]: 有佔位符被替換的比賽編號 (空列表表示沒有變動)。
+    """
+    if match_index is None:
+        match_index = build_match_index(main_draw_data)
+    if dependents is None:
+        dependents = build_dependency_map(main_draw_data)
+    feeders = dependents.keys() if finished_match_numbers is None else finished_match_numbers
+
+    changed_matches = []
+    for feeder in list(feeders):
+        feeder_match = match_index.get(feeder)
+        actual_winner = feeder_match.get("winner") if feeder_match else None
+        if not actual_winner:
+            continue # 勝者尚未確定
+        for match_info, slot in dependents.get(feeder, []):
+            orig_name = match_info.get(slot, '')
+            if orig_name != actual_winner and WINNER_PLACEHOLDER_PATTERN.match(orig_name):
+                match_info[slot] = actual_winner
+                if match_info.get("match") not in changed_matches:
+                    changed_matches.append(match_info.get("match"))
+                print(f"已將比賽 {match_info.get('match')} 的 {slot.capitalize()} 從 '{orig_name}' 更新為 '{actual_winner}'。")
+    return changed_matches
+
 def resolve_winner_placeholders_in_main_draw():
     """
     讀取 mainDraw.json，並將其中所有 'Winner of Match X' 的選手佔位符
@@ -53,44 +106,8 @@ def resolve_winner_placeholders_in_main_draw():
     會將修改後的數據寫回 mainDraw.json。
     """
     main_draw_data = load_main_draw_data()
-    has_changes = False
-    
-    # Compile the regex pattern once for efficiency
-    match_pattern = re.compile(r"Winner of (Match \d+)")
+    has_changes = bool(resolve_winner_placeholders(main_draw_data))
 
-    for current_match_info in main_draw_data:
-        # Helper to find winner directly within this function
-        def _get_winner_for_placeholder(placeholder_str):
-            match_result = match_pattern.match(placeholder_str)
-            if match_result:
-                target_match_label = match_result.group(1)
-                try:
-                    target_match_number = int(target_match_label.split(' ')[1])
-                    for m_info in main_draw_data: # Iterate over the full main_draw_data to find the target match
-                        if m_info.get("match") == target_match_number:
-                            return m_info.get("winner") 
-                except (ValueError, IndexError):
-                    pass # Invalid match number format
-            return None # Placeholder not found or winner not determined
-
-        # Process player1
-        p1_orig_name = current_match_info.get('player1', '')
-        if "Winner of Match" in p1_orig_name:
-            actual_p1 = _get_winner_for_placeholder(p1_orig_name)
-            if actual_p1 and p1_orig_name != actual_p1: # Ensure there's a winner and it's different from current
-                current_match_info['player1'] = actual_p1
-                has_changes = True
-                print(f"已將比賽 {current_match_info.get('match')} 的 Player1 從 '{p1_orig_name}' 更新為 '{actual_p1}'。")
-
-        # Process player2
-        p2_orig_name = current_match_info.get('player2', '')
-        if "Winner of Match" in p2_orig_name:
-            actual_p2 = _get_winner_for_placeholder(p2_orig_name)
-            if actual_p2 and p2_orig_name != actual_p2: # Ensure there's a winner and it's different from current
-                current_match_info['player2'] = actual_p2
-                has_changes = True
-                print(f"已將比賽 {current_match_info.get('match')} 的 Player2 從 '{p2_orig_name}' 更新為 '{actual_p2}'。")
-    
     if has_changes:
         save_main_draw_data(main_draw_data)
         print("mainDraw.json 已更新，勝者佔位符已替換為實際選手名稱。")
@@ -99,36 +116,20 @@ def resolve_winner_placeholders_in_main_draw():
 
 
 
-def complete_match_on_court(court_id: str):
+def finish_match_in_memory(target_court, match_index):
     """
-    處理指定球場上比賽的結束流程：
-    1. 從 courts.json 讀取該球場的狀態和分數。
-    2. 使用球場上的 current_match_number 找到 mainDraw.json 中對應的比賽。
-    3. 更新 mainDraw.json 中該比賽的狀態為 "比賽結束"，並寫入分數和勝者。
-       注意：此函數會根據分數判斷勝者，並將其寫入 mainDraw.json 的 winner 欄位。
-    4. 清空 courts.json 中該球場的 player1, player2, score1, score2, current_match_number，並將狀態設為 "空閒"。
+    在記憶體中完成球場上的比賽 (不讀寫檔案)：
+    根據分數判斷勝者、寫入 match_index 中對應比賽的結果，並清空球場。
 
     Args:
-        court_id (str): 結束比賽的球場 ID (例如："Court 1")。
-    """
-    courts_data = load_data()
-    main_draw_data = load_main_draw_data()
-
-    target_court = None
-    for court in courts_data:
-        if court.get("id") == court_id:
-            target_court = court
-            break
-
-    if not target_court:
-        print(f"錯誤：找不到球場 '{court_id}'。")
-        return
+        target_court (dict): courts.json 中的球場資料 (current_match_number 不可為 None)。
+        match_index (dict): build_match_index 建立的 比賽編號 -> 比賽資料 索引。
 
+    Returns:
+        bool: 是否在 mainDraw 中記錄了新的比賽結果。
+    """
+    court_id = target_court.get("id")
     current_match_num = target_court.get("current_match_number")
-    if current_match_num is None:
-        print(f"錯誤：球場 '{court_id}' 目前沒有進行中的比賽或無有效比賽編號。")
-        return
-
     current_player1 = target_court.get("player1")
     current_player2 = target_court.get("player2")
     try:
@@ -151,28 +152,23 @@ def complete_match_on_court(court_id: str):
         else:
             final_winner = None # 平局
 
-    # 在 mainDraw.json 中找到對應的比賽並更新
-    match_found_in_draw = False
-    for match_info in main_draw_data:
-        if match_info.get("match") == current_match_num:
-            if match_info.get("status") != "比賽結束": 
-                match_info["status"] = "比賽結束"
-                match_info["score_p1"] = final_score1
-                match_info["score_p2"] = final_score2
-                # 將判斷出的勝者保存到 mainDraw.json
-                match_info["winner"] = final_winner 
-                match_found_in_draw = True
-                print(f"已更新 mainDraw.json 中比賽 {current_match_num} 的結果：")
-                print(f"  選手: {current_player1} vs {current_player2}")
-                print(f"  比分: {final_score1}-{final_score2}，勝者: {final_winner}")
-                break
-            else:
-                print(f"警告：mainDraw.json 中的比賽 (Match {current_match_num}) 已標記為 '比賽結束'，跳過更新。")
-                match_found_in_draw = True
-                break
-
-    if not match_found_in_draw:
+    # 在 mainDraw.json 中找到對應的比賽並更新 (以比賽編號索引直接查找)
+    recorded = False
+    match_info = match_index.get(current_match_num)
+    if match_info is None:
         print(f"警告：在 mainDraw.json 中找不到與球場 '{court_id}' (比賽編號 {current_match_num}) 對應的比賽。")
+    elif match_info.get("status") != "比賽結束": 
+        match_info["status"] = "比賽結束"
+        match_info["score_p1"] = final_score1
+        match_info["score_p2"] = final_score2
+        # 將判斷出的勝者保存到 mainDraw.json
+        match_info["winner"] = final_winner 
+        recorded = True
+        print(f"已更新 mainDraw.json 中比賽 {current_match_num} 的結果：")
+        print(f"  選手: {current_player1} vs {current_player2}")
+        print(f"  比分: {final_score1}-{final_score2}，勝者: {final_winner}")
+    else:
+        print(f"警告：mainDraw.json 中的比賽 (Match {current_match_num}) 已標記為 '比賽結束'，跳過更新。")
 
     # 更新 courts.json 中該球場的狀態和清空選手資訊
     target_court["player1"] = ""
@@ -185,18 +181,77 @@ def complete_match_on_court(court_id: str):
     '''這邊由assign_next_match 來處理
     target_court["next_match_number"] = None # This was already in place'''
 
+    return recorded
+
+def complete_match_on_court(court_id: str):
+    """
+    處理指定球場上比賽的結束流程：
+    1. 從 courts.json 讀取該球場的狀態和分數。
+    2. 使用球場上的 current_match_number 找到 mainDraw.json 中對應的比賽。
+    3. 更新 mainDraw.json 中該比賽的狀態為 "比賽結束"，並寫入分數和勝者。
+       注意：此函數會根據分數判斷勝者，並將其寫入 mainDraw.json 的 winner 欄位。
+    4. 清空 courts.json 中該球場的 player1, player2, score1, score2, current_match_number，並將狀態設為 "空閒"。
+
+    Args:
+        court_id (str): 結束比賽的球場 ID (例如："Court 1")。
+    """
+    courts_data = load_data()
+    main_draw_data = load_main_draw_data()
+
+    target_court = None
+    for court in courts_data:
+        if court.get("id") == court_id:
+            target_court = court
+            break
+
+    if not target_court:
+        print(f"錯誤：找不到球場 '{court_id}'。")
+        return
+
+    current_match_num = target_court.get("current_match_number")
+    if current_match_num is None:
+        print(f"錯誤：球場 '{court_id}' 目前沒有進行中的比賽或無有效比賽編號。")
+        return
+
+    finish_match_in_memory(target_court, build_match_index(main_draw_data))
+
     save_data(courts_data) # 保存更新後的 courts.json
     save_main_draw_data(main_draw_data) # 保存更新後的 mainDraw.json
     print(f"球場 '{court_id}' 已清空並設為空閒。")
 
+
+def complete_matches_on_courts(courts_data, main_draw_data):
+    """
+    批次完成所有「比賽結束」的球場 (只在記憶體中修改，不讀寫檔案)。
+
+    依球場順序逐一處理，結果與過去每完成一場就重新載入檔案的流程相同，
+    但整批只需要一次載入和一次寫入。
+
+    Returns:
+        int: 完成的球場數。
+    """
+    match_index = build_match_index(main_draw_data)
+    completed = 0
+    for court in courts_data:
+        if court.get("status") == "比賽結束" and court.get("current_match_number") is not None:
+            print(f"DEBUG: 檢測到球場 {court['id']} (Match {court['current_match_number']}) 狀態為 '比賽結束'，觸發處理。")
+            finish_match_in_memory(court, match_index)
+            print(f"球場 '{court['id']}' 已清空並設為空閒。")
+            completed += 1
+    return completed
+
         
-def assign_next_match(data):
+def assign_next_match(data, main_draw_data=None):
     """
     根據球場狀態和等待選手列表，排定下一場比賽。
     邏輯現在改為：
     1. 首先檢查並將 nextPlayers 晉升到 player1/player2 (如果主場地空閒)。
     2. 然後再為所有可用的 nextPlayers 位置預排新比賽。
     注意：此函數不再負責更新 mainDraw.json 中的勝者佔位符。
+
+    Args:
+        data (list): courts.json 的內容 (就地修改)。
+        main_draw_data (list, optional): 已載入的 mainDraw 資料；為 None 時從 mainDraw.json 載入。
     """
     active_player_names = set() # 用於追蹤單一選手是否活躍
     scheduled_match_numbers = set()
@@ -219,7 +274,8 @@ def assign_next_match(data):
             scheduled_match_numbers.add(court["next_match_number"])
 
     # --- 整合 get_waiting_players 的邏輯 ---
-    main_draw_data = load_main_draw_data() # Load current mainDraw data
+    if main_draw_data is None:
+        main_draw_data = load_main_draw_data() # Load current mainDraw data
     waiting_matches_info = []
     
     for match in main_draw_data:
@@ -294,46 +350,39 @@ def main():
     """
 
     print("\n--- 系統啟動 ---")
-    
-    # 確保文件存在或被初始化
-    _ = load_data() # 載入並確保 courts.json 存在
-    _ = load_main_draw_data() # 載入並確保 mainDraw.json 存在
-
-    # Step 1: 自動更新 mainDraw.json 中的勝者佔位符 (先執行)
-    print("\n--- 執行自動更新 mainDraw.json 中的勝者佔位符 ---")
-    resolve_winner_placeholders_in_main_draw()
 
-    # Step 2: 自動檢測並同步結束的比賽結果 (從 courts.json 判斷)
-    # 使用 while 迴圈確保所有已結束的比賽都被處理，因為每次處理會改變 courts.json 的狀態
-    print("\n--- 執行自動檢測並同步結束的比賽結果 ---")
-    
-    # 這裡的邏輯需要確保只要有任何一個球場被標記為"比賽結束"，它就能被處理
-    # 我們使用一個迴圈，直到沒有更多「比賽結束」狀態的球場為止
-    while True:
-        courts_data_current = load_data() # 每次迴圈都載入最新狀態
-        found_completed_match = False
-        
-        for court in courts_data_current:
-            if court.get("status") == "比賽結束" and court.get("current_match_number") is not None:
-                print(f"DEBUG: 檢測到球場 {court['id']} (Match {court['current_match_number']}) 狀態為 '比賽結束'，觸發處理。")
-                complete_match_on_court(court["id"])
-                found_completed_match = True
-                # 因為 complete_match_on_court 會修改並保存 courts.json，
-                # 所以一旦處理完一個球場，我們需要中斷當前迴圈並重新從檔案載入最新數據
-                # 否則，你可能會在一個過時的數據副本上繼續迭代
-                break # 處理完一個就跳出內層 for 迴圈，重新開始外層 while 迴圈
-        
-        if not found_completed_match:
-            break # 如果沒有找到任何已結束的比賽，則跳出 while 迴圈
-            
-    # Step 3: 執行比賽排程
-    print("\n--- 執行比賽排程 ---")
-    # 重新載入 courts.json 的最新狀態，因為前面的 `complete_match_on_court` 可能已經修改了它
-    court_data_for_assignment = load_data() 
-    assign_next_match(court_data_for_assignment)
-    save_data(court_data_for_assignment) # 保存排程後的 courts.json
+    # 整個排程流程在 courts.json / mainDraw.json 的檔案鎖內進行，
+    # 避免與 recognize_score.py 的寫入交錯 (鎖可重入，內部的載入 / 儲存不會死鎖)
+    with state_store.locked(DATA_FILE, SCHEDULE_FILE):
+        # 確保文件存在或被初始化；整個流程只載入一次，在記憶體中處理後再各寫入一次
+        courts_data = load_data() # 載入並確保 courts.json 存在
+        main_draw_data = load_main_draw_data() # 載入並確保 mainDraw.json 存在
+        courts_before = json.dumps(courts_data, ensure_ascii=False)
+        main_draw_before = json.dumps(main_draw_data, ensure_ascii=False)
+
+        # Step 1: 自動更新 mainDraw.json 中的勝者佔位符 (先執行)
+        print("\n--- 執行自動更新 mainDraw.json 中的勝者佔位符 ---")
+        if resolve_winner_placeholders(main_draw_data):
+            print("mainDraw.json 已更新，勝者佔位符已替換為實際選手名稱。")
+        else:
+            print("mainDraw.json 中沒有需要更新的勝者佔位符。")
+
+        # Step 2: 自動檢測並同步結束的比賽結果 (從 courts.json 判斷)
+        # 所有「比賽結束」的球場在同一份記憶體資料上依序處理，不再每完成一場就重新載入
+        print("\n--- 執行自動檢測並同步結束的比賽結果 ---")
+        complete_matches_on_courts(courts_data, main_draw_data)
+
+        # Step 3: 執行比賽排程
+        print("\n--- 執行比賽排程 ---")
+        assign_next_match(courts_data, main_draw_data)
+
+        # 各檔案最多寫入一次，且只在內容有變動時寫入
+        if json.dumps(courts_data, ensure_ascii=False) != courts_before:
+            save_data(courts_data) # 保存排程後的 courts.json
+        if json.dumps(main_draw_data, ensure_ascii=False) != main_draw_before:
+            save_main_draw_data(main_draw_data) # 保存比賽結果與替換後的佔位符
     
-    print(json.dumps({"status": "ok", "message": "下一場選手排程完成"}))
+        print(json.dumps({"status": "ok", "message": "下一場選手排程完成"}))
 
     print("\n--- 系統任務執行完畢 ---")
             
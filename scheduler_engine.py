@@ -0,0 +1,243 @@
+import argparse
+import bisect
+import collections
+import json
+import os
+import sys
+import time
+
+import schedule_manager as sm
+import state_store
+
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
+
+# --- 事件驅動的增量排程引擎 ---
+# schedule_manager.main() 每次都重新載入兩個檔案並重建所有集合；這裡則把賽程狀態
+# (比賽編號索引、勝者依賴表、可排程比賽) 常駐在記憶體中，只對以下事件做 O(受影響) 的處理：
+# * match_finished       球場狀態變為「比賽結束」→ 記錄結果並清空球場
+# * winner_determined    比賽有了勝者 → 替換下游比賽的 'Winner of Match X'
+# * placeholder_resolved 比賽雙方選手都已確定 → 加入可排程列表
+# * court_freed          球場空出 → 晉升 nextPlayers 並預排下一場
+# 每一輪只讀取 courts.json (球場數很少)，並只寫回有變動的球場與比賽欄位。
+# mainDraw.json 被外部修改 (例如執行 inital.py) 時會自動全量重新載入；
+# 使用 SQLite 儲存引擎時請以 reload() 或重新啟動引擎來套用外部修改。
+
+FINISHED = "比賽結束"
+COURT_FIELDS = ("player1", "player2", "score1", "score2", "nextPlayers", "status",
+                "current_match_number", "next_match_number")
+
+
+class SchedulerEngine:
+    def __init__(self):
+        self.reload()
+
+    # --- 全量載入 (只在啟動或 mainDraw.json 被外部修改時執行) ---
+    def reload(self):
+        with state_store.locked(sm.DATA_FILE, sm.SCHEDULE_FILE):
+            self.main_draw = sm.load_main_draw_data()
+            self.match_index = sm.build_match_index(self.main_draw)
+            self.dependents = sm.build_dependency_map(self.main_draw)
+            self._dirty_matches = set()
+            self.ready = []
+            self._assigned = set() # 因為已排上球場而移出 ready 的比賽
+            self._load_courts()
+
+            # 啟動時先補上所有已確定的勝者
+            for match_num in sm.resolve_winner_placeholders(self.main_draw, match_index=self.match_index, dependents=self.dependents):
+                self._dirty_matches.add(match_num)
+
+            # 可排程比賽：尚未結束且雙方選手都已確定，依比賽編號排序
+            self.ready = sorted(
+                m.get("match") for m in self.main_draw
+                if self._is_schedulable(m)
+            )
+            self._persist()
+        print(f"[{os.path.basename(__file__)}] Loaded {len(self.main_draw)} matches, {len(self.ready)} schedulable.", file=sys.stderr)
+
+    def _load_courts(self):
+        self.courts = sm.load_data()
+        self._court_snapshot = {c.get("id"): {k: c.get(k) for k in COURT_FIELDS} for c in self.courts}
+        # 球場上 (含下一場) 的選手與比賽；球場數很少，每輪重建即可
+        self.active_players = collections.Counter()
+        self.scheduled_matches = set()
+        for court in self.courts:
+            for name in self._court_players(court):
+                self.active_players[name] += 1
+            for key in ("current_match_number", "next_match_number"):
+                if court.get(key) is not None:
+                    self.scheduled_matches.add(court[key])
+        # 球場的下一場可能在引擎之外被清空 (server.js 修復 courts.json、管理員編輯、只重置球場)；
+        # 已移出 ready 但不在任何球場上、且仍可排程的比賽重新加入，否則永遠不會再被排程
+        for match_num in list(self._assigned):
+            if match_num not in self.scheduled_matches:
+                self._assigned.discard(match_num)
+                self._make_ready(match_num)
+
+    @staticmethod
+    def _court_players(court):
+        names = [court.get("player1", "").strip(), court.get("player2", "").strip()]
+        if court.get("nextPlayers", "").strip():
+            names.extend(court["nextPlayers"].strip().split(" vs "))
+        return [n for n in names if n]
+
+    @staticmethod
+    def _is_schedulable(match_info):
+        if match_info.get("status") == FINISHED:
+            return False
+        return not any("Winner of Match" in match_info.get(slot, '') for slot in ("player1", "player2"))
+
+    def _draw_changed_externally(self):
+        if state_store.BACKEND == "sqlite":
+            return False
+        try:
+            return os.stat(sm.SCHEDULE_FILE).st_mtime_ns != self._draw_mtime
+        except FileNotFoundError:
+            return True
+
+    # --- 事件處理 ---
+    def on_match_finished(self, court):
+        match_num = court.get("current_match_number")
+        finished_players = [court.get("player1", "").strip(), court.get("player2", "").strip()]
+        recorded = sm.finish_match_in_memory(court, self.match_index)
+        print(f"球場 '{court.get('id')}' 已清空並設為空閒。")
+
+        for name in finished_players:
+            if name and self.active_players[name] > 0:
+                self.active_players[name] -= 1
+        self.scheduled_matches.discard(match_num)
+        if recorded:
+            self._dirty_matches.add(match_num)
+            self.on_winner_determined(match_num)
+
+    def on_winner_determined(self, match_num):
+        changed = sm.resolve_winner_placeholders(
+            self.main_draw, finished_match_numbers=[match_num],
+            match_index=self.match_index, dependents=self.dependents,
+        )
+        for consumer in changed:
+            self._dirty_matches.add(consumer)
+            self.on_placeholder_resolved(consumer)
+
+    def on_placeholder_resolved(self, match_num):
+        self._make_ready(match_num)
+
+    def _make_ready(self, match_num):
+        match_info = self.match_index.get(match_num)
+        if match_info is not None and self._is_schedulable(match_info):
+            index = bisect.bisect_left(self.ready, match_num)
+            if index == len(self.ready) or self.ready[index] != match_num:
+                self.ready.insert(index, match_num)
+
+    def on_court_freed(self, court):
+        """球場空出時將預排的比賽晉升到主場地 (與 assign_next_match 階段一相同)。"""
+        if court["player1"].strip() or court["player2"].strip() or not court["nextPlayers"].strip():
+            return
+        p1_promo, p2_promo = court["nextPlayers"].strip().split(" vs ")
+        match_num_promo = court["next_match_number"]
+
+        court["player1"] = p1_promo
+        court["player2"] = p2_promo
+        court["status"] = "進行中" # 比賽正式開始
+        court["score1"] = 0
+        court["score2"] = 0
+        court["current_match_number"] = match_num_promo
+        court["nextPlayers"] = ""
+        court["next_match_number"] = None
+        print(f"球場 {court['id']}：已將預備比賽 {match_num_promo} ({p1_promo} vs {p2_promo}) 晉升至主場地。")
+
+    def _fill_next_slot(self, court):
+        """為空的 nextPlayers 預排編號最小、且雙方選手都不在場上的比賽 (與 assign_next_match 階段二相同)。"""
+        if court["nextPlayers"].strip():
+            return
+        i = 0
+        while i < len(self.ready):
+            match_num = self.ready[i]
+            match_info = self.match_index.get(match_num)
+            if match_num in self.scheduled_matches or match_info is None or not self._is_schedulable(match_info):
+                if match_num in self.scheduled_matches:
+                    self._assigned.add(match_num)
+                del self.ready[i] # 已排程或已不可排程，惰性移除
+                continue
+            p1, p2 = match_info["player1"], match_info["player2"]
+            if self.active_players[p1] or self.active_players[p2]:
+                i += 1
+                continue
+            court["nextPlayers"] = f"{p1} vs {p2}"
+            court["next_match_number"] = match_num
+            self.active_players[p1] += 1
+            self.active_players[p2] += 1
+            self.scheduled_matches.add(match_num)
+            self._assigned.add(match_num)
+            del self.ready[i]
+            print(f"已預排比賽 {match_num} ({p1} vs {p2}) 到球場 {court['id']} 的下一場。")
+            return
+
+    # --- 一輪處理 ---
+    def run_once(self):
+        """
+        讀取最新的球場狀態並處理所有事件，只寫回有變動的欄位。
+
+        Returns:
+            int: 本輪完成的比賽數。
+        """
+        if self._draw_changed_externally():
+            print(f"[{os.path.basename(__file__)}] mainDraw.json changed externally, reloading.", file=sys.stderr)
+            self.reload()
+
+        with state_store.locked(sm.DATA_FILE, sm.SCHEDULE_FILE):
+            self._load_courts()
+
+            finished = 0
+            for court in self.courts:
+                if court.get("status") == FINISHED and court.get("current_match_number") is not None:
+                    print(f"DEBUG: 檢測到球場 {court['id']} (Match {court['current_match_number']}) 狀態為 '比賽結束'，觸發處理。")
+                    self.on_match_finished(court)
+                    finished += 1
+
+            # 先晉升所有空出的球場，再依球場順序預排，與 assign_next_match 的順序一致
+            for court in self.courts:
+                self.on_court_freed(court)
+            for court in self.courts:
+                self._fill_next_slot(court)
+
+            self._persist()
+        return finished
+
+    def _persist(self):
+        court_deltas = {}
+        for court in self.courts:
+            before = self._court_snapshot.get(court.get("id"), {})
+            changed = {k: court.get(k) for k in COURT_FIELDS if court.get(k) != before.get(k)}
+            if changed:
+                court_deltas[court.get("id")] = changed
+        match_deltas = {num: dict(self.match_index[num]) for num in self._dirty_matches if num in self.match_index}
+
+        state_store.apply_deltas(sm.DATA_FILE, "id", court_deltas)
+        state_store.apply_deltas(sm.SCHEDULE_FILE, "match", match_deltas)
+        self._dirty_matches.clear()
+        self._court_snapshot = {c.get("id"): {k: c.get(k) for k in COURT_FIELDS} for c in self.courts}
+        try:
+            self._draw_mtime = os.stat(sm.SCHEDULE_FILE).st_mtime_ns
+        except FileNotFoundError:
+            self._draw_mtime = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件驅動的增量比賽排程引擎")
+    parser.add_argument("--loop", action="store_true", help="常駐執行，每隔 --interval 秒處理一輪")
+    parser.add_argument("--interval", type=float, default=10.0, help="常駐模式下每輪的間隔秒數 (預設 10)")
+    args = parser.parse_args()
+
+    engine = SchedulerEngine()
+    while True:
+        engine.run_once()
+        print(json.dumps({"status": "ok", "message": "下一場選手排程完成"}))
+        sys.stdout.flush()
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
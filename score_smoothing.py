@@ -0,0 +1,132 @@
+import json
+import os
+import sys
+import traceback
+from collections import Counter
+
+import state_store
+
+
+class ScoreSmoother:
+    """
+    比分的時間平滑與信心門檻。
+
+    單一誤判的影格可能讓球場直接變成「比賽結束」，排程器隨即結束比賽並釋放球場，事後很難復原。
+    每個球場保留最近幾張影格的辨識結果與 softmax 信心值，新的比分必須符合以下其一才會被採用：
+    * 連續 stable_frames 張影格都是同一個比分；或
+    * 單張影格的信心值達到 commit_confidence。
+    信心值低於 min_confidence 的影格直接捨棄，不寫入任何狀態。
+    """
+
+    def __init__(self, state_file=None, min_confidence=0.6, commit_confidence=0.95, stable_frames=3, history_size=5):
+        """
+        Args:
+            state_file (str, optional): 歷史紀錄持久化的 JSON 檔案路徑，讓每次呼叫 recognize_score.py
+                                        的獨立程序也能累積多張影格；為 None 時只存在記憶體中。
+            min_confidence (float): 低於此信心值的影格直接捨棄。
+            commit_confidence (float): 達到此信心值的單張影格可立即採用新比分。
+            stable_frames (int): 新比分需連續出現幾張影格才採用。
+            history_size (int): 每個球場保留的影格數。
+        """
+        self.state_file = state_file
+        self.min_confidence = min_confidence
+        self.commit_confidence = commit_confidence
+        self.stable_frames = max(1, stable_frames)
+        self.history_size = max(self.stable_frames, history_size)
+        self.courts = {}  # court_id (str) -> {"committed": [s1, s2, conf] | None, "history": [[s1, s2, conf], ...], "match": 場次編號}
+        self.counts = Counter()  # accepted / pending / rejected
+        self._dirty = False
+        if state_file:
+            self.load()
+
+    def _court(self, court_id):
+        return self.courts.setdefault(str(court_id), {"committed": None, "history": []})
+
+    def committed(self, court_id):
+        """返回球場目前採用的 (score1, score2, confidence)，尚未採用任何比分時返回 None。"""
+        committed = self._court(court_id)["committed"]
+        return tuple(committed) if committed else None
+
+    def observe(self, court_id, score1, score2, confidence):
+        """
+        加入一張新影格的辨識結果。
+
+        Returns:
+            tuple | None: 應寫入 courts.json 的 (score1, score2, confidence)；
+                          影格被捨棄或新比分尚未穩定時返回 None。
+        """
+        if confidence < self.min_confidence:
+            self.counts["rejected"] += 1
+            return None
+
+        court = self._court(court_id)
+        history = court["history"]
+        history.append([score1, score2, round(confidence, 4)])
+        del history[:-self.history_size]
+        self._dirty = True
+
+        committed = court["committed"]
+        recent = history[-self.stable_frames:]
+        same_as_committed = committed is not None and committed[:2] == [score1, score2]
+        stable = len(recent) == self.stable_frames and all(h[:2] == [score1, score2] for h in recent)
+        if not (same_as_committed or stable or confidence >= self.commit_confidence):
+            self.counts["pending"] += 1
+            return None
+
+        if stable:
+            confidence = sum(h[2] for h in recent) / len(recent) # 穩定時以最近幾張的平均信心值為準
+        court["committed"] = [score1, score2, round(confidence, 4)]
+        self.counts["accepted"] += 1
+        return score1, score2, confidence
+
+    def sync_match(self, court_id, match_number):
+        """
+        球場換到另一場比賽 (courts.json 的 current_match_number 改變) 時清除歷史紀錄，
+        上一場最後採用的比分 (例如 6:4) 不會沿用到新的比賽。
+
+        Returns:
+            bool: 是否清除了歷史紀錄。
+        """
+        court = self._court(court_id)
+        if court.get("match") == match_number:
+            return False
+        self.reset(court_id)
+        self._court(court_id)["match"] = match_number
+        return True
+
+    def reset(self, court_id=None):
+        """清除單一球場 (或全部) 的歷史紀錄，例如換場或重新開始比賽時。"""
+        if court_id is None:
+            self.courts.clear()
+        else:
+            self.courts.pop(str(court_id), None)
+        self._dirty = True
+
+    def stats(self):
+        return {
+            "accepted": self.counts["accepted"],
+            "pending": self.counts["pending"],
+            "rejected": self.counts["rejected"],
+        }
+
+    def load(self):
+        """從 state_file 載入歷史紀錄，檔案不存在或損毀時從空白開始。"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                self.courts = json.load(f).get("courts", {})
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            print(f"[{os.path.basename(__file__)}] WARNING: Ignoring unreadable history {self.state_file}: {e}", file=sys.stderr)
+            self.courts = {}
+
+    def save(self):
+        """有變動時將歷史紀錄寫回 state_file (暫存檔 + os.replace，寫入中斷不會留下半個檔案)。"""
+        if not self.state_file or not self._dirty:
+            return
+        try:
+            state_store.write_json(self.state_file, {"courts": self.courts})
+            self._dirty = False
+        except OSError as e:
+            print(f"[{os.path.basename(__file__)}] ERROR: Failed to write history {self.state_file}: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
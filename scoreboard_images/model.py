@@ -0,0 +1,131 @@
+import importlib.util
+import os
+import sys
+
+import cv2
+import torch
+from torch.utils.data import Dataset
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BASE_DIR)
+SVHN_DIR = os.path.join(ROOT_DIR, "SVHN")
+# 共用 recognize_score.py 的前處理與數字切割，以及 SVHN/ 的 augment.py
+sys.path.append(ROOT_DIR)
+sys.path.append(SVHN_DIR)
+
+from preprocess import RegionPreprocessor
+from digit_segmentation import segment_digits
+
+def _load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# SVHN/model.py 與這個檔案同名，以檔案路徑載入並取別名，避免 import model 互相遮蔽
+svhn_model = _load_module("svhn_model", os.path.join(SVHN_DIR, "model.py"))
+SVHNCNN = svhn_model.SVHNCNN
+
+# --- 記分板比分資料集 ---
+# label.txt 每行為「檔名 選手1比分 選手2比分」。每張圖片以 crop_score_regions 相同的方式切成左右兩半，
+# 再以 digit_segmentation 切出各個數字 (與 recognize_score.py 的辨識流程相同)，每個數字成為一筆樣本。
+# 數字數量與標籤位數不符的區域會被略過。
+# 前處理後的 32x32 uint8 影像與標籤存成 scoreboard_cache.pt；label.txt 與圖片都沒有變動時直接載入，
+# 重複微調時不必再解碼 JPEG。樣本格式與 SVHNDataset(raw=True) 相同，可搭配 augment.BatchAugment 使用。
+
+LABEL_FILE = os.path.join(BASE_DIR, "label.txt")
+CACHE_FILE = os.path.join(BASE_DIR, "scoreboard_cache.pt")
+# 與 recognize_score.py 相同的色彩順序，微調後的權重才能直接部署
+COLOR_ORDER = os.environ.get("RECOGNIZE_COLOR_ORDER", "bgr")
+
+def read_labels(label_file=LABEL_FILE):
+    """讀取 label.txt，返回 {檔名: (選手1比分, 選手2比分)}。"""
+    labels = {}
+    with open(label_file, "r") as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) != 3:
+                continue
+            filename, p1, p2 = parts[0], int(parts[1]), int(parts[2])
+            labels[filename] = (p1, p2)
+    return labels
+
+def crop_score_regions(image):
+    """與 recognize_score.crop_score_regions 相同的左右切分。"""
+    center_x = image.shape[1] // 2
+    return image[:, :center_x], image[:, center_x:]
+
+def _fingerprint(image_dir, label_file, labels):
+    files = [label_file] + [os.path.join(image_dir, name) for name in sorted(labels)]
+    return [(os.path.basename(p), os.path.getsize(p), os.stat(p).st_mtime_ns) for p in files if os.path.exists(p)]
+
+def build_samples(image_dir=BASE_DIR, labels=None):
+    """
+    解碼圖片並切出每個數字。
+
+    Returns:
+        tuple: (images uint8 tensor [N, 32, 32, 3], labels uint8 tensor [N], sources list[str], skipped int)
+    """
+    if labels is None:
+        labels = read_labels()
+    preprocessor = RegionPreprocessor(color_order=COLOR_ORDER)
+    crops, digit_labels, sources = [], [], []
+    skipped = 0
+    for filename, scores in sorted(labels.items()):
+        image = cv2.imread(os.path.join(image_dir, filename))
+        if image is None:
+            print(f"無法讀取 {filename}，略過。")
+            continue
+        for region, score in zip(crop_score_regions(image), scores):
+            digits = [int(d) for d in str(score)]
+            region_crops = segment_digits(region, max_digits=len(digits))
+            if len(region_crops) != len(digits):
+                skipped += 1
+                continue
+            crops.extend(region_crops)
+            digit_labels.extend(digits)
+            sources.extend([filename] * len(digits))
+    if not crops:
+        return torch.empty((0, 32, 32, 3), dtype=torch.uint8), torch.empty(0, dtype=torch.uint8), [], skipped
+    # RegionPreprocessor 輸出 [N, C, H, W] 的 uint8 / 255，還原成 uint8 的 [N, H, W, C] 以節省空間
+    images = (preprocessor(crops) * 255).round().to(torch.uint8).permute(0, 2, 3, 1).contiguous()
+    return images, torch.tensor(digit_labels, dtype=torch.uint8), sources, skipped
+
+
+class ScoreboardDataset(Dataset):
+    """label.txt 中每個比分數字的 32x32 影像；__getitem__ 返回 (uint8 [H, W, C] 陣列, 標籤)。"""
+
+    def __init__(self, image_dir=BASE_DIR, label_file=LABEL_FILE, cache_file=CACHE_FILE, filenames=None):
+        """
+        Args:
+            filenames (iterable, optional): 只使用這些圖片的樣本 (例如切分訓練 / 驗證集)。
+        """
+        labels = read_labels(label_file)
+        fingerprint = _fingerprint(image_dir, label_file, labels)
+        cached = None
+        if cache_file and os.path.exists(cache_file):
+            cached = torch.load(cache_file)
+            if cached.get("fingerprint") != fingerprint or cached.get("color_order") != COLOR_ORDER:
+                cached = None
+        if cached is None:
+            images, digit_labels, sources, skipped = build_samples(image_dir, labels)
+            print(f"已從 {len(labels)} 張圖片建立 {len(digit_labels)} 個數字樣本 (略過 {skipped} 個位數不符的區域)")
+            cached = {"fingerprint": fingerprint, "color_order": COLOR_ORDER,
+                      "images": images, "labels": digit_labels, "sources": sources}
+            if cache_file:
+                torch.save(cached, cache_file)
+
+        keep = range(len(cached["sources"]))
+        if filenames is not None:
+            filenames = set(filenames)
+            keep = [i for i, source in enumerate(cached["sources"]) if source in filenames]
+        keep = torch.as_tensor(list(keep), dtype=torch.long)
+        self.images = cached["images"][keep].numpy()
+        self.labels = cached["labels"][keep].numpy()
+        self.sources = [cached["sources"][i] for i in keep.tolist()]
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        return self.images[idx], self.labels[idx]
@@ -1,6 +1,100 @@
-labels = {}
-with open("labels.txt", "r") as f:
-    for line in f:
-        parts = line.strip().split()
-        filename, p1, p2 = parts[0], int(parts[1]), int(parts[2])
-        labels[filename] = (p1, p2)
+import argparse
+import os
+import random
+
+import torch
+import torch.optim as optim
+from torch.utils.data import DataLoader
+
+from model import BASE_DIR, CACHE_FILE, LABEL_FILE, SVHN_DIR, SVHNCNN, ScoreboardDataset, read_labels
+from augment import BatchAugment
+from evaluate import evaluate
+
+# --- 以記分板圖片微調 SVHNCNN ---
+# SVHN 的門牌號碼和球場的 LED 記分板外觀差很多。這裡從 SVHN/svhn_cnn_weights.pth 開始，
+# 以 label.txt 標註的比分數字 (見 model.py 的 ScoreboardDataset) 微調。
+# 依圖片切分訓練 / 驗證集 (同一張圖片的數字不會同時出現在兩邊)，以驗證準確率最佳的權重輸出。
+# 預設不覆寫 svhn_cnn_weights.pth；確認結果後以 --output 指定，或複製成該檔名
+# (若使用 svhn_cnn_scripted.pt / svhn_cnn_int8.pt，請重新執行 export_model.py / quantize_model.py)。
+
+WEIGHTS_PATH = os.path.join(SVHN_DIR, "svhn_cnn_weights.pth")
+OUTPUT_PATH = os.path.join(SVHN_DIR, "svhn_cnn_weights_scoreboard.pth")
+
+def split_filenames(labels, val_split, seed):
+    names = sorted(labels)
+    random.Random(seed).shuffle(names)
+    val_count = int(round(len(names) * val_split)) if len(names) > 1 else 0
+    return names[val_count:], names[:val_count]
+
+def finetune(weights=WEIGHTS_PATH, output=OUTPUT_PATH, epochs=20, lr=1e-4, batch_size=32,
+             val_split=0.2, freeze_conv=False, seed=0, rebuild_cache=False):
+    torch.manual_seed(seed)
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+    if rebuild_cache and os.path.exists(CACHE_FILE):
+        os.remove(CACHE_FILE)
+    train_names, val_names = split_filenames(read_labels(LABEL_FILE), val_split, seed)
+    train_dataset = ScoreboardDataset(BASE_DIR, LABEL_FILE, CACHE_FILE, filenames=train_names)
+    val_dataset = ScoreboardDataset(BASE_DIR, LABEL_FILE, CACHE_FILE, filenames=val_names)
+    print(f"訓練: {len(train_names)} 張圖片 / {len(train_dataset)} 個數字 | 驗證: {len(val_names)} 張圖片 / {len(val_dataset)} 個數字")
+    if len(train_dataset) == 0:
+        raise SystemExit("沒有可用的訓練樣本，請確認 label.txt 與圖片")
+
+    # 記分板拍攝角度固定，旋轉與亮度變化都比 SVHN 小
+    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True,
+                              collate_fn=BatchAugment(rotation=5, brightness=0.2, contrast=0.2))
+    val_loader = DataLoader(val_dataset, batch_size=256, shuffle=False, collate_fn=BatchAugment(train=False))
+
+    model = SVHNCNN().to(device)
+    model.load_state_dict(torch.load(weights, map_location=device))
+    if freeze_conv: # 只微調全連接層
+        for param in model.conv.parameters():
+            param.requires_grad = False
+
+    best_acc = evaluate(model, val_loader, device).accuracy() if len(val_dataset) else 0.0
+    print(f"微調前 Val Acc: {best_acc:.4f}")
+    best_state = {k: v.clone() for k, v in model.state_dict().items()}
+
+    criterion = torch.nn.CrossEntropyLoss()
+    optimizer = optim.Adam((p for p in model.parameters() if p.requires_grad), lr=lr)
+    for epoch in range(epochs):
+        model.train()
+        running_loss = torch.zeros((), device=device)
+        steps = 0
+        for imgs, labels in train_loader:
+            imgs, labels = imgs.to(device), labels.to(device).long()
+            optimizer.zero_grad(set_to_none=True)
+            loss = criterion(model(imgs), labels)
+            loss.backward()
+            optimizer.step()
+            running_loss += loss.detach()
+            steps += 1
+
+        if len(val_dataset):
+            val_acc = evaluate(model, val_loader, device).accuracy()
+            improved = val_acc > best_acc
+        else:
+            val_acc, improved = float("nan"), True # 沒有驗證集時保留最後一個 epoch
+        print(f"Epoch {epoch+1}/{epochs} | Train Loss: {running_loss.item() / max(1, steps):.4f} | Val Acc: {val_acc:.4f}")
+        if improved:
+            best_acc = val_acc if len(val_dataset) else best_acc
+            best_state = {k: v.clone() for k, v in model.state_dict().items()}
+
+    torch.save(best_state, output)
+    print(f"微調後的權重已儲存為 {output} (最佳 Val Acc {best_acc:.4f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="以 scoreboard_images/label.txt 微調 SVHNCNN")
+    parser.add_argument("--weights", default=WEIGHTS_PATH, help="起始權重 (預設 SVHN/svhn_cnn_weights.pth)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="輸出權重 (預設 SVHN/svhn_cnn_weights_scoreboard.pth)")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--lr", type=float, default=1e-4)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--val-split", type=float, default=0.2, help="驗證集圖片比例 (預設 0.2)")
+    parser.add_argument("--freeze-conv", action="store_true", help="凍結卷積層，只微調全連接層")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rebuild-cache", action="store_true", help="忽略 scoreboard_cache.pt，重新解碼圖片")
+    args = parser.parse_args()
+    finetune(args.weights, args.output, args.epochs, args.lr, args.batch_size,
+             args.val_split, args.freeze_conv, args.seed, args.rebuild_cache)
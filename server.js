@@ -2,7 +2,8 @@ const express = require('express');
 const fs = require('fs');
 const path = require('path');
 const cors = require('cors');
-const { execFile } = require('child_process');
+const { execFile, spawn } = require('child_process');
+const readline = require('readline');
 const http = require('http'); // 用於發送內部請求
 
 const app = express();
@@ -35,9 +36,11 @@ function readData() {
   }
 }
 
-// 儲存球場資料
+// 儲存球場資料 (先寫暫存檔再 rename，與 Python 端 state_store.py 一樣不會留下寫到一半的檔案)
 function saveData(data) {
-  fs.writeFileSync(DATA_FILE, JSON.stringify(data, null, 2));
+  const tmpFile = `${DATA_FILE}.${process.pid}.tmp`;
+  fs.writeFileSync(tmpFile, JSON.stringify(data, null, 2));
+  fs.renameSync(tmpFile, DATA_FILE);
 }
 
 // 提供靜態資源（如 admin.html, viewer.html）
@@ -48,11 +51,101 @@ app.get('/courts', (req, res) => {
   res.json(readData());
 });
 
-// AI 辨識比分功能路由
-app.post('/update-score/all', (req, res) => {
-  console.log(`[INFO] 呼叫 AI 比分識別中...`);
+// --- 常駐 AI 比分辨識程序 (recognize_daemon.py) ---
+// 只在啟動時載入一次模型，之後透過 stdin/stdout 的 JSON lines 下達指令
+// 啟動失敗 (例如找不到 python)、stdin 寫入失敗或請求逾時都不會讓伺服器當掉：
+// 等待中的請求改用一次性執行 recognize_score.py，常駐程序 5 秒後重新啟動
+let recognizer = null;        // 子程序
+let recognizerReady = false;  // 是否已送出就緒訊息
+let recognizerSeq = 0;        // 請求編號
+const recognizerPending = new Map(); // id -> { callback, timer }
+const RECOGNIZER_TIMEOUT_MS = parseInt(process.env.RECOGNIZER_TIMEOUT_MS || '60000', 10); // 單一請求的逾時
+
+function failRecognizerPending(err) {
+  for (const { callback, timer } of recognizerPending.values()) {
+    clearTimeout(timer);
+    callback(err);
+  }
+  recognizerPending.clear();
+}
 
-  execFile('python', ['recognize_score.py', 'all'], {
+// 子程序結束、發生錯誤或逾時都會呼叫；同一個子程序只處理一次
+function restartRecognizer(child, reason) {
+  if (recognizer !== child) {
+    return;
+  }
+  console.error(`[ERROR] AI 比分辨識常駐程序${reason}，5 秒後重新啟動。`);
+  recognizerReady = false;
+  recognizer = null;
+  failRecognizerPending(new Error(`辨識程序${reason}`));
+  child.kill(); // 已結束時不會有作用
+  setTimeout(startRecognizer, 5000);
+}
+
+function startRecognizer() {
+  recognizerReady = false;
+  const child = spawn('python', ['recognize_daemon.py'], { cwd: __dirname });
+  recognizer = child;
+
+  child.on('error', (err) => {
+    restartRecognizer(child, `無法啟動或發生錯誤 (${err.message})`);
+  });
+  child.stdin.on('error', (err) => {
+    restartRecognizer(child, `的 stdin 寫入失敗 (${err.message})`);
+  });
+
+  const rl = readline.createInterface({ input: child.stdout });
+  rl.on('line', (line) => {
+    let msg;
+    try {
+      msg = JSON.parse(line);
+    } catch (e) {
+      console.error(`[ERROR] 無法解析辨識程序的回應: ${line}`);
+      return;
+    }
+    if (msg.id === null && msg.ready) {
+      if (recognizer === child) {
+        recognizerReady = true;
+        console.log(`[OK] AI 比分辨識常駐程序已就緒 (pid ${msg.pid})。`);
+      }
+      return;
+    }
+    const pending = recognizerPending.get(msg.id);
+    if (pending) {
+      recognizerPending.delete(msg.id);
+      clearTimeout(pending.timer);
+      pending.callback(null, msg);
+    }
+  });
+
+  child.stderr.setEncoding('utf8');
+  child.stderr.on('data', (chunk) => {
+    console.log('[INFO] Recognizer STDERR:\n', chunk);
+  });
+
+  child.on('exit', (code, signal) => {
+    restartRecognizer(child, `已結束 (code ${code}, signal ${signal})`);
+  });
+}
+
+function sendRecognizerCommand(command, callback) {
+  const child = recognizer;
+  if (!child || !recognizerReady || !child.stdin.writable) {
+    return callback(new Error('辨識程序尚未就緒'));
+  }
+  const id = ++recognizerSeq;
+  const timer = setTimeout(() => {
+    if (recognizerPending.has(id)) {
+      restartRecognizer(child, `在 ${RECOGNIZER_TIMEOUT_MS} ms 內沒有回應`);
+    }
+  }, RECOGNIZER_TIMEOUT_MS);
+  recognizerPending.set(id, { callback, timer });
+  child.stdin.write(JSON.stringify({ ...command, id }) + '\n');
+}
+
+// 常駐程序不可用時，退回一次性執行 recognize_score.py
+function runRecognizeScript(courtArg, res) {
+  execFile('python', ['recognize_score.py', courtArg], {
     cwd: __dirname, // 確保工作目錄正確
     encoding: 'utf8',
   }, (error, stdout, stderr) => {
@@ -74,6 +167,46 @@ app.post('/update-score/all', (req, res) => {
 
     res.json({ message: '[OK] AI 比分辨識已觸發並完成背景更新。' });
   });
+}
+
+function handleRecognizeRequest(command, courtArg, res) {
+  sendRecognizerCommand(command, (err, msg) => {
+    if (err) {
+      console.log(`[INFO] ${err.message}，改用一次性執行 recognize_score.py。`);
+      return runRecognizeScript(courtArg, res);
+    }
+    if (!msg.ok) {
+      console.error(`[ERROR] AI 比分識別失敗: ${msg.error}`);
+      return res.status(500).json({ error: 'AI 辨識失敗', details: msg.error });
+    }
+    res.json({ message: '[OK] AI 比分辨識已觸發並完成背景更新。', updates: msg.updates });
+  });
+}
+
+// 辨識程序健康檢查
+app.get('/recognizer/health', (req, res) => {
+  sendRecognizerCommand({ cmd: 'health' }, (err, msg) => {
+    if (err) {
+      return res.status(503).json({ ready: false, error: err.message });
+    }
+    res.json(msg);
+  });
+});
+
+// AI 辨識比分功能路由
+app.post('/update-score/all', (req, res) => {
+  console.log(`[INFO] 呼叫 AI 比分識別中...`);
+  handleRecognizeRequest({ cmd: 'all' }, 'all', res);
+});
+
+// AI 辨識單一球場比分
+app.post('/update-score/:courtId', (req, res) => {
+  const courtId = parseInt(req.params.courtId, 10);
+  if (!Number.isInteger(courtId) || courtId < 1 || courtId > 12) {
+    return res.status(400).json({ error: `無效的球場編號: ${req.params.courtId}` });
+  }
+  console.log(`[INFO] 呼叫 AI 比分識別中 (Court ${courtId})...`);
+  handleRecognizeRequest({ cmd: 'court', court_id: courtId }, String(courtId), res);
 });
 
 // POST 排程下一場選手（呼叫 Python）
@@ -153,22 +286,76 @@ function triggerAiScoreUpdate() {
 
 
 
+// --- 比分辨識 / 排程的執行方式 ---
+// SCORE_SOURCE=poll (預設) 每 10 秒觸發 /update-score/all；watch / stream 改由 server.js 啟動
+// watch_courts.py / stream_ingest.py，且不再設定 AI 比分識別的定時器，避免以舊的圖片覆寫比分。
+// SCHEDULER_MODE=poll (預設) 每 10 秒觸發 /assign-next；engine 改為啟動常駐的 scheduler_engine.py，
+// 且不再設定自動排程的定時器，避免兩者重複排程。
+const BACKGROUND_SCRIPTS = {
+  watch: ['watch_courts.py'],
+  stream: ['stream_ingest.py'],
+  engine: ['scheduler_engine.py', '--loop', '--interval', '10'],
+};
+
+function readMode(name, allowed) {
+  const value = process.env[name] || 'poll';
+  if (!allowed.includes(value)) {
+    console.error(`[ERROR] ${name}=${value} 無效 (可用: ${allowed.join(', ')})，改用 poll。`);
+    return 'poll';
+  }
+  return value;
+}
+
+const SCORE_SOURCE = readMode('SCORE_SOURCE', ['poll', 'watch', 'stream']);
+const SCHEDULER_MODE = readMode('SCHEDULER_MODE', ['poll', 'engine']);
+
+// 啟動常駐的 Python 程序，結束或無法啟動時 5 秒後重新啟動
+function startBackgroundScript(args) {
+  const child = spawn('python', args, { cwd: __dirname });
+  let restarted = false;
+  const restart = (reason) => {
+    if (restarted) return;
+    restarted = true;
+    console.error(`[ERROR] ${args[0]} ${reason}，5 秒後重新啟動。`);
+    child.kill();
+    setTimeout(() => startBackgroundScript(args), 5000);
+  };
+
+  child.on('error', (err) => restart(`無法啟動或發生錯誤 (${err.message})`));
+  child.on('exit', (code, signal) => restart(`已結束 (code ${code}, signal ${signal})`));
+  child.stdout.setEncoding('utf8');
+  child.stdout.on('data', (chunk) => { console.log(`[INFO] ${args[0]} STDOUT:\n`, chunk); });
+  child.stderr.setEncoding('utf8');
+  child.stderr.on('data', (chunk) => { console.log(`[INFO] ${args[0]} STDERR:\n`, chunk); });
+  console.log(`[OK] 已啟動 ${args.join(' ')} (pid ${child.pid})。`);
+}
+
 
 // 啟動伺服器
 const PORT = process.env.PORT || 3000;
 app.listen(PORT, () => {
   console.log(`[OK] Server running at http://localhost:${PORT}`);
+
+  // 啟動常駐 AI 比分辨識程序 (模型只載入一次)
+  startRecognizer();
   
-  // 伺服器啟動後立即觸發一次所有自動化任務
+  // 伺服器啟動後立即觸發一次所有自動化任務，然後每 10 秒觸發一次
   console.log('[INFO] 伺服器已啟動，立即觸發所有自動化功能...');
-  triggerAiScoreUpdate();
-  triggerScheduleUpdate();
-
-  // 然後每 10 秒觸發一次 AI 比分識別
-  setInterval(triggerAiScoreUpdate, 10000); 
-  console.log(`[INFO] 已設定 AI 比分識別功能每 10 秒自動更新。`);
+  if (SCORE_SOURCE === 'poll') {
+    triggerAiScoreUpdate();
+    setInterval(triggerAiScoreUpdate, 10000);
+    console.log(`[INFO] 已設定 AI 比分識別功能每 10 秒自動更新。`);
+  } else {
+    startBackgroundScript(BACKGROUND_SCRIPTS[SCORE_SOURCE]);
+    console.log(`[INFO] SCORE_SOURCE=${SCORE_SOURCE}，不設定 AI 比分識別的定時器。`);
+  }
 
-  // 然後每 10 秒觸發一次自動排程
-  setInterval(triggerScheduleUpdate, 10000); 
-  console.log(`[INFO] 已設定自動排程功能每 10 秒自動更新。`);
-});
\ No newline at end of file
+  if (SCHEDULER_MODE === 'poll') {
+    triggerScheduleUpdate();
+    setInterval(triggerScheduleUpdate, 10000);
+    console.log(`[INFO] 已設定自動排程功能每 10 秒自動更新。`);
+  } else {
+    startBackgroundScript(BACKGROUND_SCRIPTS[SCHEDULER_MODE]);
+    console.log(`[INFO] SCHEDULER_MODE=${SCHEDULER_MODE}，不設定自動排程的定時器。`);
+  }
+});
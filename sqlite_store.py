@@ -0,0 +1,240 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+# --- SQLite (WAL) 儲存引擎 ---
+# 設定環境變數 TENNIS_STATE_BACKEND=sqlite 後，state_store.load / save 會改用這裡的
+# courts / matches 資料表，而不是每次重寫整個 courts.json / mainDraw.json：
+# * WAL 模式：讀取不會阻擋寫入，寫入也不會阻擋讀取。
+# * 儲存時只對有變動的列執行 INSERT / UPDATE / DELETE。
+# * 以比賽編號、狀態和球場建立索引，查詢「第 N 場比賽」不必線性掃描。
+# courts.json / mainDraw.json 仍是權威來源：server.js 的 readData 修復、手動編輯或其他程序
+# 直接寫入 JSON 後，state_store.load 會在下一次讀取時重新匯入 (以 sync_state 記錄上次同步時
+# 檔案的 mtime)；每次寫入資料表後也會把該表匯出回對應的 JSON 檔案，兩者不會分歧。
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.environ.get("TENNIS_STATE_DB", os.path.join(BASE_DIR, "tennis_state.db"))
+
+# 依 JSON 中的欄位順序排列；不在清單中的欄位會存進 extra (JSON 字串)，不會遺失
+COURT_COLUMNS = [
+    "id", "player1", "score1", "player2", "score2", "nextPlayers", "status",
+    "next_match_number", "current_match_number",
+]
+MATCH_COLUMNS = [
+    "round", "match", "player1", "player2", "winner", "score_p1", "score_p2", "status",
+]
+
+TABLES = {
+    "courts": {"columns": COURT_COLUMNS, "key": "id"},
+    "matches": {"columns": MATCH_COLUMNS, "key": "match"},
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courts (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    player1, score1, player2, score2, nextPlayers, status,
+    next_match_number INTEGER,
+    current_match_number INTEGER,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_courts_status ON courts(status);
+CREATE INDEX IF NOT EXISTS idx_courts_current_match ON courts(current_match_number);
+CREATE INDEX IF NOT EXISTS idx_courts_next_match ON courts(next_match_number);
+
+CREATE TABLE IF NOT EXISTS matches (
+    match INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    round INTEGER,
+    player1, player2, winner, score_p1, score_p2, status,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_matches_status ON matches(status);
+CREATE INDEX IF NOT EXISTS idx_matches_round ON matches(round);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER
+);
+"""
+
+_local = threading.local()
+
+def connect():
+    """取得此執行緒的資料庫連線 (首次連線時建立資料表並啟用 WAL)。"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+def _row_values(table, position, record):
+    columns = TABLES[table]["columns"]
+    extra = {k: v for k, v in record.items() if k not in columns}
+    values = [record.get(c) for c in columns]
+    return tuple(values) + (position, json.dumps(extra, ensure_ascii=False) if extra else None)
+
+def _record_from_row(table, row):
+    columns = TABLES[table]["columns"]
+    record = dict(zip(columns, row[:len(columns)]))
+    extra = row[len(columns) + 1]
+    if extra:
+        record.update(json.loads(extra))
+    return record
+
+def _select_sql(table):
+    columns = TABLES[table]["columns"]
+    return f"SELECT {', '.join(columns)}, position, extra FROM {table}"
+
+def load_table(table):
+    """依原本的順序載入整個資料表，返回與 JSON 檔案相同格式的 list[dict]。"""
+    rows = connect().execute(_select_sql(table) + " ORDER BY position").fetchall()
+    return [_record_from_row(table, row) for row in rows]
+
+def save_table(table, records):
+    """
+    將 list[dict] 存回資料表，只寫入有變動的列。
+
+    Returns:
+        int: 實際寫入 (新增、更新或刪除) 的列數。
+    """
+    conn = connect()
+    columns = TABLES[table]["columns"]
+    key = TABLES[table]["key"]
+    key_index = columns.index(key)
+    all_columns = columns + ["position", "extra"]
+    placeholders = ", ".join("?" for _ in all_columns)
+    assignments = ", ".join(f"{c} = ?" for c in all_columns if c != key)
+
+    changes = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        existing = {row[key_index]: row for row in conn.execute(_select_sql(table))}
+        seen = set()
+        for position, record in enumerate(records):
+            values = _row_values(table, position, record)
+            pk = values[key_index]
+            seen.add(pk)
+            old = existing.get(pk)
+            if old is None:
+                conn.execute(f"INSERT INTO {table} ({', '.join(all_columns)}) VALUES ({placeholders})", values)
+                changes += 1
+            elif tuple(old) != values:
+                params = [v for c, v in zip(all_columns, values) if c != key] + [pk]
+                conn.execute(f"UPDATE {table} SET {assignments} WHERE {key} = ?", params)
+                changes += 1
+        for pk in existing.keys() - seen:
+            conn.execute(f"DELETE FROM {table} WHERE {key} = ?", (pk,))
+            changes += 1
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return changes
+
+def update_fields(table, deltas):
+    """
+    只更新指定列的指定欄位 (不讀取整個資料表)。
+
+    Args:
+        deltas (dict): 主鍵 -> {欄位: 新值}；不在 TABLES 欄位清單中的欄位會合併進 extra。
+
+    Returns:
+        int: 實際更新的列數。
+    """
+    conn = connect()
+    columns = TABLES[table]["columns"]
+    key = TABLES[table]["key"]
+    changes = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for pk, fields in deltas.items():
+            known = {k: v for k, v in fields.items() if k in columns and k != key}
+            unknown = {k: v for k, v in fields.items() if k not in columns}
+            if unknown:
+                row = conn.execute(f"SELECT extra FROM {table} WHERE {key} = ?", (pk,)).fetchone()
+                if row is None:
+                    continue
+                extra = json.loads(row[0]) if row[0] else {}
+                extra.update(unknown)
+                known["extra"] = json.dumps(extra, ensure_ascii=False)
+            if not known:
+                continue
+            assignments = ", ".join(f"{c} = ?" for c in known)
+            cursor = conn.execute(f"UPDATE {table} SET {assignments} WHERE {key} = ?", list(known.values()) + [pk])
+            changes += cursor.rowcount
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return changes
+
+def is_empty(table):
+    return connect().execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+
+def synced_mtime(table):
+    """上次匯入 / 匯出時 JSON 檔案的 mtime (st_mtime_ns)；從未同步時返回 None。"""
+    row = connect().execute("SELECT mtime_ns FROM sync_state WHERE name = ?", (table,)).fetchone()
+    return row[0] if row else None
+
+def mark_synced(table, mtime_ns):
+    connect().execute("INSERT OR REPLACE INTO sync_state (name, mtime_ns) VALUES (?, ?)", (table, mtime_ns))
+
+# --- 索引查詢 ---
+def get_match(match_number):
+    """以比賽編號查詢單場比賽，找不到時返回 None。"""
+    row = connect().execute(_select_sql("matches") + " WHERE match = ?", (match_number,)).fetchone()
+    return _record_from_row("matches", row) if row else None
+
+def get_matches_by_status(status):
+    rows = connect().execute(_select_sql("matches") + " WHERE status = ? ORDER BY match", (status,)).fetchall()
+    return [_record_from_row("matches", row) for row in rows]
+
+def get_court_for_match(match_number):
+    """查詢目前 (或下一場) 排入指定比賽的球場，找不到時返回 None。"""
+    row = connect().execute(
+        _select_sql("courts") + " WHERE current_match_number = ? OR next_match_number = ?",
+        (match_number, match_number),
+    ).fetchone()
+    return _record_from_row("courts", row) if row else None
+
+# --- JSON 匯入 / 匯出 ---
+def _read_json_file(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def import_json(courts_path, draw_path):
+    """將 courts.json / mainDraw.json 匯入資料庫 (只寫入有差異的列)。"""
+    for table, path in (("courts", courts_path), ("matches", draw_path)):
+        records = _read_json_file(path)
+        if records is not None:
+            save_table(table, records)
+            mark_synced(table, os.stat(path).st_mtime_ns)
+
+def export_json(courts_path, draw_path):
+    """將資料庫內容匯出為 courts.json / mainDraw.json。"""
+    # 延遲匯入以避免與 state_store 的循環匯入
+    import state_store
+    for table, path in (("courts", courts_path), ("matches", draw_path)):
+        state_store.write_json(path, load_table(table))
+        mark_synced(table, os.stat(path).st_mtime_ns)
+
+
+if __name__ == "__main__":
+    import state_store
+    commands = {
+        "import": lambda: import_json(state_store.DATA_FILE, state_store.SCHEDULE_FILE),
+        "export": lambda: export_json(state_store.DATA_FILE, state_store.SCHEDULE_FILE),
+    }
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print(f"Usage: python {os.path.basename(__file__)} [import|export]", file=sys.stderr)
+        sys.exit(1)
+    commands[sys.argv[1]]()
+    print(f"{sys.argv[1]} 完成：{DB_FILE}")
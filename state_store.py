@@ -0,0 +1,295 @@
+import contextlib
+import copy
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl # POSIX
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+# --- 共用的狀態檔案存取模組 ---
+# recognize_score.py、schedule_manager.py 與 inital.py 都透過這裡 (load / save / update)
+# 讀寫 courts.json / mainDraw.json：
+# 1. 寫入一律先寫暫存檔再 os.replace，讀取端永遠不會讀到寫到一半的檔案。
+# 2. 讀-改-寫以 advisory file lock (<檔名>.lock) 保護，兩個排程同時觸發也不會互相覆蓋。
+# 3. 同一執行緒內鎖可重入，外層持有鎖時內層的 load/save/update 不會死鎖。
+# 4. 可選的 SQLite (WAL) 儲存引擎，見 sqlite_store.py。
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = os.path.join(BASE_DIR, "courts.json")      # 球場狀態和排程資訊
+SCHEDULE_FILE = os.path.join(BASE_DIR, "mainDraw.json") # 賽程表和比賽結果
+
+LOCK_TIMEOUT = 30.0 # 秒，等待其他程序釋放鎖的上限
+
+# 儲存引擎："json" (預設，直接讀寫 JSON 檔案) 或 "sqlite" (sqlite_store.py，WAL 模式)
+BACKEND = os.environ.get("TENNIS_STATE_BACKEND", "json")
+
+_thread_state = threading.local()
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+
+class StateLockTimeout(TimeoutError):
+    """在 LOCK_TIMEOUT 內無法取得狀態檔案的鎖。"""
+
+
+def _norm(path):
+    return os.path.abspath(path)
+
+def _held_locks():
+    if not hasattr(_thread_state, "held"):
+        _thread_state.held = {} # path -> (lock_fd, depth)
+    return _thread_state.held
+
+def _process_lock(path):
+    # 同一程序內不同執行緒之間的互斥 (Windows 的 msvcrt.locking 不會阻擋同一程序)
+    with _process_locks_guard:
+        return _process_locks.setdefault(path, threading.Lock())
+
+def _os_lock(fd, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise StateLockTimeout(f"等待檔案鎖逾時 (fd {fd})")
+            time.sleep(0.05)
+
+def _os_unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+def _acquire(path, timeout):
+    held = _held_locks()
+    if path in held:
+        fd, depth = held[path]
+        held[path] = (fd, depth + 1)
+        return
+    plock = _process_lock(path)
+    if not plock.acquire(timeout=timeout):
+        raise StateLockTimeout(f"等待 {path} 的鎖逾時")
+    try:
+        fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _os_lock(fd, timeout)
+        except BaseException:
+            os.close(fd)
+            raise
+    except BaseException:
+        plock.release()
+        raise
+    held[path] = (fd, 1)
+
+def _release(path):
+    held = _held_locks()
+    fd, depth = held[path]
+    if depth > 1:
+        held[path] = (fd, depth - 1)
+        return
+    del held[path]
+    try:
+        _os_unlock(fd)
+    finally:
+        os.close(fd)
+        _process_lock(path).release()
+
+@contextlib.contextmanager
+def locked(*paths, timeout=None):
+    """
+    取得一個或多個狀態檔案的獨佔鎖。
+
+    多個檔案時一律依路徑排序取得，避免兩個程序以相反順序上鎖造成死鎖。
+    """
+    if timeout is None:
+        timeout = LOCK_TIMEOUT
+    ordered = sorted({_norm(p) for p in paths})
+    acquired = []
+    try:
+        for path in ordered:
+            _acquire(path, timeout)
+            acquired.append(path)
+        yield
+    finally:
+        for path in reversed(acquired):
+            _release(path)
+
+def read_json(path, default=None):
+    """
+    讀取 JSON 狀態檔案。檔案不存在或內容無效時返回 default 的副本 (預設為空列表)。
+
+    因為寫入是原子性的，讀取不需要上鎖。
+    """
+    if default is None:
+        default = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return copy.deepcopy(default)
+    except json.JSONDecodeError as e:
+        print(f"[{os.path.basename(__file__)}] ERROR: {path} JSON decode error: {e}", file=sys.stderr)
+        return copy.deepcopy(default)
+
+def _replace(src, dst):
+    # Windows 上若有其他程序正開著目標檔案，os.replace 可能短暫失敗，稍後重試
+    for attempt in range(20):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == 19:
+                raise
+            time.sleep(0.05)
+
+def write_json(path, data):
+    """以「暫存檔 + os.replace」原子性地寫入 JSON 狀態檔案。"""
+    path = _norm(path)
+    with locked(path):
+        directory, name = os.path.split(path)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            _replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+# --- 與儲存引擎無關的存取介面 ---
+def _sqlite_table(path):
+    if BACKEND != "sqlite":
+        return None
+    return {DATA_FILE: "courts", SCHEDULE_FILE: "matches"}.get(_norm(path))
+
+def _json_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _sync_from_json(table, path):
+    """
+    SQLite 模式下 JSON 檔案仍是權威來源：檔案在上次匯入 / 匯出之後被其他程序改寫
+    (server.js 的 readData 修復、手動編輯、inital.py 重設) 時，先重新匯入資料表。
+    """
+    import sqlite_store
+    mtime = _json_mtime(path)
+    if mtime is None or mtime == sqlite_store.synced_mtime(table):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        # 無效的檔案不匯入，否則會清空資料表；下一次寫入時會由資料庫重新匯出
+        print(f"[{os.path.basename(__file__)}] WARNING: Not importing unreadable {path} into SQLite: {e}", file=sys.stderr)
+        return
+    if sqlite_store.synced_mtime(table) is not None:
+        print(f"[{os.path.basename(__file__)}] WARNING: {path} changed outside the SQLite backend, re-importing it", file=sys.stderr)
+    sqlite_store.save_table(table, records)
+    sqlite_store.mark_synced(table, mtime)
+
+def _export_to_json(table, path, records):
+    import sqlite_store
+    write_json(path, records)
+    sqlite_store.mark_synced(table, _json_mtime(path))
+
+def load(path, default=None):
+    """
+    載入狀態 (courts.json 或 mainDraw.json)。
+
+    BACKEND 為 "sqlite" 時改從資料庫讀取；JSON 檔案比上次同步還新時 (包括資料庫還是空的時候)
+    會先匯入 JSON 檔案。
+    """
+    table = _sqlite_table(path)
+    if table is None:
+        return read_json(path, default)
+    import sqlite_store
+    with locked(path):
+        _sync_from_json(table, path)
+        records = sqlite_store.load_table(table)
+    if not records and default is not None:
+        return copy.deepcopy(default)
+    return records
+
+def save(path, data):
+    """
+    儲存狀態。BACKEND 為 "sqlite" 時只寫入有變動的列，並將該表匯出回
+    courts.json / mainDraw.json，讓直接讀檔的 server.js 與其他工具看到相同的內容。
+    """
+    table = _sqlite_table(path)
+    if table is None:
+        write_json(path, data)
+        return
+    import sqlite_store
+    with locked(path):
+        changes = sqlite_store.save_table(table, data)
+        if changes or _json_mtime(path) != sqlite_store.synced_mtime(table):
+            _export_to_json(table, path, data)
+
+def update(path, fn, default=None):
+    """
+    交易式的讀-改-寫：在鎖內讀取檔案、呼叫 fn(data)，內容有變動時才原子性寫回。
+
+    Args:
+        path (str): 狀態檔案路徑。
+        fn (callable): 接收目前的資料；可以就地修改並返回 None，或返回新的資料。
+        default: 檔案不存在或無效時使用的初始資料 (預設為空列表)。
+
+    Returns:
+        更新後的資料。
+    """
+    with locked(path):
+        data = load(path, default)
+        before = json.dumps(data, ensure_ascii=False, sort_keys=True)
+        result = fn(data)
+        if result is not None:
+            data = result
+        if json.dumps(data, ensure_ascii=False, sort_keys=True) != before:
+            save(path, data)
+        return data
+
+def apply_deltas(path, key, deltas):
+    """
+    只套用指定列的欄位變動，不覆蓋其他程序 (例如 recognize_score.py) 同時寫入的欄位。
+
+    Args:
+        path (str): 狀態檔案路徑。
+        key (str): 用來識別列的欄位 ("id" 或 "match")。
+        deltas (dict): key 的值 -> {欄位: 新值}。
+    """
+    if not deltas:
+        return
+    table = _sqlite_table(path)
+    if table is not None:
+        import sqlite_store
+        with locked(path):
+            _sync_from_json(table, path)
+            if sqlite_store.update_fields(table, deltas):
+                _export_to_json(table, path, sqlite_store.load_table(table))
+        return
+
+    def _merge(records):
+        for record in records:
+            fields = deltas.get(record.get(key))
+            if fields:
+                record.update(fields)
+
+    update(path, _merge)
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
+
+# --- 串流影像擷取 ---
+# 不再等 score_ocr/court_N 出現新的 JPEG、由 server.js 每 10 秒輪詢一次，而是直接以
+# cv2.VideoCapture 讀取每個球場的影像來源 (RTSP/HTTP 串流網址或本機影片檔)。
+# * 每個球場一個 FrameReader 執行緒，持續 grab() 把來源的緩衝區讀空 (不會累積延遲)，
+#   只在取樣時間到時才 retrieve() 解碼，並只保留最新的一張影格 (舊的直接覆蓋，沒有積壓)。
+# * 主迴圈在有新影格時被喚醒，把所有有新影格的球場疊成一批送進 recognize_score.recognize_frames，
+#   因此比分延遲約為取樣間隔 + 一次推論的時間，而不是 10 秒。
+# * 本機影片檔會依原始 FPS 播放並預設循環，方便以 .mp4 模擬攝影機測試。
+#
+# 影像來源設定 (stream_sources.json)：{"1": "rtsp://192.168.0.11/stream", "2": "videos/court_2.mp4", ...}
+
+SOURCES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stream_sources.json")
+RECONNECT_DELAY = 2.0 # 來源斷線或無法開啟時，重新連線前等待的秒數
+
+
+class FrameReader(threading.Thread):
+    """讀取單一球場的影像來源，依取樣間隔保留最新的一張影格。"""
+
+    def __init__(self, court_id, source, sample_interval=0.5, loop_file=True, new_frame_event=None):
+        super().__init__(name=f"court-{court_id}-reader", daemon=True)
+        self.court_id = court_id
+        self.source = source
+        self.sample_interval = sample_interval
+        self.loop_file = loop_file
+        self.new_frame_event = new_frame_event
+        self.is_file = os.path.isfile(source)
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._stop_event = threading.Event()
+        self.frames_read = 0
+        self.frames_sampled = 0
+
+    def latest(self):
+        """返回 (序號, 影格)；尚未取得任何影格時返回 (0, None)。"""
+        with self._lock:
+            return self._seq, self._frame
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _publish(self, frame):
+        with self._lock:
+            self._frame = frame
+            self._seq += 1
+        self.frames_sampled += 1
+        if self.new_frame_event is not None:
+            self.new_frame_event.set()
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            capture.release()
+            return None
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1) # 串流來源只保留最少的內部緩衝
+        return capture
+
+    def run(self):
+        while not self._stop_event.is_set():
+            capture = self._open()
+            if capture is None:
+                print(f"[{os.path.basename(__file__)}] ERROR: Cannot open source for Court {self.court_id}: {self.source}", file=sys.stderr)
+                self._stop_event.wait(RECONNECT_DELAY)
+                continue
+
+            fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+            started = time.monotonic()
+            frame_index = 0
+            next_sample = 0.0
+            while not self._stop_event.is_set():
+                if not capture.grab(): # 只取出封包，不做色彩轉換
+                    break
+                frame_index += 1
+                self.frames_read += 1
+                if self.is_file:
+                    # 影片檔依原始 FPS 播放，模擬即時的攝影機
+                    delay = started + frame_index / fps - time.monotonic()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+                now = time.monotonic()
+                if now < next_sample:
+                    continue
+                ok, frame = capture.retrieve()
+                if ok:
+                    self._publish(frame)
+                next_sample = now + self.sample_interval
+            capture.release()
+
+            if self.is_file and not self.loop_file:
+                break
+            if not self.is_file:
+                print(f"[{os.path.basename(__file__)}] Source for Court {self.court_id} ended, reconnecting...", file=sys.stderr)
+                self._stop_event.wait(RECONNECT_DELAY)
+            elif frame_index == 0:
+                # 開得起來卻讀不到任何影格 (空的或損毀的影片檔)，不等待就會不斷重新開啟
+                print(f"[{os.path.basename(__file__)}] ERROR: No frames read from {self.source} for Court {self.court_id}, retrying...", file=sys.stderr)
+                self._stop_event.wait(RECONNECT_DELAY)
+
+
+def load_sources(path=SOURCES_FILE):
+    """讀取 stream_sources.json，返回 {court_id (int): 來源}。相對路徑以設定檔所在目錄為準。"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    sources = {}
+    for court_id, source in config.items():
+        if "://" not in source and not os.path.isabs(source):
+            source = os.path.join(base_dir, source)
+        sources[int(court_id)] = source
+    return sources
+
+def run(readers, max_batch_size=None, idle_timeout=1.0):
+    """
+    主迴圈：每當有讀取執行緒取得新影格，就把所有有新影格的球場一起辨識並寫入 courts.json。
+    同一張影格只會被辨識一次。
+    """
+    import recognize_score # 載入模型較慢，等讀取執行緒啟動後再載入
+
+    new_frame_event = readers[0].new_frame_event
+    last_seq = {}
+    while True:
+        new_frame_event.wait(idle_timeout)
+        new_frame_event.clear()
+        frames = {}
+        for reader in readers:
+            seq, frame = reader.latest()
+            if frame is not None and seq != last_seq.get(reader.court_id):
+                frames[reader.court_id] = frame
+                last_seq[reader.court_id] = seq
+        if not frames:
+            if not any(reader.is_alive() for reader in readers):
+                break # 所有來源都已結束 (不循環的影片檔)
+            continue
+        try:
+            for update in recognize_score.recognize_frames(frames, max_batch_size=max_batch_size):
+                print(json.dumps(update, ensure_ascii=False), flush=True)
+        except Exception as e:
+            print(f"[{os.path.basename(__file__)}] ERROR: Recognition failed for courts {sorted(frames)}: {e}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="從攝影機串流或影片檔即時辨識比分")
+    parser.add_argument("--sources", default=SOURCES_FILE, help="影像來源設定檔 (預設 stream_sources.json)")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="每個球場取樣影格的間隔秒數 (預設 0.5)")
+    parser.add_argument("--no-loop", action="store_true", help="影片檔播放完畢後不循環")
+    parser.add_argument("--max-batch-size", type=int, default=None, help="單次 forward 的最大張數")
+    args = parser.parse_args()
+
+    new_frame_event = threading.Event()
+    readers = [
+        FrameReader(court_id, source, args.sample_interval, not args.no_loop, new_frame_event)
+        for court_id, source in sorted(load_sources(args.sources).items())
+    ]
+    if not readers:
+        print(f"[{os.path.basename(__file__)}] ERROR: No sources configured in {args.sources}", file=sys.stderr)
+        sys.exit(1)
+    for reader in readers:
+        reader.start()
+    try:
+        run(readers, max_batch_size=args.max_batch_size)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for reader in readers:
+            reader.stop()
+        for reader in readers:
+            print(f"[{os.path.basename(__file__)}] Court {reader.court_id}: read {reader.frames_read} frames, sampled {reader.frames_sampled}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
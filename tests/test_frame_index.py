@@ -0,0 +1,57 @@
+import os
+
+from frame_index import FrameIndex, frame_sort_key
+
+
+def _touch(folder, *names):
+    for name in names:
+        (folder / name).write_bytes(b"")
+    # 目錄的 mtime 以核心的時鐘刻度更新，同一刻度內的兩次寫入可能得到相同的 mtime；
+    # 測試中明確推進 mtime，模擬下一張影格在稍後寫入
+    stat = os.stat(folder)
+    os.utime(folder, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_numeric_order():
+    names = ["10.jpg", "9.jpg", "frame_0100.png", "22.jpg", "cover.jpg"]
+    assert sorted(names, key=frame_sort_key) == ["cover.jpg", "9.jpg", "10.jpg", "22.jpg", "frame_0100.png"]
+
+
+def test_latest_uses_numeric_order(tmp_path):
+    _touch(tmp_path, "8.jpg", "9.jpg", "10.jpg", "notes.txt")
+    assert FrameIndex().latest(str(tmp_path)) == os.path.join(str(tmp_path), "10.jpg")
+
+
+def test_cached_index_refreshes_on_new_file(tmp_path):
+    index = FrameIndex()
+    folder = str(tmp_path)
+    _touch(tmp_path, "1.jpg", "2.jpg")
+    assert index.latest(folder).endswith("2.jpg")
+    assert index.latest(folder).endswith("2.jpg")
+    assert index.scans == 1 # 資料夾沒有變動時不重新掃描
+
+    _touch(tmp_path, "3.jpg")
+    assert index.latest(folder).endswith("3.jpg")
+    assert index.scans == 2
+
+
+def test_empty_folder_has_no_latest(tmp_path):
+    assert FrameIndex().latest(str(tmp_path)) is None
+
+
+def test_retention_deletes_oldest_frames(tmp_path):
+    _touch(tmp_path, *(f"{i}.jpg" for i in range(1, 13)))
+    index = FrameIndex(retain=5)
+    assert index.latest(str(tmp_path)).endswith("12.jpg")
+    assert sorted(os.listdir(tmp_path), key=frame_sort_key) == [f"{i}.jpg" for i in range(8, 13)]
+
+
+def test_retention_archives_oldest_frames(tmp_path):
+    court = tmp_path / "court_3"
+    archive = tmp_path / "archive"
+    court.mkdir()
+    _touch(court, *(f"{i}.jpg" for i in range(1, 11)))
+    index = FrameIndex(retain=3, archive_dir=str(archive))
+    assert index.latest(str(court)).endswith("10.jpg")
+    assert sorted(os.listdir(court), key=frame_sort_key) == ["8.jpg", "9.jpg", "10.jpg"]
+    assert sorted(os.listdir(archive / "court_3"), key=frame_sort_key) == [f"{i}.jpg" for i in range(1, 8)]
@@ -0,0 +1,91 @@
+import pytest
+
+from match_status import FINISHED, IN_PROGRESS, MatchTracker, compute_match_status, is_point_score, parse_score
+
+
+def _scores(score):
+    return tuple(parse_score(s) for s in score.split())
+
+
+def _play(readings, tracker=None, match_number=1):
+    """依序把讀數交給同一個球場的 MatchTracker，返回每次的狀態。"""
+    tracker = tracker or MatchTracker(games_to_win=6, tiebreak=True, tiebreak_points=7)
+    return [tracker.observe(1, match_number, *_scores(r)) for r in readings]
+
+
+@pytest.mark.parametrize("score", ["40 15", "15 0", "40 40", "40 0", "24 23", "18 19", "9 9"])
+def test_point_and_tiebreak_readings_do_not_end_match(score):
+    assert compute_match_status(*_scores(score)) == IN_PROGRESS
+
+
+@pytest.mark.parametrize("score", ["6 3", "6 2", "4 6", "7 5", "7 6", "6 7", "8 6", "10 8", "8 10"])
+def test_final_game_counts_end_match(score):
+    assert compute_match_status(*_scores(score)) == FINISHED
+
+
+@pytest.mark.parametrize("score", ["0 0", "5 4", "6 5", "6 6", "1 0"])
+def test_game_counts_in_progress(score):
+    assert compute_match_status(*_scores(score)) == IN_PROGRESS
+
+
+def test_low_tiebreak_readings_after_six_all_do_not_end_match():
+    statuses = _play(["5 5", "6 5", "6 6", "3 2", "6 4", "6 6", "7 3"])
+    assert statuses == [IN_PROGRESS] * 6 + [FINISHED]
+
+
+def test_tiebreak_reading_below_last_games_is_not_a_game_count():
+    # 漏看了 6:6：搶七中的 "6 4" 比已出現的 6:5 少，不可能是局數
+    assert _play(["6 5", "40 15", "6 4"]) == [IN_PROGRESS] * 3
+
+
+def test_final_seven_six_after_tiebreak_ends_match():
+    assert _play(["6 6", "6 6", "7 6"])[-1] == FINISHED
+    # 看過搶七得分 8:8 之後，7:6 不可能是搶七得分，只會是最終局數
+    assert _play(["6 6", "8 8", "7 6"])[-1] == FINISHED
+    # 搶七 5:4 之後的 7:6 仍可能是搶七得分
+    assert _play(["6 6", "5 4", "7 6", "9 7"]) == [IN_PROGRESS] * 3 + [FINISHED]
+
+
+@pytest.mark.parametrize("readings", [["6 6", "7 6", "8 6"], ["8 8", "9 8", "10 8"]])
+def test_long_set_game_counts_above_seven_end_match(readings):
+    tracker = MatchTracker(games_to_win=6, tiebreak=False)
+    assert _play(readings, tracker) == [IN_PROGRESS, IN_PROGRESS, FINISHED]
+
+
+def test_pro_set_to_eight_games():
+    tracker = MatchTracker(games_to_win=8, tiebreak=True)
+    assert _play(["5 4", "6 4", "7 5", "8 6"], tracker) == [IN_PROGRESS] * 3 + [FINISHED]
+
+
+def test_point_readings_between_games_keep_progress():
+    assert _play(["4 3", "40 15", "30 30", "5 3", "15 0", "6 3"]) == [IN_PROGRESS] * 5 + [FINISHED]
+
+
+def test_misread_jump_is_not_a_game_count():
+    assert _play(["1 0", "17 0"]) == [IN_PROGRESS, IN_PROGRESS]
+
+
+def test_new_match_number_resets_progress():
+    tracker = MatchTracker(games_to_win=6, tiebreak=True)
+    _play(["6 6"], tracker, match_number=11)
+    assert tracker.observe(1, 11, 6, 4) == IN_PROGRESS # 上一場的搶七
+    assert tracker.observe(1, 12, 6, 4) == FINISHED
+
+
+def test_progress_persists_across_processes(tmp_path):
+    state_file = str(tmp_path / "match_progress.json")
+    tracker = MatchTracker(state_file)
+    _play(["6 6"], tracker)
+    tracker.save()
+    assert MatchTracker(state_file).observe(1, 1, 6, 4) == IN_PROGRESS
+
+
+def test_is_point_score():
+    assert is_point_score(40, 15)
+    assert not is_point_score(0, 0)
+    assert not is_point_score(24, 23)
+
+
+def test_parse_score_invalid_is_zero():
+    assert parse_score("") == 0
+    assert parse_score("4O") == 0
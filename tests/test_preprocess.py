@@ -0,0 +1,65 @@
+import importlib.util
+import os
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+
+from digit_segmentation import segment_digits
+from preprocess import RegionPreprocessor, bundled_regions, pil_transform
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEIGHTS_PATH = os.path.join(ROOT_DIR, "SVHN", "svhn_cnn_weights.pth")
+
+# 以內附圖片量測的誤差為：最大 1/255、平均約 4e-6 (只有捨入差異)
+MAX_DIFF = 2.0 / 255
+MEAN_DIFF = 0.001
+
+
+@pytest.fixture(scope="module")
+def regions():
+    halves = bundled_regions(ROOT_DIR)
+    if not halves:
+        pytest.skip("找不到 score_ocr / scoreboard_images 中的圖片")
+    # recognize_score.py 實際送進模型的是切割後的單一數字
+    digits = [crop for half in halves for crop in segment_digits(half, max_digits=2)]
+    return halves + digits
+
+
+@pytest.mark.parametrize("color_order", ["bgr", "rgb"])
+def test_matches_pil_transform_within_bound(regions, color_order):
+    expected = pil_transform(regions, color_order)
+    actual = RegionPreprocessor(color_order=color_order)(regions)
+    diff = (expected - actual).abs()
+    assert actual.shape == expected.shape
+    assert float(diff.max()) <= MAX_DIFF
+    assert float(diff.mean()) <= MEAN_DIFF
+
+
+def test_buffer_reuse_does_not_change_results(regions):
+    preprocessor = RegionPreprocessor(capacity=4)
+    first = preprocessor(regions).clone()
+    preprocessor(regions[:3])
+    assert torch.equal(preprocessor(regions), first)
+
+
+def _load_svhn_model():
+    # 以檔案路徑載入，避免與 scoreboard_images/model.py 互相遮蔽
+    spec = importlib.util.spec_from_file_location("svhn_model", os.path.join(ROOT_DIR, "SVHN", "model.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    model = module.SVHNCNN()
+    model.load_state_dict(torch.load(WEIGHTS_PATH, map_location="cpu"))
+    return model.eval()
+
+
+@pytest.mark.skipif(not os.path.exists(WEIGHTS_PATH), reason="需要 SVHN/svhn_cnn_weights.pth")
+def test_predictions_match_pil_transform(regions):
+    model = _load_svhn_model()
+    with torch.no_grad():
+        expected = model(pil_transform(regions)).argmax(dim=1)
+        actual = model(RegionPreprocessor()(regions)).argmax(dim=1)
+    mismatches = [i for i in range(len(regions)) if expected[i] != actual[i]]
+    assert not mismatches, f"{len(mismatches)} / {len(regions)} 個區域的預測不同：{mismatches}"
@@ -0,0 +1,36 @@
+from recognition_cache import RecognitionCache
+
+
+def _frame(tmp_path, name="1.jpg", data=b"frame"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_hit_requires_same_context(tmp_path):
+    cache = RecognitionCache()
+    path = _frame(tmp_path)
+    cache.put(1, path, ["4", "0"], context="model-a")
+    assert cache.get(1, path, context="model-a") == ["4", "0"]
+    assert cache.get(1, path, context="model-b") is None
+    assert cache.get(1, path) is None
+
+
+def test_changed_frame_misses(tmp_path):
+    cache = RecognitionCache()
+    path = _frame(tmp_path)
+    cache.put(1, path, ["4", "0"])
+    _frame(tmp_path, data=b"a different frame")
+    assert cache.get(1, path) is None
+
+
+def test_persisted_entries_keep_context(tmp_path):
+    cache_file = str(tmp_path / "recognition_cache.json")
+    path = _frame(tmp_path)
+    cache = RecognitionCache(cache_file)
+    cache.put(3, path, ["15", "30"], context="ctx")
+    cache.save()
+
+    reloaded = RecognitionCache(cache_file)
+    assert reloaded.get(3, path, context="ctx") == ["15", "30"]
+    assert reloaded.get(3, path, context="other") is None
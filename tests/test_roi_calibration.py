@@ -0,0 +1,144 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+import roi_calibration
+from digit_segmentation import segment_digits
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def _frame(left, right, w=1280, h=720):
+    """黑底白字的記分板畫面，兩位選手的比分分別置中於左右兩半。"""
+    image = np.zeros((h, w, 3), np.uint8)
+    for text, center_x in ((left, w // 4), (right, 3 * w // 4)):
+        (text_w, text_h), _ = cv2.getTextSize(text, FONT, 10, 30)
+        cv2.putText(image, text, (center_x - text_w // 2, h // 2 + text_h // 2), FONT, 10, (255, 255, 255), 30)
+    return image
+
+
+def _court_frame(left, right, w=1920, h=1080, seed=0):
+    """
+    大部分是球場的畫面：草地雜訊、場地線、球網、球員與看板文字，
+    記分板只在右上角，數字高度約為畫面的 5%。
+    """
+    rng = np.random.default_rng(seed)
+    image = np.clip(rng.normal((60, 140, 70), 12, (h, w, 3)), 0, 255).astype(np.uint8)
+    cv2.rectangle(image, (260, 380), (1660, 1040), (255, 255, 255), 6)
+    cv2.line(image, (960, 380), (960, 1040), (255, 255, 255), 6)
+    cv2.line(image, (260, 700), (1660, 700), (40, 40, 40), 10)
+    for x in range(280, 1660, 24): # 球網的網格
+        cv2.line(image, (x, 640), (x, 700), (200, 200, 200), 1)
+    for cx, cy in ((700, 560), (1250, 880)): # 球員
+        cv2.ellipse(image, (cx, cy), (40, 90), 0, 0, 360, (30, 30, 160), -1)
+        cv2.circle(image, (cx, cy - 120), 28, (150, 180, 220), -1)
+        cv2.line(image, (cx - 20, cy + 80), (cx - 40, cy + 190), (30, 30, 30), 12)
+        cv2.line(image, (cx + 20, cy + 80), (cx + 45, cy + 190), (30, 30, 30), 12)
+    cv2.rectangle(image, (0, 0), (1300, 90), (120, 40, 20), -1) # 看板
+    cv2.putText(image, "ACE OPEN 2024  COURT 3", (40, 62), FONT, 1.4, (255, 255, 255), 3)
+
+    cv2.rectangle(image, (1480, 30), (1860, 150), (15, 15, 15), -1) # 記分板
+    for text, center_x in ((left, 1575), (right, 1765)):
+        (text_w, _), _ = cv2.getTextSize(text, FONT, 2.2, 6)
+        cv2.putText(image, text, (center_x - text_w // 2, 120), FONT, 2.2, (255, 255, 255), 6)
+    return image
+
+
+def _normalized_digit(crop):
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary)
+    if count < 2:
+        return None
+    # segment_digits 的留白可能帶到相鄰數字的邊緣，只取面積最大的區塊
+    x, y, w, h = stats[1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA])), :4]
+    return cv2.resize(binary[y:y + h, x:x + w], (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+TEMPLATES = []
+for _digit in "0123456789":
+    _canvas = np.zeros((300, 240), np.uint8)
+    cv2.putText(_canvas, _digit, (20, 250), FONT, 8, 255, 20)
+    TEMPLATES.append(_normalized_digit(_canvas))
+
+
+def template_confidence(regions):
+    """以字型樣板比對代替 SVHNCNN 的信心值：每個數字取最高的相關係數，兩位選手取較低者。"""
+    confidences = []
+    for region in regions:
+        confidence = 1.0
+        for crop in segment_digits(region, 2):
+            digit = _normalized_digit(crop)
+            if digit is None:
+                return 0.0
+            confidence *= max(max(0.0, float(cv2.matchTemplate(digit, t, cv2.TM_CCOEFF_NORMED)[0, 0])) for t in TEMPLATES)
+        confidences.append(confidence)
+    return min(confidences)
+
+
+def _contains(roi_box, x0, y0, x1, y1):
+    x, y, w, h = roi_box
+    return x <= x0 and y <= y0 and x1 <= x + w and y1 <= y + h
+
+
+def test_roi_calibrated_on_single_digits_fits_two_digit_scores():
+    roi = roi_calibration.calibrate_frame(_frame("5", "0"), template_confidence, max_digits=2)
+    for left, right in (("15", "30"), ("40", "15"), ("40", "0")):
+        regions = roi_calibration.crop_roi(_frame(left, right), roi)
+        assert not roi_calibration.needs_recalibration(roi, regions)
+
+
+def test_roi_stays_inside_each_half():
+    roi = roi_calibration.calibrate_frame(_frame("5", "0"), template_confidence, max_digits=2)
+    x1, _, w1, _ = roi["player1"]
+    x2, _, _, _ = roi["player2"]
+    assert x1 + w1 <= roi["split_x"] <= x2
+
+
+def test_digits_cut_by_roi_border_trigger_recalibration():
+    roi = roi_calibration.calibrate_frame(_frame("5", "0"), template_confidence, max_digits=1)
+    assert not roi_calibration.needs_recalibration(roi, roi_calibration.crop_roi(_frame("5", "0"), roi))
+    assert roi_calibration.needs_recalibration(roi, roi_calibration.crop_roi(_frame("40", "15"), roi))
+
+
+def test_small_scoreboard_found_in_cluttered_court_frame():
+    roi = roi_calibration.calibrate_frame(_court_frame("15", "30"), template_confidence, max_digits=2)
+    assert roi is not None
+    # 數字只佔畫面高度約 5%，ROI 必須緊貼記分板上的兩個比分，而不是半張畫面
+    assert _contains(roi["player1"], 1530, 70, 1620, 122)
+    assert _contains(roi["player2"], 1720, 70, 1810, 122)
+    for player in ("player1", "player2"):
+        x, y, w, h = roi[player]
+        assert 1480 <= x and x + w <= 1860 and 30 <= y and y + h <= 150
+    assert 40 <= roi["digit_height"] <= 60
+    assert roi["reduce"] == 1 # 數字只有約 50 像素，縮小解碼會低於 SVHNCNN 的 32 像素
+
+
+def test_calibration_on_court_frame_survives_score_change():
+    roi = roi_calibration.calibrate_frame(_court_frame("5", "0"), template_confidence, max_digits=2)
+    assert roi is not None
+    regions = roi_calibration.crop_roi(_court_frame("40", "15"), roi)
+    assert not roi_calibration.needs_recalibration(roi, regions)
+    assert template_confidence(regions) >= roi_calibration.ROI_MIN_CONFIDENCE
+
+
+def test_unconfident_calibration_is_rejected():
+    assert roi_calibration.calibrate_frame(_court_frame("15", "30"), lambda regions: 0.5) is None
+    blank = np.full((720, 1280, 3), 90, np.uint8)
+    assert roi_calibration.calibrate_frame(blank, template_confidence) is None
+
+
+def test_reduce_follows_digit_height_not_roi_height():
+    assert roi_calibration._choose_reduce(40) == 1
+    assert roi_calibration._choose_reduce(70) == 2
+    assert roi_calibration._choose_reduce(300) == 8
+
+
+def test_whole_halves_from_old_calibration_are_not_rois():
+    old = {"frame_size": [1280, 720], "player1": [0, 0, 640, 720], "player2": [700, 300, 200, 120], "reduce": 8}
+    assert roi_calibration.is_whole_halves(old)
+    new = roi_calibration.calibrate_frame(_frame("5", "0"), template_confidence)
+    assert not roi_calibration.is_whole_halves(new)
@@ -0,0 +1,89 @@
+import json
+import random
+
+import pytest
+
+import schedule_manager as sm
+import state_store
+
+PLAYERS = 16
+COURTS = 3
+
+
+def _draw():
+    """16 位選手的單淘汰賽：第 1~8 場為首輪，之後每場使用前兩場的勝者。"""
+    draw = [{"round": 1, "match": i + 1, "player1": f"P{2 * i + 1}", "player2": f"P{2 * i + 2}",
+             "winner": None, "score_p1": None, "score_p2": None, "status": "尚未開始"} for i in range(PLAYERS // 2)]
+    feeders = list(range(1, PLAYERS // 2 + 1))
+    match, round_number = PLAYERS // 2, 2
+    while len(feeders) > 1:
+        next_feeders = []
+        for a, b in zip(feeders[::2], feeders[1::2]):
+            match += 1
+            draw.append({"round": round_number, "match": match, "player1": f"Winner of Match {a}",
+                         "player2": f"Winner of Match {b}", "winner": None, "score_p1": None,
+                         "score_p2": None, "status": "尚未開始"})
+            next_feeders.append(match)
+        feeders, round_number = next_feeders, round_number + 1
+    return draw
+
+
+def _courts():
+    return [{"id": f"Court {i}", "player1": "", "score1": None, "player2": "", "score2": None, "nextPlayers": "",
+             "status": "空閒", "next_match_number": None, "current_match_number": None} for i in range(1, COURTS + 1)]
+
+
+def _use_files(monkeypatch, directory):
+    monkeypatch.setattr(sm, "DATA_FILE", str(directory / "courts.json"))
+    monkeypatch.setattr(sm, "SCHEDULE_FILE", str(directory / "mainDraw.json"))
+
+
+def _sequential_pass():
+    """批次完成之前的流程：每完成一個球場就重新載入並寫回兩個檔案。"""
+    sm.resolve_winner_placeholders_in_main_draw()
+    while True:
+        finished = [c for c in sm.load_data() if c.get("status") == "比賽結束" and c.get("current_match_number") is not None]
+        if not finished:
+            break
+        sm.complete_match_on_court(finished[0]["id"])
+    courts = sm.load_data()
+    sm.assign_next_match(courts)
+    sm.save_data(courts)
+
+
+def _finish_some(rng):
+    """以固定的亂數序列讓部分進行中的比賽結束，比分隨機。"""
+    courts = sm.load_data()
+    for court in courts:
+        if court["current_match_number"] is not None and rng.random() < 0.6:
+            loser = rng.randint(0, 4)
+            court.update({"score1": 6, "score2": loser} if rng.random() < 0.5 else {"score1": loser, "score2": 6})
+            court["status"] = "比賽結束"
+    sm.save_data(courts)
+
+
+def _snapshot():
+    return json.dumps([state_store.read_json(sm.DATA_FILE), state_store.read_json(sm.SCHEDULE_FILE)], ensure_ascii=False)
+
+
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_bulk_finalisation_matches_sequential(tmp_path, monkeypatch, seed, capsys):
+    monkeypatch.setattr(state_store, "BACKEND", "json")
+    runs = {}
+    for name, schedule_pass in (("bulk", sm.main), ("sequential", _sequential_pass)):
+        directory = tmp_path / name
+        directory.mkdir()
+        _use_files(monkeypatch, directory)
+        state_store.write_json(sm.DATA_FILE, _courts())
+        state_store.write_json(sm.SCHEDULE_FILE, _draw())
+        rng = random.Random(seed)
+        snapshots = []
+        for _ in range(60):
+            schedule_pass()
+            snapshots.append(_snapshot())
+            _finish_some(rng)
+        runs[name] = snapshots
+
+    assert runs["bulk"] == runs["sequential"]
+    final_draw = json.loads(runs["bulk"][-1])[1]
+    assert all(m["status"] == "比賽結束" and m["winner"] for m in final_draw) # 整個賽程都打完
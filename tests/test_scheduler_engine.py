@@ -0,0 +1,69 @@
+import pytest
+
+import schedule_manager as sm
+import scheduler_engine
+import state_store
+
+
+def _court(i):
+    return {"id": f"Court {i}", "player1": "", "score1": None, "player2": "", "score2": None,
+            "nextPlayers": "", "status": "空閒", "next_match_number": None, "current_match_number": None}
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, "BACKEND", "json")
+    monkeypatch.setattr(sm, "DATA_FILE", str(tmp_path / "courts.json"))
+    monkeypatch.setattr(sm, "SCHEDULE_FILE", str(tmp_path / "mainDraw.json"))
+    # 8 位選手的單淘汰賽：第 1~4 場為首輪，第 5~7 場使用前一輪的勝者
+    draw = [{"round": 1, "match": i + 1, "player1": f"P{2 * i + 1}", "player2": f"P{2 * i + 2}",
+             "winner": None, "score_p1": None, "score_p2": None, "status": "尚未開始"} for i in range(4)]
+    draw += [{"round": 2 + (m == 7), "match": m, "player1": f"Winner of Match {a}", "player2": f"Winner of Match {b}",
+              "winner": None, "score_p1": None, "score_p2": None, "status": "尚未開始"}
+             for m, a, b in ((5, 1, 2), (6, 3, 4), (7, 5, 6))]
+    state_store.save(sm.SCHEDULE_FILE, draw)
+    state_store.save(sm.DATA_FILE, [_court(1), _court(2)])
+    return scheduler_engine.SchedulerEngine()
+
+
+def _courts():
+    return state_store.load(sm.DATA_FILE)
+
+
+def _finish(court_index):
+    courts = _courts()
+    courts[court_index].update({"score1": "6", "score2": "3", "status": scheduler_engine.FINISHED})
+    state_store.save(sm.DATA_FILE, courts)
+
+
+def test_match_cleared_from_next_slot_is_offered_again(engine):
+    engine.run_once()
+    engine.run_once()
+    courts = _courts()
+    cleared = courts[0]["next_match_number"]
+    assert cleared is not None
+    # 在引擎之外清空下一場 (例如管理員編輯 courts.json)
+    courts[0].update({"nextPlayers": "", "next_match_number": None})
+    state_store.save(sm.DATA_FILE, courts)
+
+    engine.run_once()
+    assert cleared in [c["next_match_number"] for c in _courts()]
+
+
+def test_tournament_completes_when_next_slots_are_cleared(engine, capsys):
+    engine.run_once()
+    for step in range(50):
+        courts = _courts()
+        if step % 2 == 0:
+            for court in courts:
+                if court["next_match_number"] is not None:
+                    court.update({"nextPlayers": "", "next_match_number": None})
+                    break
+        state_store.save(sm.DATA_FILE, courts)
+        live = [i for i, c in enumerate(courts) if c["current_match_number"] is not None]
+        if live:
+            _finish(live[0])
+        engine.run_once()
+        if all(m["status"] == scheduler_engine.FINISHED for m in state_store.load(sm.SCHEDULE_FILE)):
+            break
+    assert all(m["status"] == scheduler_engine.FINISHED for m in state_store.load(sm.SCHEDULE_FILE))
@@ -0,0 +1,55 @@
+from score_smoothing import ScoreSmoother
+
+
+def _smoother(**kwargs):
+    return ScoreSmoother(min_confidence=0.6, commit_confidence=0.95, stable_frames=3, **kwargs)
+
+
+def test_new_score_needs_stable_frames():
+    smoother = _smoother()
+    assert smoother.observe(1, "3", "2", 0.8) is None
+    assert smoother.observe(1, "3", "2", 0.8) is None
+    assert smoother.observe(1, "3", "2", 0.9)[:2] == ("3", "2")
+    assert smoother.committed(1)[:2] == ("3", "2")
+    assert smoother.stats() == {"accepted": 1, "pending": 2, "rejected": 0}
+
+
+def test_single_misread_inside_vote_window_is_held():
+    smoother = _smoother()
+    for _ in range(3):
+        smoother.observe(1, "3", "2", 0.8)
+    assert smoother.observe(1, "6", "2", 0.8) is None # 單張誤判
+    assert smoother.committed(1)[:2] == ("3", "2")
+    assert smoother.observe(1, "3", "2", 0.8)[:2] == ("3", "2")
+
+
+def test_low_confidence_frame_is_rejected_without_history():
+    smoother = _smoother()
+    assert smoother.observe(1, "6", "4", 0.59) is None
+    assert "1" not in smoother.courts # 不寫入任何狀態
+    assert smoother.stats()["rejected"] == 1
+
+
+def test_high_confidence_commits_immediately():
+    smoother = _smoother()
+    assert smoother.observe(1, "4", "1", 0.95)[:2] == ("4", "1")
+    assert smoother.observe(1, "5", "1", 0.94) is None
+
+
+def test_match_change_resets_history():
+    smoother = _smoother()
+    assert smoother.sync_match(1, 11)
+    smoother.observe(1, "6", "4", 0.99)
+    assert not smoother.sync_match(1, 11)
+    assert smoother.sync_match(1, 12)
+    assert smoother.committed(1) is None
+    assert smoother.courts["1"]["match"] == 12
+
+
+def test_history_persists_across_processes(tmp_path):
+    state_file = str(tmp_path / "score_history.json")
+    smoother = _smoother(state_file=state_file)
+    smoother.observe(1, "3", "2", 0.8)
+    smoother.observe(1, "3", "2", 0.8)
+    smoother.save()
+    assert _smoother(state_file=state_file).observe(1, "3", "2", 0.8)[:2] == ("3", "2")
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+import sqlite_store
+import state_store
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path, monkeypatch):
+    """在暫存資料夾使用 SQLite 儲存引擎，courts.json / mainDraw.json 也放在同一處。"""
+    monkeypatch.setattr(state_store, "BACKEND", "sqlite")
+    monkeypatch.setattr(state_store, "DATA_FILE", str(tmp_path / "courts.json"))
+    monkeypatch.setattr(state_store, "SCHEDULE_FILE", str(tmp_path / "mainDraw.json"))
+    monkeypatch.setattr(sqlite_store, "DB_FILE", str(tmp_path / "tennis_state.db"))
+    monkeypatch.setattr(sqlite_store._local, "conn", None, raising=False)
+    yield tmp_path
+    if sqlite_store._local.conn is not None:
+        sqlite_store._local.conn.close()
+
+
+def _write_external(path, data):
+    """模擬 server.js 或手動編輯直接改寫 JSON 檔案 (mtime 必須與上次同步不同)。"""
+    stat = os.stat(path) if os.path.exists(path) else None
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    if stat is not None:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def _court(i, score="0"):
+    return {"id": f"Court {i}", "score1": score, "score2": "0", "status": "進行中"}
+
+
+def test_external_json_edit_is_reimported(sqlite_backend):
+    state_store.save(state_store.DATA_FILE, [_court(1), _court(2)])
+    _write_external(state_store.DATA_FILE, [_court(1, "5"), _court(2)])
+    assert state_store.load(state_store.DATA_FILE)[0]["score1"] == "5"
+
+    # 之後的讀-改-寫建立在重新匯入的內容上，不會以資料庫的舊內容覆蓋外部修改
+    state_store.update(state_store.DATA_FILE, lambda courts: courts[1].update(score1="3"))
+    with open(state_store.DATA_FILE, encoding="utf-8") as f:
+        assert [c["score1"] for c in json.load(f)] == ["5", "3"]
+
+
+def test_main_draw_is_exported(sqlite_backend):
+    state_store.save(state_store.SCHEDULE_FILE, [{"round": 1, "match": 1, "player1": "A", "player2": "B"}])
+    state_store.apply_deltas(state_store.SCHEDULE_FILE, "match", {1: {"winner": "A"}})
+    with open(state_store.SCHEDULE_FILE, encoding="utf-8") as f:
+        assert json.load(f)[0]["winner"] == "A"
+
+
+def test_invalid_json_is_not_imported(sqlite_backend):
+    state_store.save(state_store.DATA_FILE, [_court(1)])
+    with open(state_store.DATA_FILE, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    os.utime(state_store.DATA_FILE, ns=(0, 1))
+    assert [c["id"] for c in state_store.load(state_store.DATA_FILE)] == ["Court 1"]
+    state_store.save(state_store.DATA_FILE, [_court(1, "2")])
+    with open(state_store.DATA_FILE, encoding="utf-8") as f:
+        assert json.load(f) == [_court(1, "2")]
@@ -0,0 +1,72 @@
+import json
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+import state_store
+
+
+def _increment(path, key, times):
+    for _ in range(times):
+        state_store.update(path, lambda data: data.__setitem__(key, data.get(key, 0) + 1), default={})
+
+
+def test_concurrent_thread_updates_all_land(tmp_path):
+    path = str(tmp_path / "courts.json")
+    threads = [threading.Thread(target=_increment, args=(path, f"t{i}", 25)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state_store.read_json(path) == {f"t{i}": 25 for i in range(8)}
+
+
+def test_concurrent_process_updates_all_land(tmp_path):
+    path = str(tmp_path / "courts.json")
+    context = multiprocessing.get_context("spawn") # 與 recognize_score.py / schedule_manager.py 一樣是獨立程序
+    processes = [context.Process(target=_increment, args=(path, "count", 20)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+    assert state_store.read_json(path) == {"count": 80}
+
+
+def test_readers_never_see_partial_file(tmp_path):
+    path = str(tmp_path / "courts.json")
+    payloads = [[{"id": f"Court {i}", "player1": "x" * 2000, "round": n} for i in range(50)] for n in range(2)]
+    state_store.write_json(path, payloads[0])
+    stop = threading.Event()
+    errors = []
+
+    def _read():
+        while not stop.is_set():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f) # 沒有上鎖，直接讀取
+                if data not in payloads:
+                    errors.append("mixed content")
+            except json.JSONDecodeError as e:
+                errors.append(str(e))
+
+    readers = [threading.Thread(target=_read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for n in range(200):
+        state_store.write_json(path, payloads[n % 2])
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert errors == []
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    path = str(tmp_path / "courts.json")
+    state_store.write_json(path, [{"id": "Court 1"}])
+    with pytest.raises(TypeError):
+        state_store.write_json(path, [{"id": object()}]) # 序列化到一半失敗
+    assert state_store.read_json(path) == [{"id": "Court 1"}]
+    assert [f for f in os.listdir(tmp_path) if f.endswith(".tmp")] == [] # 暫存檔已清除
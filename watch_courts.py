@@ -0,0 +1,185 @@
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+
+from frame_index import frame_sort_key
+
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
+
+# --- 檔案系統監看觸發的比分辨識 ---
+# server.js 每 10 秒辨識全部 12 個球場，不論圖片有沒有變動；新的比分最多要等 10 秒才會被發現。
+# 這裡監看 score_ocr/court_*，只在某個球場資料夾出現新圖片時辨識該球場：
+# * Linux 上透過 inotify (ctypes 呼叫 libc，不需額外套件)，監聽 IN_CLOSE_WRITE / IN_MOVED_TO，
+#   IN_MODIFY 只用來延長防抖時間；其他平台或 inotify 無法使用時退回定期掃描資料夾。
+# * 防抖：球場在 DEBOUNCE 秒內沒有新的事件才辨識，避免讀到寫到一半的圖片，
+#   也把連續寫入的多張圖片合併成一次辨識。
+# * 同一時間到期的球場合併成一批，仍然只做一次推論與一次 courts.json 寫入。
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCORE_DIR = os.path.join(BASE_DIR, "score_ocr")
+DEBOUNCE = 0.3      # 秒
+POLL_INTERVAL = 1.0 # 退回定期掃描時的間隔秒數
+IMAGE_EXTENSIONS = (".jpg", ".png")
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, len
+
+def court_folders(court_count):
+    return {court_id: os.path.join(SCORE_DIR, f"court_{court_id}") for court_id in range(1, court_count + 1)}
+
+
+class InotifyWatcher:
+    """以 inotify 監看各球場資料夾；wait() 返回有新圖片的 (court_id, 是否已寫完) 列表。"""
+
+    def __init__(self, folders):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders = folders
+        self._wd_to_court = {}
+        for court_id, folder in folders.items():
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                print(f"[{os.path.basename(__file__)}] ERROR: Cannot watch folder: {folder}", file=sys.stderr)
+                continue
+            self._wd_to_court[wd] = court_id
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0").decode(errors="replace")
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW: # 事件佇列溢位：當作所有球場都有變動
+                events.extend((court_id, True) for court_id in self._wd_to_court.values())
+                continue
+            court_id = self._wd_to_court.get(wd)
+            if court_id is None or not name.endswith(IMAGE_EXTENSIONS):
+                continue
+            events.append((court_id, bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """定期比對各球場資料夾與最新圖片的 mtime / 大小，作為 inotify 無法使用時的備援。"""
+
+    def __init__(self, folders, interval=POLL_INTERVAL):
+        self.folders = folders
+        self.interval = interval
+        self._signatures = {court_id: self._signature(folder) for court_id, folder in folders.items()}
+
+    @staticmethod
+    def _signature(folder):
+        try:
+            latest = None
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.endswith(IMAGE_EXTENSIONS) and (latest is None or frame_sort_key(entry.name) > frame_sort_key(latest.name)):
+                        latest = entry
+            if latest is None:
+                return None
+            stat = latest.stat()
+            return latest.name, stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        events = []
+        for court_id, folder in self.folders.items():
+            signature = self._signature(folder)
+            if signature != self._signatures[court_id]:
+                self._signatures[court_id] = signature
+                events.append((court_id, False)) # 無法得知是否寫完，交給防抖等待大小穩定
+        return events
+
+    def close(self):
+        pass
+
+
+def create_watcher(folders, force_polling=False, poll_interval=POLL_INTERVAL):
+    if not force_polling:
+        try:
+            return InotifyWatcher(folders)
+        except (OSError, AttributeError) as e:
+            print(f"[{os.path.basename(__file__)}] inotify unavailable ({e}), falling back to polling", file=sys.stderr)
+    return PollingWatcher(folders, poll_interval)
+
+def watch(watcher, on_courts_changed, debounce=DEBOUNCE):
+    """
+    事件迴圈：球場在 debounce 秒內沒有新事件後才觸發 on_courts_changed(court_ids)。
+    沒有事件時一直阻塞等待，閒置的球場不佔用任何辨識成本。
+    """
+    deadlines = {} # court_id -> 可以辨識的時間
+    while True:
+        now = time.monotonic()
+        timeout = max(0.0, min(deadlines.values()) - now) if deadlines else None
+        for court_id, completed in watcher.wait(timeout):
+            # 已寫完的檔案 (CLOSE_WRITE / MOVED_TO) 仍等待 debounce，把連續寫入合併成一次辨識；
+            # 仍在寫入中 (IN_MODIFY) 或無法判斷 (定期掃描) 時等待兩倍時間
+            deadlines[court_id] = time.monotonic() + (debounce if completed else 2 * debounce)
+        now = time.monotonic()
+        due = sorted(court_id for court_id, deadline in deadlines.items() if deadline <= now)
+        if due:
+            for court_id in due:
+                del deadlines[court_id]
+            on_courts_changed(due)
+
+def main():
+    parser = argparse.ArgumentParser(description="監看 score_ocr/court_*，只辨識有新圖片的球場")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, help="最後一次事件後等待的秒數 (預設 0.3)")
+    parser.add_argument("--poll", action="store_true", help="不使用 inotify，改為定期掃描資料夾")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="定期掃描的間隔秒數 (預設 1)")
+    args = parser.parse_args()
+
+    import recognize_score # 載入模型
+
+    folders = court_folders(recognize_score.COURT_COUNT)
+    watcher = create_watcher(folders, force_polling=args.poll, poll_interval=args.poll_interval)
+    print(f"[{os.path.basename(__file__)}] Watching {len(folders)} courts with {type(watcher).__name__}", file=sys.stderr)
+
+    def on_courts_changed(court_ids):
+        try:
+            for update in recognize_score.recognize_all_courts(court_ids=court_ids):
+                print(json.dumps(update, ensure_ascii=False), flush=True)
+        except Exception as e:
+            print(f"[{os.path.basename(__file__)}] ERROR: Recognition failed for courts {court_ids}: {e}", file=sys.stderr)
+
+    on_courts_changed(list(folders)) # 啟動時先同步一次所有球場
+    try:
+        watch(watcher, on_courts_changed, debounce=args.debounce)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()